@@ -1,16 +1,28 @@
 import requests
-import json
+import os
 import time
 import geopandas as gpd
+import numpy as np
 import pandas as pd
-from shapely.geometry import Polygon
+from shapely import affinity, make_valid
+from shapely.geometry import MultiPolygon, Polygon, box
 from shapely.ops import unary_union
 
+from gridCoverage import COVERAGE_TABLE_PATH, load_coverage_table
+from kgRecords import KGRecordTable, write_json
+from simplifyBoundaries import get_boundary_levels, two_phase_join
+
 ##############################
 #  CONFIG: Shapefile Path
 ##############################
 ADMIN_SHAPEFILE_PATH = "NasaKG/boundaries/boundaries.shp"
 
+# How datasets are matched to admin areas:
+#   "grid"   - precomputed cell lookup, exact-checked in boundary cells (see gridCoverage.py)
+#   "exact"  - polygon join against the shapefile
+#   "verify" - run both, keep the exact result and report disagreements
+CLASSIFICATION_MODE = "grid"
+
 ##############################
 #  (1) Fetch Data
 ##############################
@@ -88,11 +100,74 @@ def extract_polygons(geom):
         return None
 
 
-def parse_cmr_spatial(boxes=None, polygons=None, points=None):
+def cmr_box_to_geometry(southLat, westLon, northLat, eastLon):
+    """
+    Build the geometry for one CMR bounding box.
+    A box with westLon > eastLon crosses the antimeridian, so it becomes
+    two boxes, one on each side of +/-180. Latitudes are clipped to the poles.
+    """
+    southLat, northLat = max(southLat, -90.0), min(northLat, 90.0)
+    if westLon > eastLon:
+        return MultiPolygon([
+            box(westLon, southLat, 180.0, northLat),
+            box(-180.0, southLat, eastLon, northLat),
+        ])
+    return box(westLon, southLat, eastLon, northLat)
+
+
+def normalize_ring(pairs):
+    """
+    Turn a closed (lon, lat) ring into a Polygon/MultiPolygon inside
+    [-180, 180] x [-90, 90].
+    - Longitudes are unwrapped so consecutive points never jump by more
+      than 180 degrees; the pieces falling outside [-180, 180] are then
+      shifted back by 360 and merged.
+    - A ring that winds all the way around the globe encloses a pole;
+      it is closed over that pole (picked by the ring's mean latitude).
+    """
+    unwrapped = [pairs[0]]
+    for lon, lat in pairs[1:]:
+        prev_lon = unwrapped[-1][0]
+        while lon - prev_lon > 180:
+            lon -= 360
+        while lon - prev_lon < -180:
+            lon += 360
+        unwrapped.append((lon, lat))
+
+    winding = unwrapped[-1][0] - unwrapped[0][0]
+    if abs(winding) > 180:
+        pole = 90.0 if sum(lat for _, lat in unwrapped) >= 0 else -90.0
+        # Keep the closing vertex (shifted by 360): dropping it cuts a wedge out of the cap
+        unwrapped = unwrapped + [
+            (unwrapped[-1][0], pole),
+            (unwrapped[0][0], pole),
+            unwrapped[0],
+        ]
+
+    poly = Polygon(unwrapped)
+    if not poly.is_valid:
+        poly = make_valid(poly)
+
+    pieces = []
+    for shift in (-360, 0, 360):
+        window = box(-180 - shift, -90, 180 - shift, 90)
+        piece = extract_polygons(poly.intersection(window))
+        if piece is not None and not piece.is_empty:
+            pieces.append(affinity.translate(piece, xoff=shift))
+    if not pieces:
+        return None
+    return extract_polygons(unary_union(pieces))
+
+
+def parse_cmr_spatial(boxes=None, polygons=None, points=None, normalize=True):
     """
     Convert NASA CMR 'boxes', 'polygons', or 'points' into
     a single Polygon/MultiPolygon if possible.
     Skips or merges geometry as needed.
+
+    With normalize=True (the default), antimeridian-crossing boxes and
+    polygons are split at +/-180 and polar caps are clipped to the pole,
+    instead of coming out as huge inverted polygons.
     """
     shapes = []
 
@@ -103,6 +178,9 @@ def parse_cmr_spatial(boxes=None, polygons=None, points=None):
             if len(coords) == 4:
                 # [SouthLat, WestLon, NorthLat, EastLon]
                 southLat, westLon, northLat, eastLon = map(float, coords)
+                if normalize:
+                    shapes.append(cmr_box_to_geometry(southLat, westLon, northLat, eastLon))
+                    continue
                 poly = Polygon([
                     (westLon, southLat),
                     (eastLon, southLat),
@@ -127,6 +205,11 @@ def parse_cmr_spatial(boxes=None, polygons=None, points=None):
                 if pairs and pairs[0] != pairs[-1]:
                     pairs.append(pairs[0])
                 if len(pairs) > 2:
+                    if normalize:
+                        ring_geom = normalize_ring(pairs)
+                        if ring_geom is not None:
+                            shapes.append(ring_geom)
+                        continue
                     shapes.append(Polygon(pairs))
 
     # Skipping points in this example
@@ -195,8 +278,12 @@ def classify_bbox_scope(rows_for_dataset):
 ##############################
 def bulk_find_admin_areas(nasa_gdf, admin_shapefile_path):
     """
-    Reads admin shapefile once, does a single spatial join with NASA polygons,
+    Reads admin shapefile once, matches all NASA polygons against it,
     returns a DataFrame that has columns from both NASA GDF and admin shapefile.
+
+    The rows are the same as a left gpd.sjoin(..., predicate="intersects"),
+    but candidates are first tested against simplified boundaries and only
+    borderline ones pay for the full-resolution intersection.
     """
     admin_gdf = gpd.read_file(admin_shapefile_path)
 
@@ -205,70 +292,73 @@ def bulk_find_admin_areas(nasa_gdf, admin_shapefile_path):
     else:
         nasa_gdf = nasa_gdf.to_crs(admin_gdf.crs)
 
-    joined = gpd.sjoin(nasa_gdf, admin_gdf, how="left", predicate="intersects")
-    return joined
+    levels = get_boundary_levels(admin_shapefile_path)
+    nasa_pos, admin_pos = two_phase_join(nasa_gdf.geometry.to_numpy(), admin_gdf, levels)
+
+    matched = pd.DataFrame(admin_gdf.drop(columns=admin_gdf.geometry.name).iloc[admin_pos])
+    matched.insert(0, "index_right", admin_gdf.index[admin_pos])
+    matched["_nasa_pos"] = nasa_pos
+
+    left = nasa_gdf.assign(_nasa_pos=np.arange(len(nasa_gdf)))
+    joined = left.merge(matched.reset_index(drop=True), on="_nasa_pos", how="left")
+    return joined.drop(columns="_nasa_pos")
 
 
 ##############################
 #  (5) Main Transformation
 ##############################
-def transform_cmr_to_classes(all_entries):
+def classify_with_join(geoms):
+    """Exact classification: {dataset_index: classification or None}."""
+    nasa_gdf = gpd.GeoDataFrame(geoms, geometry="geometry", crs="EPSG:4326")
+    joined = bulk_find_admin_areas(nasa_gdf, ADMIN_SHAPEFILE_PATH)
+
+    results = {}
+    for dataset_index, rows in joined.groupby("dataset_index"):
+        if len(rows) == 1 and pd.isnull(rows.iloc[0]["index_right"]):
+            results[dataset_index] = None
+        else:
+            results[dataset_index] = classify_bbox_scope(rows)
+    return results
+
+
+def classify_with_grid(geoms, table):
+    """Cell-lookup classification: {dataset_index: classification or None}."""
+    results = {}
+    for g in geoms:
+        rows = table.rows_for(g["geometry"])
+        results[g["dataset_index"]] = classify_bbox_scope(rows) if len(rows) else None
+    return results
+
+
+def same_classification(a, b):
+    """Compare two classify_bbox_scope() results, ignoring name order."""
+    if a is None or b is None:
+        return a is b
+    return a["scope"] == b["scope"] and all(
+        set(a[key]) == set(b[key]) for key in ("cities", "countries", "continents")
+    )
+
+
+def transform_cmr_to_classes(all_entries, classification_mode=CLASSIFICATION_MODE):
     """
     1) Returns:
        original_output, individual_output, fail_count
+       Both outputs are read-only views over one KGRecordTable: records
+       are built as they are read, and kgRecords.write_json() streams
+       them from the columns.
 
     2) Also includes new 'TemporalExtent' and 'Duration' classes.
-    """
 
-    original_output = {
-        "Dataset": [],
-        "DataCategory": [],
-        "DataFormat": [],
-        "LocationCategory": [],
-        "SpatialExtent": [],
-        "Station": [],
-        "Relationship": [],
-        # NEW:
-        "TemporalExtent": [],
-        "Duration": []
-    }
+    3) classification_mode picks how geometries are matched to admin areas
+       ("grid", "exact" or "verify", see CLASSIFICATION_MODE). "grid" falls
+       back to "exact" when the coverage table hasn't been built yet.
+    """
 
-    individual_output = []
+    records = KGRecordTable()
     geoms = []
     fail_count = 0
 
-    for idx, entry in enumerate(all_entries):
-        # ---------------------------
-        # (1) Existing code: dataset
-        # ---------------------------
-        dataset_obj = {
-            "short_name": entry.get("short_name", "N/A"),
-            "title": entry.get("title", "N/A"),
-            "links": entry.get("links", [])
-        }
-        original_output["Dataset"].append(dataset_obj)
-
-        # dataCategory
-        data_category_obj = {
-            "summary": entry.get("summary", "N/A")
-        }
-        original_output["DataCategory"].append(data_category_obj)
-
-        # dataFormat
-        data_format_obj = {
-            "original_format": entry.get("original_format", "N/A")
-        }
-        original_output["DataFormat"].append(data_format_obj)
-
-        # locationCategory
-        location_category_obj = {"category": None}
-        original_output["LocationCategory"].append(location_category_obj)
-
-        # spatialExtent
-        boxes = entry.get("boxes", [])
-        polygons = entry.get("polygons", [])
-        points = entry.get("points", [])
-
+    for entry in all_entries:
         time_start_str = entry.get("time_start")
         time_end_str = entry.get("time_end")
 
@@ -282,111 +372,58 @@ def transform_cmr_to_classes(all_entries):
             except:
                 pass
 
-        spatial_extent_obj = {
-            "boxes": boxes,
-            "polygons": polygons,
-            "points": points,
-            "place_names": [],
-            "time_start": time_start_str,
-            "time_end": time_end_str,
-            "duration_days": duration_days
-        }
-        original_output["SpatialExtent"].append(spatial_extent_obj)
-
-        # station
-        station_obj = {
-            "platforms": entry.get("platforms", [])
-        }
-        original_output["Station"].append(station_obj)
-
-        # relationship
-        relationship_obj = {
-            # existing placeholders
-            "hasDataCategory": [],
-            "hasDataFormat": [],
-            # ...
-            "definesPeriodFor": []
-        }
-        original_output["Relationship"].append(relationship_obj)
-
-        # ---------------------------
-        # (2) NEW: temporalExtent
-        # ---------------------------
-        # For demonstration, let's store 'time_start', 'time_end'
-        # plus the same "duration_days" logic, or any other fields you want
-        temporal_extent_obj = {
-            "start_time": time_start_str,
-            "end_time": time_end_str
-        }
-        original_output["TemporalExtent"].append(temporal_extent_obj)
-
-        # ---------------------------
-        # (3) NEW: duration
-        # ---------------------------
-        # We can store 'days' as an int. If we want more detail, we can add it.
-        duration_obj = {
-            "days": duration_days
-        }
-        original_output["Duration"].append(duration_obj)
-
-        # ---------------------------
-        # (4) Build the individual record
-        # ---------------------------
-        individual_dataset_dict = {
-            "Dataset": dataset_obj,
-            "DataCategory": data_category_obj,
-            "DataFormat": data_format_obj,
-            "LocationCategory": location_category_obj,
-            "SpatialExtent": spatial_extent_obj,
-            "Station": station_obj,
-            "Relationship": relationship_obj,
-
-            # NEW
-            "TemporalExtent": temporal_extent_obj,
-            "Duration": duration_obj
-        }
-        individual_output.append(individual_dataset_dict)
+        # One row across all nine classes (see kgRecords.CLASS_FIELDS)
+        idx = records.append(entry, duration_days)
 
         # parse geometry if applicable
+        boxes = entry.get("boxes", [])
+        polygons = entry.get("polygons", [])
+        points = entry.get("points", [])
         geometry = parse_cmr_spatial(boxes, polygons, points)
         if geometry is None:
             fail_count += 1
-            location_category_obj["category"] = "unclassified"
+            records.set_location(idx, "unclassified")
             continue
 
         geoms.append({"dataset_index": idx, "geometry": geometry})
 
     # 3) If no valid geometries, return
     if not geoms:
-        return original_output, individual_output, fail_count
+        return records.original_view(), records.individual_view(), fail_count
 
-    # 4) Spatial join & classification
-    nasa_gdf = gpd.GeoDataFrame(geoms, geometry="geometry", crs="EPSG:4326")
-    joined = bulk_find_admin_areas(nasa_gdf, ADMIN_SHAPEFILE_PATH)
-    grouped = joined.groupby("dataset_index")
+    # 4) Spatial matching & classification
+    if classification_mode != "exact" and not os.path.exists(COVERAGE_TABLE_PATH):
+        print(f"No coverage table at {COVERAGE_TABLE_PATH}; using exact joins.")
+        classification_mode = "exact"
 
-    for dataset_index, rows in grouped:
-        if len(rows) == 1 and pd.isnull(rows.iloc[0]["index_right"]):
+    if classification_mode == "grid":
+        results = classify_with_grid(geoms, load_coverage_table(admin_shapefile_path=ADMIN_SHAPEFILE_PATH))
+    else:
+        results = classify_with_join(geoms)
+
+    if classification_mode == "verify":
+        grid_results = classify_with_grid(geoms, load_coverage_table(admin_shapefile_path=ADMIN_SHAPEFILE_PATH))
+        mismatches = [
+            i for i in results
+            if not same_classification(results[i], grid_results.get(i))
+        ]
+        print(f"Grid lookup disagrees with exact join for {len(mismatches)} of {len(results)} datasets.")
+
+    for dataset_index, classification in results.items():
+        if classification is None:
             # unclassified
-            original_output["LocationCategory"][dataset_index]["category"] = "unclassified"
-            original_output["SpatialExtent"][dataset_index]["place_names"] = []
-            individual_output[dataset_index]["LocationCategory"]["category"] = "unclassified"
-            individual_output[dataset_index]["SpatialExtent"]["place_names"] = []
+            records.set_location(dataset_index, "unclassified")
             continue
 
-        classification = classify_bbox_scope(rows)
         scope = classification["scope"]
         place_names = (
             classification["cities"]
             + classification["countries"]
             + classification["continents"]
         )
-        original_output["LocationCategory"][dataset_index]["category"] = scope
-        original_output["SpatialExtent"][dataset_index]["place_names"] = place_names
-        individual_output[dataset_index]["LocationCategory"]["category"] = scope
-        individual_output[dataset_index]["SpatialExtent"]["place_names"] = place_names
+        records.set_location(dataset_index, scope, place_names)
 
-    return original_output, individual_output, fail_count
+    return records.original_view(), records.individual_view(), fail_count
 
 
 ##############################
@@ -407,13 +444,13 @@ def main():
     # 3) Save the parallel-lists format
     output_file_original = "cmr_final_data.json"
     with open(output_file_original, "w", encoding="utf-8") as f:
-        json.dump(structured_data_original, f, indent=2)
+        write_json(structured_data_original, f, indent=2)
     print(f"Saved original-format data to {output_file_original}")
 
     # 4) Save the individual-records format
     output_file_individual = "cmr_final_data_individual.json"
     with open(output_file_individual, "w", encoding="utf-8") as f:
-        json.dump(structured_data_individual, f, indent=2)
+        write_json(structured_data_individual, f, indent=2)
     print(f"Saved individual-record data to {output_file_individual}")
 
     # 5) Print how many datasets had geometry issues
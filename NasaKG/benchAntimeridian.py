@@ -0,0 +1,71 @@
+import json
+import sys
+import time
+
+import geopandas as gpd
+
+from NasaDataAPI import ADMIN_SHAPEFILE_PATH, parse_cmr_spatial
+
+##############################
+#  CONFIG
+##############################
+OUTPUT_FILE = "bench_antimeridian.json"
+
+# Footprints that cross the antimeridian or cover a pole, in CMR syntax
+# (boxes: "S W N E", polygons: "lat lon lat lon ...").
+CASES = {
+    "fiji_box": {"boxes": ["-21 177 -12 -178"]},
+    "bering_sea_box": {"boxes": ["52 162 66 -157"]},
+    "pacific_swath_box": {"boxes": ["-10 150 10 -120"]},
+    "arctic_cap_box": {"boxes": ["66.5 -180 95 180"]},
+    "aleutian_polygon": {"polygons": [[
+        "50 170 50 -170 56 -170 56 170 50 170"
+    ]]},
+    # Control case: an ordinary footprint must not change
+    "karachi_box": {"boxes": ["24.82 66.95 24.88 67.06"]},
+}
+
+
+def join_row_count(geometry, admin_gdf):
+    """Rows produced by an intersects join of one footprint with the admin layer."""
+    if geometry is None:
+        return 0
+    gdf = gpd.GeoDataFrame(index=[0], geometry=[geometry], crs=admin_gdf.crs)
+    return len(gpd.sjoin(gdf, admin_gdf, how="inner", predicate="intersects"))
+
+
+def main():
+    admin_gdf = gpd.read_file(ADMIN_SHAPEFILE_PATH)
+
+    results = {}
+    regressions = []
+    for name, spatial in CASES.items():
+        row = {}
+        for label, normalize in (("naive", False), ("normalized", True)):
+            start = time.perf_counter()
+            geometry = parse_cmr_spatial(normalize=normalize, **spatial)
+            row[f"{label}_rows"] = join_row_count(geometry, admin_gdf)
+            row[f"{label}_seconds"] = round(time.perf_counter() - start, 4)
+        results[name] = row
+
+        print(f"{name:>24}: {row['naive_rows']:>5} rows -> {row['normalized_rows']:>5} rows")
+        if row["normalized_rows"] > row["naive_rows"]:
+            regressions.append(name)
+
+    totals = {
+        "naive_rows": sum(r["naive_rows"] for r in results.values()),
+        "normalized_rows": sum(r["normalized_rows"] for r in results.values()),
+    }
+    print(f"{'total':>24}: {totals['naive_rows']:>5} rows -> {totals['normalized_rows']:>5} rows")
+
+    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
+        json.dump({"cases": results, "totals": totals}, f, indent=2)
+    print(f"Benchmark results saved to {OUTPUT_FILE}")
+
+    if regressions:
+        print(f"Join row count went up for: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
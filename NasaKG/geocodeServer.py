@@ -0,0 +1,102 @@
+import json
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from polygonToLoc import batch_reverse_geocode, load_admin_boundaries
+
+##############################
+#  CONFIG
+##############################
+HOST = "127.0.0.1"
+PORT = 8765
+ADMIN_SHAPEFILE_PATH = "NasaKG/boundaries/boundaries.shp"
+MAX_FOOTPRINTS = 50000  # per request
+LOG_REQUESTS = False    # print one access-log line per request
+
+
+class ReverseGeocodeHandler(BaseHTTPRequestHandler):
+    """
+    POST /reverse-geocode
+        {"footprints": [[lat, lon], [[lat, lon], [lat, lon], ...], ...]}
+    =>  {"results": [{"scope": ..., "cities": [...], ...}, ...]}
+
+    GET /health => {"status": "ok"}
+    """
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/reverse-geocode":
+            self._send_json(404, {"error": "not found"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError as e:
+            self._send_json(400, {"error": f"Invalid request body: {e}"})
+            return
+        footprints = request.get("footprints") if isinstance(request, dict) else None
+        if not isinstance(footprints, list):
+            self._send_json(400, {"error": 'Request body must be an object with a "footprints" list'})
+            return
+
+        if len(footprints) > MAX_FOOTPRINTS:
+            self._send_json(413, {"error": f"At most {MAX_FOOTPRINTS} footprints per request"})
+            return
+
+        try:
+            results = batch_reverse_geocode(footprints, self.server.admin_shapefile_path)
+        except (ValueError, TypeError, IndexError) as e:
+            # Malformed coordinates or polygons with too few vertices
+            self._send_json(422, {"error": f"Could not geocode footprints: {e}"})
+            return
+        except Exception:
+            self.log_error("Reverse geocoding failed:\n%s", traceback.format_exc())
+            self._send_json(500, {"error": "Internal error while geocoding footprints"})
+            return
+
+        self._send_json(200, {"results": results})
+
+    def log_message(self, format, *args):
+        # Access logging is off unless LOG_REQUESTS is set
+        if LOG_REQUESTS:
+            print(f"{self.address_string()} - {format % args}")
+
+    def log_error(self, format, *args):
+        # Errors are always printed, whatever LOG_REQUESTS says
+        print(f"{self.address_string()} - ERROR {format % args}")
+
+
+def serve(host=HOST, port=PORT, admin_shapefile_path=ADMIN_SHAPEFILE_PATH):
+    """
+    Load the admin boundaries (and their spatial index) up front,
+    then serve reverse-geocoding requests until interrupted.
+    """
+    load_admin_boundaries(admin_shapefile_path)
+
+    server = ThreadingHTTPServer((host, port), ReverseGeocodeHandler)
+    server.admin_shapefile_path = admin_shapefile_path
+    print(f"Reverse-geocoding service listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    serve()
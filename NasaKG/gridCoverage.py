@@ -0,0 +1,208 @@
+import json
+import os
+import time
+from functools import lru_cache
+
+import geopandas as gpd
+import pandas as pd
+import shapely
+from shapely.geometry import box
+
+##############################
+#  CONFIG
+##############################
+ADMIN_SHAPEFILE_PATH = "NasaKG/boundaries/boundaries.shp"
+COVERAGE_TABLE_PATH = "NasaKG/boundaries/grid_coverage.json"
+# Deepest level of the grid; level-L cells are 180 / 2**L degrees wide
+MAX_LEVEL = 9
+# Admin columns kept in the table (the ones classify_bbox_scope reads)
+AREA_COLUMNS = ["NAME_2", "ADMIN", "CONTINENT"]
+
+##############################
+#  (1) Grid Cells
+##############################
+# The globe is split into two 180x180 degree root cells, "0" (west) and
+# "1" (east). Each cell has four children named by appending a digit:
+# 0 = south-west, 1 = south-east, 2 = north-west, 3 = north-east.
+# So a cell id is a quadkey and its parent is simply cell_id[:-1].
+ROOT_CELLS = ["0", "1"]
+
+
+def cell_bounds(cell_id):
+    """Return (minx, miny, maxx, maxy) in lon/lat degrees for a cell id."""
+    minx = -180.0 if cell_id[0] == "0" else 0.0
+    miny = -90.0
+    size = 180.0
+    for digit in cell_id[1:]:
+        size /= 2
+        if digit in "13":
+            minx += size
+        if digit in "23":
+            miny += size
+    return minx, miny, minx + size, miny + size
+
+
+def cell_children(cell_id):
+    return [cell_id + digit for digit in "0123"]
+
+
+##############################
+#  (2) Offline Build
+##############################
+def build_coverage_table(admin_gdf, max_level=MAX_LEVEL):
+    """
+    Rasterize the admin layer into
+    {cell_id: [is_leaf, [admin positions], [partial positions]]}.
+
+    A cell lists every admin area intersecting it. Cells are only
+    subdivided while that answer can still change below them:
+      - cells no admin area touches are left out entirely
+      - cells covered by every one of their admin areas are leaves, since
+        all their descendants would list exactly the same areas
+      - everything else is split down to max_level
+    Leaves also list the areas that only partly cover them (only possible
+    at max_level); a footprint touching such a cell may still miss them.
+    """
+    admin_geoms = admin_gdf.geometry.to_numpy()
+    shapely.prepare(admin_geoms)
+
+    cells = {}
+    stack = []
+    for root in ROOT_CELLS:
+        candidates = admin_gdf.sindex.query(box(*cell_bounds(root)), predicate="intersects")
+        stack.append((root, candidates))
+
+    while stack:
+        cell_id, candidates = stack.pop()
+        if not len(candidates):
+            continue
+        cell_box = box(*cell_bounds(cell_id))
+        covering = shapely.covers(admin_geoms[candidates], cell_box)
+        is_leaf = len(cell_id) - 1 >= max_level or bool(covering.all())
+        partial = sorted(int(c) for c in candidates[~covering]) if is_leaf else []
+        cells[cell_id] = [is_leaf, sorted(int(c) for c in candidates), partial]
+        if is_leaf:
+            continue
+        for child in cell_children(cell_id):
+            child_box = box(*cell_bounds(child))
+            hits = shapely.intersects(admin_geoms[candidates], child_box)
+            stack.append((child, candidates[hits]))
+
+    return cells
+
+
+def save_coverage_table(cells, admin_gdf, max_level=MAX_LEVEL, path=COVERAGE_TABLE_PATH):
+    areas = admin_gdf[AREA_COLUMNS].to_dict(orient="list")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"max_level": max_level, "areas": areas, "cells": cells}, f)
+    print(f"Saved {len(cells)} grid cells to {path}")
+
+
+##############################
+#  (3) Lookup
+##############################
+class CoverageTable:
+    """
+    Read-only view of a saved coverage table.
+    'areas' is a DataFrame with the AREA_COLUMNS of every admin area,
+    indexed by the positions stored in the cells.
+
+    Areas that only partly cover a max-level cell are checked against the
+    admin geometries: pass them as 'admin_geoms' (aligned with the
+    positions) or give 'admin_shapefile_path' to read them on first use.
+    Without either, lookups may include areas just next to the footprint.
+    """
+
+    def __init__(self, data, admin_geoms=None, admin_shapefile_path=None):
+        self.max_level = data["max_level"]
+        self.areas = pd.DataFrame(data["areas"])
+        self.cells = data["cells"]
+        self.admin_shapefile_path = admin_shapefile_path
+        self._admin_geoms = admin_geoms
+
+    @property
+    def admin_geoms(self):
+        if self._admin_geoms is None and self.admin_shapefile_path:
+            geoms = gpd.read_file(self.admin_shapefile_path).geometry.to_numpy()
+            if len(geoms) != len(self.areas):
+                raise ValueError(
+                    f"{self.admin_shapefile_path} has {len(geoms)} areas but the coverage "
+                    f"table was built from {len(self.areas)}; rebuild the table"
+                )
+            shapely.prepare(geoms)
+            self._admin_geoms = geoms
+        return self._admin_geoms
+
+    def lookup(self, geometry):
+        """
+        Cover 'geometry' with grid cells and union their admin areas.
+        Areas partly covering a max-level cell the geometry touches are
+        kept only if they really intersect it (see the class docstring).
+        Returns the sorted admin positions.
+        """
+        shapely.prepare(geometry)
+        found = set()
+        maybe = set()
+        stack = list(ROOT_CELLS)
+        while stack:
+            cell_id = stack.pop()
+            entry = self.cells.get(cell_id)
+            if entry is None:
+                continue
+            cell_box = box(*cell_bounds(cell_id))
+            if not geometry.intersects(cell_box):
+                continue
+            is_leaf, positions = entry[0], entry[1]
+            if geometry.covers(cell_box):
+                found.update(positions)
+            elif is_leaf:
+                # Tables saved before partial lists were stored: check every area
+                partial = entry[2] if len(entry) > 2 else positions
+                found.update(set(positions).difference(partial))
+                maybe.update(partial)
+            else:
+                stack.extend(cell_children(cell_id))
+
+        maybe -= found
+        if maybe:
+            admin_geoms = self.admin_geoms
+            if admin_geoms is None:
+                found.update(maybe)
+            else:
+                maybe = sorted(maybe)
+                hits = shapely.intersects(admin_geoms[maybe], geometry)
+                found.update(p for p, hit in zip(maybe, hits) if hit)
+        return sorted(found)
+
+    def rows_for(self, geometry):
+        """Admin rows touched by 'geometry', ready for classify_bbox_scope()."""
+        return self.areas.iloc[self.lookup(geometry)]
+
+
+@lru_cache(maxsize=4)
+def _load_coverage_table(path, admin_shapefile_path, mtime_ns):
+    # mtime_ns is only part of the cache key: a rebuilt table is read again
+    with open(path, "r", encoding="utf-8") as f:
+        return CoverageTable(json.load(f), admin_shapefile_path=admin_shapefile_path)
+
+
+def load_coverage_table(path=COVERAGE_TABLE_PATH, admin_shapefile_path=ADMIN_SHAPEFILE_PATH):
+    """
+    The saved coverage table, read once per file version and shared.
+    Partial cells are refined against 'admin_shapefile_path' (None to skip).
+    """
+    return _load_coverage_table(path, admin_shapefile_path, os.stat(path).st_mtime_ns)
+
+
+def main():
+    admin_gdf = gpd.read_file(ADMIN_SHAPEFILE_PATH)
+
+    start = time.perf_counter()
+    cells = build_coverage_table(admin_gdf)
+    print(f"Built coverage table to level {MAX_LEVEL} in {time.perf_counter() - start:.1f}s")
+
+    save_coverage_table(cells, admin_gdf)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+import json
+import sys
+from array import array
+from collections.abc import Mapping, Sequence
+
+##############################
+#  Schema
+##############################
+# Output layout of each NASAClimateKG class: (output key, backing column).
+# TemporalExtent and Duration read the same columns as SpatialExtent,
+# so those values are stored once per dataset instead of twice.
+CLASS_FIELDS = {
+    "Dataset": (("short_name", "short_name"), ("title", "title"), ("links", "links")),
+    "DataCategory": (("summary", "summary"),),
+    "DataFormat": (("original_format", "original_format"),),
+    "LocationCategory": (("category", "category"),),
+    "SpatialExtent": (
+        ("boxes", "boxes"),
+        ("polygons", "polygons"),
+        ("points", "points"),
+        ("place_names", "place_names"),
+        ("time_start", "time_start"),
+        ("time_end", "time_end"),
+        ("duration_days", "duration_days"),
+    ),
+    "Station": (("platforms", "platforms"),),
+    "Relationship": (),
+    "TemporalExtent": (("start_time", "time_start"), ("end_time", "time_end")),
+    "Duration": (("days", "duration_days"),),
+}
+
+# Placeholder relationship lists, identical for every dataset
+RELATIONSHIP_KEYS = ("hasDataCategory", "hasDataFormat", "definesPeriodFor")
+
+# Columns stored as plain lists ('category' is kept as codes, see below)
+LIST_COLUMNS = (
+    "short_name", "title", "links", "summary", "original_format",
+    "boxes", "polygons", "points", "place_names",
+    "time_start", "time_end", "duration_days", "platforms",
+)
+
+EMPTY = ()
+
+
+def _intern(value):
+    """Share one string object between every dataset holding the same value."""
+    if isinstance(value, str):
+        return sys.intern(value)
+    return value
+
+
+##############################
+#  Column Store
+##############################
+class KGRecordTable:
+    """
+    Struct-of-arrays store for the nine NASAClimateKG classes.
+
+    Each field is one column with a slot per dataset, and repeated strings
+    are interned. The per-class dicts exist only while something reads
+    them, through original_view() and individual_view(); they are built
+    fresh on every access, so changes go through set_location(), not
+    through the returned records.
+    """
+
+    def __init__(self):
+        self.columns = {name: [] for name in LIST_COLUMNS}
+        # Location categories are a handful of labels: one byte per dataset
+        self.category_codes = array("B")
+        self.categories = [None]
+        self._category_index = {None: 0}
+
+    def __len__(self):
+        return len(self.category_codes)
+
+    def append(self, entry, duration_days=None):
+        """Add one CMR entry and return its dataset index."""
+        cols = self.columns
+        cols["short_name"].append(_intern(entry.get("short_name", "N/A")))
+        cols["title"].append(entry.get("title", "N/A"))
+        cols["links"].append(entry.get("links") or EMPTY)
+        cols["summary"].append(entry.get("summary", "N/A"))
+        cols["original_format"].append(_intern(entry.get("original_format", "N/A")))
+        cols["boxes"].append(entry.get("boxes") or EMPTY)
+        cols["polygons"].append(entry.get("polygons") or EMPTY)
+        cols["points"].append(entry.get("points") or EMPTY)
+        cols["place_names"].append(EMPTY)
+        cols["time_start"].append(_intern(entry.get("time_start")))
+        cols["time_end"].append(_intern(entry.get("time_end")))
+        cols["duration_days"].append(duration_days)
+        cols["platforms"].append(
+            tuple(_intern(p) for p in entry["platforms"]) if entry.get("platforms") else EMPTY
+        )
+        self.category_codes.append(0)
+        return len(self.category_codes) - 1
+
+    def set_location(self, index, category, place_names=EMPTY):
+        """Record the LocationCategory and place names of one dataset."""
+        code = self._category_index.get(category)
+        if code is None:
+            code = len(self.categories)
+            self.categories.append(category)
+            self._category_index[category] = code
+        self.category_codes[index] = code
+        self.columns["place_names"][index] = tuple(_intern(name) for name in place_names)
+
+    def value(self, column, index):
+        if column == "category":
+            return self.categories[self.category_codes[index]]
+        return self.columns[column][index]
+
+    def record(self, class_name, index):
+        """Build the dict for one class of one dataset."""
+        if class_name == "Relationship":
+            return {key: [] for key in RELATIONSHIP_KEYS}
+        return {key: self.value(column, index) for key, column in CLASS_FIELDS[class_name]}
+
+    def original_view(self):
+        """{class name: [record, ...]} -- the parallel-lists format."""
+        return _OriginalView(self)
+
+    def individual_view(self):
+        """[{class name: record, ...}, ...] -- one entry per dataset."""
+        return _IndividualView(self)
+
+
+##############################
+#  Views
+##############################
+# Read-only sequences/mappings over the columns. They hold no data
+# themselves: records are built one at a time as they are read, so the
+# output files can be streamed straight from the columns with write_json().
+class _ClassView(Sequence):
+    def __init__(self, table, class_name):
+        self._table = table
+        self._class_name = class_name
+
+    def __len__(self):
+        return len(self._table)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(len(self._table))[index]]
+        return self._table.record(self._class_name, range(len(self._table))[index])
+
+    def __iter__(self):
+        for index in range(len(self._table)):
+            yield self._table.record(self._class_name, index)
+
+    def __repr__(self):
+        return f"<{self._class_name} records: {len(self)}>"
+
+
+class _IndividualView(Sequence):
+    def __init__(self, table):
+        self._table = table
+
+    def __len__(self):
+        return len(self._table)
+
+    def _record(self, index):
+        return {name: self._table.record(name, index) for name in CLASS_FIELDS}
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._record(i) for i in range(len(self._table))[index]]
+        return self._record(range(len(self._table))[index])
+
+    def __iter__(self):
+        for index in range(len(self._table)):
+            yield self._record(index)
+
+    def __repr__(self):
+        return f"<individual records: {len(self)}>"
+
+
+class _OriginalView(Mapping):
+    def __init__(self, table):
+        self._views = {name: _ClassView(table, name) for name in CLASS_FIELDS}
+
+    def __getitem__(self, class_name):
+        return self._views[class_name]
+
+    def __iter__(self):
+        return iter(self._views)
+
+    def __len__(self):
+        return len(self._views)
+
+    def __repr__(self):
+        return f"<classes: {list(self._views)}>"
+
+
+_VIEWS = (_ClassView, _IndividualView, _OriginalView)
+
+
+##############################
+#  JSON Output
+##############################
+def iter_json(value, indent=None, _level=0):
+    """
+    Yield the JSON text of 'value' piece by piece, formatted like
+    json.dump(value, indent=indent). Views are encoded one record at a
+    time; everything else goes through json.dumps.
+    """
+    if not isinstance(value, _VIEWS):
+        text = json.dumps(value, indent=indent)
+        if indent is not None:
+            text = text.replace("\n", "\n" + " " * (indent * _level))
+        yield text
+        return
+
+    is_mapping = isinstance(value, Mapping)
+    items = value.items() if is_mapping else ((None, item) for item in value)
+    opening, closing = ("{", "}") if is_mapping else ("[", "]")
+    if indent is None:
+        separator, inner, outer = ", ", "", ""
+    else:
+        inner = "\n" + " " * (indent * (_level + 1))
+        outer = "\n" + " " * (indent * _level)
+        separator = "," + inner
+
+    yield opening
+    first = True
+    for key, item in items:
+        yield inner if first else separator
+        first = False
+        if is_mapping:
+            yield json.dumps(key) + ": "
+        yield from iter_json(item, indent, _level + 1)
+    yield closing if first else outer + closing
+
+
+def write_json(value, f, indent=None):
+    """Stream 'value' (a view or plain JSON data) to the open file 'f'."""
+    for chunk in iter_json(value, indent):
+        f.write(chunk)
+
+
+if __name__ == "__main__":
+    # Rough memory comparison against one dict per class per dataset
+    import tracemalloc
+
+    def fake_entry(i):
+        return {
+            "short_name": f"DS_{i % 500}",
+            "title": f"Dataset {i}",
+            "summary": f"Summary of dataset {i}",
+            "original_format": "ISO19115",
+            "time_start": "1998-01-01T00:00:00.000Z",
+            "time_end": "2020-12-31T23:59:59.999Z",
+            "platforms": ["Terra", "Aqua"],
+        }
+
+    entries = [fake_entry(i) for i in range(20000)]
+
+    tracemalloc.start()
+    fan_out = []
+    for entry in entries:
+        record = {
+            "Dataset": {"short_name": entry["short_name"], "title": entry["title"], "links": []},
+            "DataCategory": {"summary": entry["summary"]},
+            "DataFormat": {"original_format": entry["original_format"]},
+            "LocationCategory": {"category": "city"},
+            "SpatialExtent": {
+                "boxes": [], "polygons": [], "points": [], "place_names": [],
+                "time_start": entry["time_start"], "time_end": entry["time_end"],
+                "duration_days": 8400,
+            },
+            "Station": {"platforms": entry["platforms"]},
+            "Relationship": {key: [] for key in RELATIONSHIP_KEYS},
+            "TemporalExtent": {"start_time": entry["time_start"], "end_time": entry["time_end"]},
+            "Duration": {"days": 8400},
+        }
+        fan_out.append(record)
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    del fan_out
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    table = KGRecordTable()
+    for entry in entries:
+        table.set_location(table.append(entry, 8400), "city")
+    table_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    print(f"dict fan-out: {dict_bytes / len(entries):.0f} bytes/dataset")
+    print(f"column store: {table_bytes / len(entries):.0f} bytes/dataset")
@@ -1,6 +1,9 @@
 import geopandas as gpd
 import json
-from shapely.geometry import Polygon
+from functools import lru_cache
+from shapely.geometry import Point, Polygon
+
+from simplifyBoundaries import get_boundary_levels, two_phase_join
 
 def polygon_coordinates_to_shapely(nasa_polygon_coords):
     """Convert lat/lon pairs into a Shapely Polygon."""
@@ -9,12 +12,42 @@ def polygon_coordinates_to_shapely(nasa_polygon_coords):
     shapely_coords = [(lon, lat) for (lat, lon) in nasa_polygon_coords]
     return Polygon(shapely_coords)
 
+def coordinates_to_shapely(coords):
+    """
+    Convert one footprint into a Shapely geometry:
+      - a single (lat, lon) pair => Point
+      - a list of (lat, lon) pairs => Polygon
+    """
+    if len(coords) == 2 and all(isinstance(c, (int, float)) for c in coords):
+        lat, lon = coords
+        return Point(lon, lat)
+    # Copy so the caller's list isn't closed in place
+    return polygon_coordinates_to_shapely([tuple(pair) for pair in coords])
+
+@lru_cache(maxsize=4)
+def _cached_admin_boundaries(admin_shapefile_path):
+    """
+    Read the admin shapefile once per path and keep it in memory,
+    with its spatial index already built for predicate queries.
+    Shared by every caller, so it must only be read, never modified.
+    """
+    admin_gdf = gpd.read_file(admin_shapefile_path)
+    admin_gdf.sindex  # build the STRtree now rather than on the first query
+    return admin_gdf
+
+def load_admin_boundaries(admin_shapefile_path):
+    """
+    The admin boundaries for 'admin_shapefile_path', read once per path.
+    Returns a copy, so callers are free to modify it.
+    """
+    return _cached_admin_boundaries(admin_shapefile_path).copy()
+
 def find_admin_areas_for_polygon(nasa_poly, admin_shapefile_path):
     """
     Intersect the NASA polygon with a shapefile that (ideally) includes
     city/country/continent boundaries, returning a GeoDataFrame of matches.
     """
-    admin_gdf = gpd.read_file(admin_shapefile_path)
+    admin_gdf = _cached_admin_boundaries(admin_shapefile_path)
     nasa_poly_gdf = gpd.GeoDataFrame(index=[0], crs=admin_gdf.crs, geometry=[nasa_poly])
     intersected = gpd.overlay(nasa_poly_gdf, admin_gdf, how='intersection')
     return intersected
@@ -75,6 +108,38 @@ def classify_bbox_scope(intersected_gdf):
         'continents': list(continents)
     }
 
+def batch_find_admin_areas(geometries, admin_shapefile_path, predicate="intersects"):
+    """
+    Match many geometries against the admin boundaries with a single
+    spatial index query instead of one overlay per geometry.
+    'intersects' goes through the simplified-boundary two-phase join.
+    Returns, for each input geometry, the positional row indices of the
+    admin areas satisfying the predicate.
+    """
+    admin_gdf = _cached_admin_boundaries(admin_shapefile_path)
+    query_geoms = gpd.GeoSeries(list(geometries), crs=admin_gdf.crs)
+    if predicate == "intersects":
+        levels = get_boundary_levels(admin_shapefile_path)
+        input_idx, admin_idx = two_phase_join(query_geoms.to_numpy(), admin_gdf, levels)
+    else:
+        input_idx, admin_idx = admin_gdf.sindex.query(query_geoms, predicate=predicate)
+
+    matches = [[] for _ in range(len(query_geoms))]
+    for i, j in zip(input_idx, admin_idx):
+        matches[i].append(int(j))
+    return matches
+
+def batch_reverse_geocode(footprints, admin_shapefile_path):
+    """
+    Reverse-geocode a batch of footprints, each one a (lat, lon) point or a
+    list of (lat, lon) polygon vertices.
+    Returns one classify_bbox_scope() result per footprint, in input order.
+    """
+    admin_gdf = _cached_admin_boundaries(admin_shapefile_path)
+    geometries = [coordinates_to_shapely(coords) for coords in footprints]
+    matches = batch_find_admin_areas(geometries, admin_shapefile_path)
+    return [classify_bbox_scope(admin_gdf.iloc[sorted(rows)]) for rows in matches]
+
 def save_results_to_json(result_gdf, classification_info, output_file="admin_intersections.json"):
     """
     - Add bounding box scope classification to each row in the GeoDataFrame.
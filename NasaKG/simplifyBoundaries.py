@@ -0,0 +1,178 @@
+import json
+import os
+from collections import namedtuple
+from functools import lru_cache
+
+import geopandas as gpd
+import numpy as np
+import shapely
+
+##############################
+#  CONFIG
+##############################
+ADMIN_SHAPEFILE_PATH = "NasaKG/boundaries/boundaries.shp"
+SIMPLIFIED_PATH = "NasaKG/boundaries/boundaries_simplified.gpkg"
+# Simplification tolerances in degrees, coarsest first
+TOLERANCES = (0.5, 0.05)
+
+# One resolution level: 'outer' always covers each admin polygon,
+# 'inner' always lies inside it. Both are numpy arrays aligned with admin rows.
+BoundaryLevel = namedtuple("BoundaryLevel", ["tolerance", "inner", "outer"])
+
+
+##############################
+#  (1) Preprocessing
+##############################
+def build_simplified_boundaries(admin_gdf, tolerances=TOLERANCES):
+    """
+    Build a pair of low-vertex copies of every admin polygon per tolerance t.
+
+    Simplifying by t moves the boundary by at most t, so growing (or
+    shrinking) by 2t first gives shapes that are guaranteed to contain
+    (or be contained in) the original polygon:
+      - outer = buffer(+2t).simplify(t)
+      - inner = buffer(-2t).simplify(t)   (may be empty for small areas)
+    """
+    geoms = admin_gdf.geometry.to_numpy()
+    levels = []
+    for t in sorted(tolerances, reverse=True):
+        outer = shapely.simplify(shapely.buffer(geoms, 2 * t), t)
+        inner = shapely.simplify(shapely.buffer(geoms, -2 * t), t)
+        levels.append(BoundaryLevel(t, inner, outer))
+    return levels
+
+
+def source_fingerprint(admin_shapefile_path, tolerances=TOLERANCES):
+    """What the simplified copies were built from: the shapefile's path, size and mtime."""
+    stat = os.stat(admin_shapefile_path)
+    return {
+        "source": os.path.abspath(admin_shapefile_path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "tolerances": sorted(tolerances, reverse=True),
+    }
+
+
+def _fingerprint_path(path):
+    return path + ".source"
+
+
+def save_simplified_boundaries(levels, crs, path=SIMPLIFIED_PATH, fingerprint=None):
+    """
+    Write each level as an 'inner_<t>' / 'outer_<t>' layer of one GeoPackage,
+    and the source fingerprint next to it so stale copies can be detected.
+    """
+    for level in levels:
+        for kind in ("inner", "outer"):
+            layer = gpd.GeoDataFrame(geometry=getattr(level, kind), crs=crs)
+            layer.to_file(path, layer=f"{kind}_{level.tolerance}", driver="GPKG")
+    if fingerprint is not None:
+        with open(_fingerprint_path(path), "w", encoding="utf-8") as f:
+            json.dump(fingerprint, f)
+    print(f"Saved {len(levels)} simplified boundary levels to {path}")
+
+
+def simplified_is_current(admin_shapefile_path, path=SIMPLIFIED_PATH, tolerances=TOLERANCES):
+    """True if 'path' holds simplified copies of this exact version of the shapefile."""
+    if not os.path.exists(path):
+        return False
+    try:
+        with open(_fingerprint_path(path), encoding="utf-8") as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return saved == source_fingerprint(admin_shapefile_path, tolerances)
+
+
+def load_simplified_boundaries(path=SIMPLIFIED_PATH, tolerances=TOLERANCES):
+    """Read back the layers written by save_simplified_boundaries()."""
+    levels = []
+    for t in sorted(tolerances, reverse=True):
+        inner = gpd.read_file(path, layer=f"inner_{t}").geometry.to_numpy()
+        outer = gpd.read_file(path, layer=f"outer_{t}").geometry.to_numpy()
+        levels.append(BoundaryLevel(t, inner, outer))
+    return levels
+
+
+@lru_cache(maxsize=4)
+def _boundary_levels(admin_shapefile_path, simplified_path, size, mtime_ns):
+    # size / mtime_ns are only part of the cache key: a changed shapefile is a new entry
+    if simplified_is_current(admin_shapefile_path, simplified_path):
+        return load_simplified_boundaries(simplified_path)
+    admin_gdf = gpd.read_file(admin_shapefile_path)
+    return build_simplified_boundaries(admin_gdf)
+
+
+def get_boundary_levels(admin_shapefile_path, simplified_path=SIMPLIFIED_PATH):
+    """
+    Simplified levels for a shapefile: read from the preprocessed GeoPackage
+    when it was built from this same shapefile (path, size and mtime match),
+    otherwise built in memory. Cached per shapefile version.
+    """
+    stat = os.stat(admin_shapefile_path)
+    return _boundary_levels(os.path.abspath(admin_shapefile_path), simplified_path,
+                            stat.st_size, stat.st_mtime_ns)
+
+
+##############################
+#  (2) Two-Phase Join
+##############################
+def two_phase_join(query_geoms, admin_gdf, levels):
+    """
+    Find every (query, admin) pair whose geometries intersect -- the same
+    pairs gpd.sjoin(..., predicate="intersects") would return -- while
+    touching full-resolution coastlines as rarely as possible.
+
+    Bounding-box candidates are settled on the coarsest level that can decide
+    them: a hit on 'inner' is a sure match, a miss on 'outer' a sure non-match.
+    Only pairs left undecided after the finest level get the exact test.
+    Returns (query_positions, admin_positions), sorted.
+    """
+    query_geoms = np.asarray(query_geoms, dtype=object)
+    admin_geoms = admin_gdf.geometry.to_numpy()
+
+    left, right = admin_gdf.sindex.query(query_geoms)
+    hit = np.zeros(len(left), dtype=bool)
+    undecided = np.ones(len(left), dtype=bool)
+
+    for level in levels:
+        idx = np.flatnonzero(undecided)
+        if not len(idx):
+            break
+        q = query_geoms[left[idx]]
+        miss = ~shapely.intersects(q, level.outer[right[idx]])
+        sure = ~miss & shapely.intersects(q, level.inner[right[idx]])
+        hit[idx[sure]] = True
+        undecided[idx[miss | sure]] = False
+
+    # Exact check only for the borderline pairs
+    idx = np.flatnonzero(undecided)
+    if len(idx):
+        hit[idx] = shapely.intersects(query_geoms[left[idx]], admin_geoms[right[idx]])
+
+    left, right = left[hit], right[hit]
+    order = np.lexsort((right, left))
+    return left[order], right[order]
+
+
+def main():
+    admin_gdf = gpd.read_file(ADMIN_SHAPEFILE_PATH)
+    levels = build_simplified_boundaries(admin_gdf)
+
+    full_vertices = shapely.get_num_coordinates(admin_gdf.geometry.to_numpy()).sum()
+    print(f"Full resolution: {full_vertices} vertices")
+    for level in levels:
+        print(
+            f"Tolerance {level.tolerance}: "
+            f"outer {shapely.get_num_coordinates(level.outer).sum()} vertices, "
+            f"inner {shapely.get_num_coordinates(level.inner).sum()} vertices"
+        )
+
+    if os.path.exists(SIMPLIFIED_PATH):
+        os.remove(SIMPLIFIED_PATH)
+    save_simplified_boundaries(levels, admin_gdf.crs,
+                               fingerprint=source_fingerprint(ADMIN_SHAPEFILE_PATH))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import pytest
+
+from NasaDataAPI import normalize_ring, parse_cmr_spatial
+
+
+def test_ring_around_south_pole_keeps_whole_cap():
+    # Lat -60 all the way around the globe: the cap below it is 360 x 30 degrees
+    ring = [(0, -60), (90, -60), (180, -60), (-90, -60), (0, -60)]
+    cap = normalize_ring(ring)
+    assert cap.area == pytest.approx(360 * 30)
+    assert cap.bounds == pytest.approx((-180, -90, 180, -60))
+
+
+def test_ring_around_north_pole_from_cmr_polygon():
+    # CMR polygons are "lat lon" pairs, here wound the other way round
+    geom = parse_cmr_spatial(polygons=[["70 0 70 -90 70 180 70 90 70 0"]])
+    assert geom.area == pytest.approx(360 * 20)
+    assert geom.bounds == pytest.approx((-180, 70, 180, 90))
+
+
+def test_antimeridian_box_is_split_in_two():
+    geom = parse_cmr_spatial(boxes=["-10 170 10 -170"])
+    assert geom.geom_type == "MultiPolygon"
+    assert geom.area == pytest.approx(20 * 20)
+
+
+def test_antimeridian_ring_is_split_not_inverted():
+    ring = [(170, -10), (-170, -10), (-170, 10), (170, 10), (170, -10)]
+    geom = normalize_ring(ring)
+    assert geom.area == pytest.approx(20 * 20)
+    assert geom.bounds == pytest.approx((-180, -10, 180, 10))
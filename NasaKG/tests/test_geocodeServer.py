@@ -0,0 +1,97 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import geopandas as gpd
+import pytest
+from shapely.geometry import box
+
+import geocodeServer
+from polygonToLoc import batch_find_admin_areas, batch_reverse_geocode, coordinates_to_shapely
+
+
+@pytest.fixture(scope="module")
+def admin_shapefile(tmp_path_factory):
+    # Two cities of country A, one city of country B on the same continent, one island elsewhere
+    admin_gdf = gpd.GeoDataFrame(
+        {
+            "NAME_2": ["West", "East", "North", "Island"],
+            "ADMIN": ["A", "A", "B", "C"],
+            "CONTINENT": ["X", "X", "X", "Y"],
+        },
+        geometry=[box(0, 0, 1, 1), box(1, 0, 2, 1), box(0, 1, 2, 2), box(40, 40, 41, 41)],
+        crs="EPSG:4326",
+    )
+    path = tmp_path_factory.mktemp("boundaries") / "boundaries.shp"
+    admin_gdf.to_file(path)
+    return str(path)
+
+
+def test_batch_find_admin_areas_points_and_polygons(admin_shapefile):
+    footprints = [
+        (0.5, 0.5),                                 # (lat, lon) point in West
+        [(0.2, 0.2), (0.2, 1.5), (0.8, 1.5)],       # triangle across West and East
+        (50.0, 50.0),                               # nowhere
+    ]
+    matches = batch_find_admin_areas([coordinates_to_shapely(f) for f in footprints], admin_shapefile)
+    assert [sorted(m) for m in matches] == [[0], [0, 1], []]
+
+
+def test_batch_reverse_geocode_scopes(admin_shapefile):
+    results = batch_reverse_geocode([
+        [0.5, 0.5],
+        [[0.2, 0.2], [0.2, 1.5], [0.8, 1.5]],
+        [[0.5, 0.5], [1.5, 0.5], [1.5, 1.5]],
+        [[0.5, 0.5], [40.5, 40.5], [0.5, 40.5]],
+    ], admin_shapefile)
+    assert [r["scope"] for r in results] == ["city", "country", "continent", "global"]
+    assert results[0]["cities"] == ["West"]
+    assert sorted(results[1]["cities"]) == ["East", "West"]
+
+
+@pytest.fixture(scope="module")
+def server(admin_shapefile):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), geocodeServer.ReverseGeocodeHandler)
+    server.admin_shapefile_path = admin_shapefile
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def post(url, body):
+    data = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+    request = urllib.request.Request(f"{url}/reverse-geocode", data=data, method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def test_endpoint_geocodes_footprints(server):
+    status, payload = post(server, {"footprints": [[0.5, 0.5], [[0.2, 0.2], [0.2, 1.5], [0.8, 1.5]]]})
+    assert status == 200
+    assert [r["scope"] for r in payload["results"]] == ["city", "country"]
+
+
+@pytest.mark.parametrize("body", [b"not json", [1, 2], {"footprints": 5}, {"points": []}, "text"])
+def test_malformed_body_is_400(server, body):
+    status, payload = post(server, body)
+    assert status == 400
+    assert "error" in payload
+
+
+def test_too_many_footprints_is_413(server, monkeypatch):
+    monkeypatch.setattr(geocodeServer, "MAX_FOOTPRINTS", 2)
+    status, _ = post(server, {"footprints": [[0.5, 0.5]] * 3})
+    assert status == 413
+
+
+@pytest.mark.parametrize("footprint", [[[0.5, 0.5]], "abc", [[0.5, "x"], [1, 1], [1, 0]]])
+def test_unusable_footprint_is_422(server, footprint):
+    status, _ = post(server, {"footprints": [footprint]})
+    assert status == 422
@@ -0,0 +1,51 @@
+import geopandas as gpd
+import numpy as np
+import pytest
+import shapely
+from shapely.geometry import box
+
+from gridCoverage import CoverageTable, build_coverage_table
+
+
+@pytest.fixture(scope="module")
+def admin_gdf():
+    return gpd.GeoDataFrame(
+        {
+            "NAME_2": ["West", "East", "Island"],
+            "ADMIN": ["A", "B", "C"],
+            "CONTINENT": ["X", "X", "Y"],
+        },
+        geometry=[box(0, 0, 1, 1), box(1, 0, 2, 1), box(40, 40, 41.3, 41.3)],
+        crs="EPSG:4326",
+    )
+
+
+def table_for(admin_gdf, **kwargs):
+    cells = build_coverage_table(admin_gdf, max_level=7)
+    data = {"max_level": 7, "areas": admin_gdf[["NAME_2", "ADMIN", "CONTINENT"]].to_dict(orient="list"),
+            "cells": cells}
+    return CoverageTable(data, **kwargs)
+
+
+def test_partial_boundary_cell_is_refined(admin_gdf):
+    table = table_for(admin_gdf, admin_geoms=admin_gdf.geometry.to_numpy())
+    # Shares a max-level cell with the East area but doesn't reach it
+    assert table.lookup(box(0.9, 0.2, 0.95, 0.5)) == [0]
+    assert table.lookup(box(0.9, 0.2, 1.05, 0.5)) == [0, 1]
+
+
+def test_lookup_matches_exact_intersects(admin_gdf):
+    admin_geoms = admin_gdf.geometry.to_numpy()
+    table = table_for(admin_gdf, admin_geoms=admin_geoms)
+    rng = np.random.default_rng(0)
+    for _ in range(300):
+        x, y = rng.uniform(-1, 43, 2)
+        w, h = rng.uniform(0.01, 3, 2)
+        footprint = box(x, y, x + w, y + h)
+        expected = list(np.flatnonzero(shapely.intersects(admin_geoms, footprint)))
+        assert table.lookup(footprint) == expected
+
+
+def test_without_geometries_partial_cells_over_match(admin_gdf):
+    table = table_for(admin_gdf)
+    assert table.lookup(box(0.9, 0.2, 0.95, 0.5)) == [0, 1]
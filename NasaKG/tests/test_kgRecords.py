@@ -0,0 +1,55 @@
+import io
+import json
+
+import pytest
+
+from kgRecords import CLASS_FIELDS, KGRecordTable, write_json
+
+
+@pytest.fixture
+def table():
+    table = KGRecordTable()
+    for i in range(3):
+        idx = table.append({
+            "short_name": f"DS_{i}",
+            "title": f"Dataset é {i}",
+            "platforms": ["Terra", "Aqua"],
+            "time_start": "1998-01-01T00:00:00.000Z",
+        }, duration_days=i)
+        table.set_location(idx, "city", ["Paris"])
+    return table
+
+
+def materialize(value):
+    if isinstance(value, dict) or hasattr(value, "items"):
+        return {key: materialize(item) for key, item in value.items()}
+    return [item for item in value]
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_write_json_matches_json_dump(table, indent):
+    for view in (table.original_view(), table.individual_view()):
+        out = io.StringIO()
+        write_json(view, out, indent=indent)
+        assert out.getvalue() == json.dumps(materialize(view), indent=indent)
+
+
+def test_empty_table_writes_empty_containers():
+    table = KGRecordTable()
+    out = io.StringIO()
+    write_json(table.original_view(), out, indent=2)
+    assert json.loads(out.getvalue()) == {name: [] for name in CLASS_FIELDS}
+    out = io.StringIO()
+    write_json(table.individual_view(), out, indent=2)
+    assert out.getvalue() == "[]"
+
+
+def test_views_do_not_pose_as_empty_lists(table):
+    records = table.individual_view()
+    assert records != []
+    assert not isinstance(records, list)
+    assert len(records[:2]) == 2
+    assert records[-1]["Duration"] == {"days": 2}
+    assert table.original_view()["LocationCategory"][0] == {"category": "city"}
+    with pytest.raises(TypeError):
+        records[0] = {}
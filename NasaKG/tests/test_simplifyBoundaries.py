@@ -0,0 +1,88 @@
+import geopandas as gpd
+import numpy as np
+import pytest
+import shapely
+from shapely.geometry import Polygon, box
+
+from polygonToLoc import batch_find_admin_areas, classify_bbox_scope, find_admin_areas_for_polygon
+from simplifyBoundaries import build_simplified_boundaries, two_phase_join
+
+
+@pytest.fixture(scope="module")
+def admin_gdf():
+    # Irregular shapes, so bounding boxes catch many pairs that don't intersect
+    return gpd.GeoDataFrame(
+        {
+            "NAME_2": ["Wedge", "Ell", "Comb", "Islet"],
+            "ADMIN": ["A", "A", "B", "C"],
+            "CONTINENT": ["X", "X", "X", "Y"],
+        },
+        geometry=[
+            Polygon([(0, 0), (10, 0), (0, 10)]),
+            Polygon([(11, 0), (20, 0), (20, 3), (14, 3), (14, 10), (11, 10)]),
+            Polygon([(0, 12), (20, 12), (20, 20), (17, 20), (17, 14), (13, 14), (13, 20),
+                     (7, 20), (7, 14), (3, 14), (3, 20), (0, 20)]),
+            box(30, 30, 30.3, 30.3),
+        ],
+        crs="EPSG:4326",
+    )
+
+
+def random_boxes(n, seed=0):
+    rng = np.random.default_rng(seed)
+    x, y = rng.uniform(-2, 32, n), rng.uniform(-2, 32, n)
+    w, h = rng.uniform(0.01, 4, n), rng.uniform(0.01, 4, n)
+    return shapely.box(x, y, x + w, y + h)
+
+
+def sjoin_pairs(query_geoms, admin_gdf):
+    queries = gpd.GeoDataFrame(geometry=list(query_geoms), crs=admin_gdf.crs)
+    joined = gpd.sjoin(queries, admin_gdf, predicate="intersects")
+    return sorted(zip(joined.index, joined["index_right"]))
+
+
+def test_two_phase_join_returns_the_sjoin_pairs(admin_gdf):
+    levels = build_simplified_boundaries(admin_gdf, tolerances=(0.5, 0.05))
+    queries = random_boxes(400)
+
+    left, right = two_phase_join(queries, admin_gdf, levels)
+    assert list(zip(left.tolist(), right.tolist())) == sjoin_pairs(queries, admin_gdf)
+
+    # The inputs reach every outcome: sure hits, sure misses and exact checks
+    finest = levels[-1]
+    cand_left, cand_right = admin_gdf.sindex.query(queries)
+    q = queries[cand_left]
+    sure_hit = shapely.intersects(q, finest.inner[cand_right])
+    sure_miss = ~shapely.intersects(q, finest.outer[cand_right])
+    borderline = ~sure_hit & ~sure_miss
+    exact = shapely.intersects(q, admin_gdf.geometry.to_numpy()[cand_right])
+    assert sure_hit.any() and sure_miss.any()
+    assert (borderline & exact).any() and (borderline & ~exact).any()
+
+
+def test_two_phase_join_with_points_and_empty_inner(admin_gdf):
+    # Islet is narrower than 4 * 0.5 degrees, so its coarse inner shape is empty
+    levels = build_simplified_boundaries(admin_gdf, tolerances=(0.5,))
+    assert shapely.is_empty(levels[0].inner[3])
+    queries = shapely.points([1, 9, 30.1, 30.5, 15], [1, 9, 30.1, 30.5, 13])
+    left, right = two_phase_join(queries, admin_gdf, levels)
+    assert list(zip(left.tolist(), right.tolist())) == sjoin_pairs(queries, admin_gdf)
+
+
+def test_batch_classification_matches_overlay(admin_gdf, tmp_path):
+    path = str(tmp_path / "boundaries.shp")
+    admin_gdf.to_file(path)
+    # Random boxes, plus ones spanning two cities, two countries and two continents
+    queries = list(random_boxes(60, seed=1)) + [
+        box(8, 0.5, 12, 1.5), box(12, 9, 16, 13), box(18, 18, 31, 31),
+    ]
+    matches = batch_find_admin_areas(queries, path)
+    scopes = set()
+    for query, rows in zip(queries, matches):
+        batch = classify_bbox_scope(admin_gdf.iloc[sorted(rows)])
+        overlay = classify_bbox_scope(find_admin_areas_for_polygon(query, path))
+        assert batch["scope"] == overlay["scope"]
+        scopes.add(batch["scope"])
+        for key in ("cities", "countries", "continents"):
+            assert sorted(batch[key]) == sorted(overlay[key])
+    assert scopes == {"unclassified", "city", "country", "continent", "global"}
@@ -0,0 +1,159 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import requests
+
+# ------------------------------------------------------------------------
+# Settings
+# ------------------------------------------------------------------------
+COHERE_EMBED_URL = "https://api.cohere.com/v1/embed"
+# Same model as leapData's text2vec-cohere vectorizer
+EMBED_MODEL = "embed-multilingual-v3.0"
+EMBED_TIMEOUT = 10              # seconds
+SIMILARITY_THRESHOLD = 0.95     # cosine similarity that counts as the same question
+TTL_SECONDS = 24 * 3600         # answers older than this are asked again
+MAX_ENTRIES = 1000              # least recently used answers are evicted past this
+COLLECTION_CHECK_INTERVAL = 60  # seconds between checks for a changed collection
+
+
+def cohere_embedder(api_key, model=EMBED_MODEL, url=COHERE_EMBED_URL, session=None):
+    """An embed(text) -> vector function backed by Cohere's embed endpoint."""
+    session = session or requests.Session()
+
+    def embed(text):
+        response = session.post(
+            url,
+            headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
+            json={"model": model, "texts": [text], "input_type": "search_query"},
+            timeout=EMBED_TIMEOUT,
+        )
+        response.raise_for_status()
+        return response.json()["embeddings"][0]
+
+    return embed
+
+
+def collection_fingerprint(collection):
+    """
+    A value that changes when 'collection' is re-ingested: the ingest
+    version addObjects.py writes into the collection's description, plus
+    the object count for changes made some other way.
+    """
+    description = collection.config.get().description
+    total = collection.aggregate.over_all(total_count=True).total_count
+    return description, total
+
+
+# ------------------------------------------------------------------------
+# Cache
+# ------------------------------------------------------------------------
+class AnswerCache:
+    """
+    Answers keyed by the embedding of the question. A new question reuses
+    the answer of the most similar cached one (cosine >= threshold) asked
+    with the same 'key' (the model and the search and context settings),
+    so a rephrased repeat costs one embedding call and a matrix-vector
+    product instead of two LLM calls and a search.
+    - Entries expire after ttl seconds and the least recently used ones
+      are evicted past max_entries.
+    - With a 'fingerprint' callable (e.g. collection_fingerprint), the
+      whole cache is dropped when the fingerprint changes, checked at most
+      every check_interval seconds. The check runs outside the lock, so a
+      slow fingerprint call doesn't hold up other lookups.
+    Thread-safe, so one instance can serve every Streamlit session.
+    """
+
+    def __init__(self, embed, threshold=SIMILARITY_THRESHOLD, ttl=TTL_SECONDS,
+                 max_entries=MAX_ENTRIES, fingerprint=None, check_interval=COLLECTION_CHECK_INTERVAL):
+        self.embed_fn = embed
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.fingerprint = fingerprint
+        self.check_interval = check_interval
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()   # id -> entry, least recently used first
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._fingerprint_value = None
+        self._checked_at = 0.0
+
+    def embed(self, text):
+        """Unit-length embedding of 'text', or None if the embedding call fails."""
+        try:
+            vector = np.asarray(self.embed_fn(text), dtype=np.float32)
+        except (requests.exceptions.RequestException, KeyError, ValueError):
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def _check_fingerprint(self):
+        if self.fingerprint is None:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now  # other threads skip the check meanwhile
+        try:
+            value = self.fingerprint()
+        except Exception:
+            return  # can't tell; keep serving
+        with self._lock:
+            if self._fingerprint_value is not None and value != self._fingerprint_value:
+                self._entries.clear()
+            self._fingerprint_value = value
+
+    def _expire(self, now):
+        expired = [key for key, entry in self._entries.items() if now - entry["created_at"] > self.ttl]
+        for key in expired:
+            del self._entries[key]
+
+    def get(self, embedding, key):
+        """
+        Cached entry for the nearest question asked with the same 'key', as
+        {"question", "payload", "similarity"}, or None.
+        """
+        if embedding is None:
+            return None
+        self._check_fingerprint()
+        with self._lock:
+            self._expire(time.time())
+            keys = [entry_id for entry_id, entry in self._entries.items() if entry["key"] == key]
+            if keys:
+                matrix = np.stack([self._entries[key]["embedding"] for key in keys])
+                scores = matrix @ embedding
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    self.hits += 1
+                    self._entries.move_to_end(keys[best])
+                    entry = self._entries[keys[best]]
+                    return {"question": entry["question"], "payload": entry["payload"],
+                            "similarity": float(scores[best])}
+            self.misses += 1
+            return None
+
+    def put(self, embedding, key, question, payload):
+        if embedding is None:
+            return
+        with self._lock:
+            self._entries[self._next_id] = {
+                "embedding": embedding,
+                "key": key,
+                "question": question,
+                "payload": payload,
+                "created_at": time.time(),
+            }
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
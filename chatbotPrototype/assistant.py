@@ -0,0 +1,231 @@
+import os
+
+import requests
+
+import weaviate
+from weaviate.classes.init import AdditionalConfig, Auth
+from weaviate.classes.config import Integrations
+from weaviate.config import ConnectionConfig
+
+from openrouter import OpenRouterClient, StreamError, chat_messages
+from answer_cache import AnswerCache, cohere_embedder, collection_fingerprint
+from query_expansion import EnhancementCache, search_with_enhancement
+from context_builder import CONTEXT_TOKENS, build_context
+from conversation import ConversationStore, extractive_summary
+import retrieval
+from tracing import span
+
+# ------------------------------------------------------------------------
+# OpenRouter API configuration
+# ------------------------------------------------------------------------
+DEEPSEEK_MODEL = "deepseek/deepseek-r1:free"
+MISTRAL_MODEL = "mistralai/mistral-7b-instruct:free"
+MODELS = (DEEPSEEK_MODEL, MISTRAL_MODEL)
+
+# Keys come from the environment, never from the source tree
+API_KEY = os.environ.get("OPENROUTER_API_KEY", "")
+API_URL = "https://openrouter.ai/api/v1/chat/completions"
+
+headers = {
+    "Authorization": f"Bearer {API_KEY}",
+    "Content-Type": "application/json",
+}
+
+# ------------------------------------------------------------------------
+# Weaviate Cloud configuration
+# ------------------------------------------------------------------------
+WEAVIATE_URL = os.environ.get("WEAVIATE_URL", "")
+WEAVIATE_API_KEY = os.environ.get("WEAVIATE_API_KEY", "")
+COHERE_API_KEY = os.environ.get("COHERE_API_KEY", "")
+COLLECTION = "leapData"
+# Connections kept open to Weaviate, shared by all concurrent requests
+WEAVIATE_POOL_SIZE = 32
+
+# ------------------------------------------------------------------------
+# Prompts
+# ------------------------------------------------------------------------
+ENHANCE_PROMPT = """
+    You are a search query enhancer for a climate science database called LEAP
+    (Learning the Earth with Artificial Intelligence and Physics).
+
+    Your task is to enhance this search query for a semantic search engine that
+    searches through climate science resources.
+
+    1. Identify the key climate science concepts, entities, and relationships
+    2. Expand climate science abbreviations if needed (e.g., CMIP6, GCM, RCP)
+    3. Add relevant climate science synonyms or related terms that might help the search
+    4. Format as a clear, concise query that preserves the original intent
+    5. Return ONLY the enhanced query, no explanations
+    """
+
+ANSWER_PROMPT = """
+                You are a helpful assistant for users of the LEAP (Learning the Earth with Artificial Intelligence and Physics) Columbia, which focuses on climate science research.
+
+                Answer the user's question using the following LEAP resource content:
+
+                {context}
+
+                Instructions:
+                1. Be factual, comprehensive, and specific using the provided context.
+                2. If the user asks for information not in the context, say "I don't have specific information about that in the LEAP resources I can access."
+                3. If you reference a website, include its source information in parentheses.
+                4. If you reference a youtube video, include its link and the exact time frames to watch by appending the end of the url with: &t=XhYmZs. "X" is the number of hours, "Y" is the number of minutes, and “Z” is the number of seconds.
+                5. Format your response clearly and give detailed answers.
+                6. Do not make up information or cite sources not in the provided context.
+                7. Focus on climate science information from the provided context.
+                8. ALWAYS REFERENCE ATLEAST THREE RESOURCES WITH LINKS TO THE WEBSITE! THIS IS A MUST.
+                """
+
+NO_CONTEXT_PROMPT = """
+                You are a helpful assistant for users of the LEAP (Learning the Earth with Artificial Intelligence and Physics) Columbia, which focuses on climate science research.
+
+                Unfortunately, I couldn't find specific information about that topic in the LEAP resources I have access to.
+
+                Explain to the user that:
+                1. You don't have information about their specific query in the LEAP climate science database.
+                2. They should consider rephrasing their question to focus on LEAP-related resources.
+                3. Suggest more specific climate science related topics they might ask about.
+                """
+
+SUMMARY_PROMPT = """
+    You maintain a running summary of a conversation between a user and the
+    LEAP climate science research assistant.
+
+    Merge the new exchange into the summary. Keep the topics, datasets,
+    models and sources discussed, and what the user wants to know. Drop
+    pleasantries and details that won't matter for follow-up questions.
+    Stay under 150 words. Return ONLY the updated summary.
+    """
+
+HISTORY_PROMPT = """
+                Conversation so far (use it to understand follow-up questions, not as a source):
+
+                {history}
+                """
+# Summaries are written by the faster model; the answer model isn't needed for this
+SUMMARY_MODEL = MISTRAL_MODEL
+
+
+def connect_weaviate(pool_size=WEAVIATE_POOL_SIZE):
+    """Weaviate Cloud client with a connection pool sized for concurrent requests."""
+    client = weaviate.connect_to_weaviate_cloud(
+        cluster_url=WEAVIATE_URL,
+        auth_credentials=Auth.api_key(WEAVIATE_API_KEY),
+        additional_config=AdditionalConfig(
+            connection=ConnectionConfig(session_pool_connections=pool_size, session_pool_maxsize=pool_size),
+        ),
+    )
+    client.integrations.configure([Integrations.cohere(api_key=COHERE_API_KEY)])
+    return client
+
+
+def system_prompt(context, history=None):
+    """The answering prompt, grounded in 'context' if there is any, plus the conversation so far."""
+    prompt = ANSWER_PROMPT.format(context=context) if context else NO_CONTEXT_PROMPT
+    if history:
+        prompt += HISTORY_PROMPT.format(history=history)
+    return prompt
+
+
+def result_summary(obj):
+    """A search result as plain JSON-able data (for the API and debug views)."""
+    return {
+        "source": retrieval.object_source(obj),
+        "content": retrieval.object_content(obj),
+        "relevance": retrieval.object_relevance(obj),
+        "chunkIndex": obj.properties.get("chunkIndex"),
+    }
+
+# ------------------------------------------------------------------------
+# Pipeline
+# ------------------------------------------------------------------------
+class LeapAssistant:
+    """
+    Retrieval and generation for the LEAP assistant, with no UI code: one
+    instance holds the shared Weaviate client, the pooled OpenRouter
+    client, the reranker and the caches, and is safe to call from many
+    threads at once. Used by chat_service.
+    """
+
+    def __init__(self, weaviate_client=None, openrouter=None, reranker=None, collection=COLLECTION):
+        self.weaviate_client = weaviate_client or connect_weaviate()
+        self.storage = self.weaviate_client.collections.get(collection)
+        self.openrouter = openrouter or OpenRouterClient(
+            headers, api_url=API_URL, fallbacks={DEEPSEEK_MODEL: MISTRAL_MODEL}
+        )
+        self.reranker = reranker or retrieval.default_reranker()
+        self.enhancement_cache = EnhancementCache()
+        self.answer_cache = AnswerCache(
+            embed=cohere_embedder(COHERE_API_KEY),
+            fingerprint=lambda: collection_fingerprint(self.storage),
+        )
+        self.conversations = ConversationStore(summarize=self.summarize)
+
+    def close(self):
+        self.weaviate_client.close()
+        self.openrouter.close()
+
+    def complete(self, model, system, user, max_tokens=1500):
+        """Non-streamed completion; returns the API response or {"error": ...}."""
+        with span("llm.complete", model=model) as llm_span:
+            try:
+                # Lower temperature for more factual responses
+                response = self.openrouter.complete(model, chat_messages(system, user),
+                                                    max_tokens=max_tokens, temperature=0.3)
+            except (StreamError, requests.exceptions.RequestException, ValueError) as e:
+                llm_span.set(error=str(e))
+                return {"error": str(e)}
+            usage = response.get("usage") or {}
+            llm_span.set(fallback_from=response.get("fallback_from"),
+                         prompt_tokens=usage.get("prompt_tokens"),
+                         completion_tokens=usage.get("completion_tokens"))
+            return response
+
+    def enhance(self, query, model):
+        """Enhance the query to improve semantic search results."""
+        response = self.complete(model, ENHANCE_PROMPT, query, max_tokens=2000)
+        if isinstance(response, dict) and response.get("choices"):
+            enhanced = response["choices"][0]["message"].get("content", query)
+            return enhanced.strip()
+        return query
+
+    def summarize(self, summary, question, answer):
+        """Rolling conversation summary with one more exchange folded in."""
+        exchange = f"Current summary:\n{summary or '(empty)'}\n\nUser: {question}\nAssistant: {answer}"
+        response = self.complete(SUMMARY_MODEL, SUMMARY_PROMPT, exchange, max_tokens=300)
+        if isinstance(response, dict) and response.get("choices"):
+            return response["choices"][0]["message"].get("content", "").strip()
+        return extractive_summary(summary, question, answer)
+
+    def search(self, query, limit=10, max_distance=retrieval.MAX_VECTOR_DISTANCE):
+        """Hybrid search, reranked down to 'limit' results; see retrieval.retrieve."""
+        return retrieval.retrieve(self.storage, query, self.reranker, top_k=limit,
+                                  max_distance=max_distance)
+
+    def retrieve(self, query, model, limit=10, enhancement_mode="llm",
+                 max_distance=retrieval.MAX_VECTOR_DISTANCE):
+        """
+        (result, enhanced_query) for the question; in "llm" mode the raw
+        query is searched while the LLM enhances it and the rankings are
+        fused (see query_expansion.search_with_enhancement).
+        """
+        return search_with_enhancement(
+            query,
+            model,
+            enhance=self.enhance,
+            search=lambda text, count: self.search(text, count, max_distance),
+            limit=limit,
+            mode=enhancement_mode,
+            cache=self.enhancement_cache,
+        )
+
+    def context(self, result, query, model, top_results=5, budget=CONTEXT_TOKENS):
+        """Query-relevant passages packed into 'budget' tokens; see context_builder."""
+        return build_context(result, query, model=model, top_results=top_results, budget=budget)
+
+    def stream_answer(self, model, system, question):
+        """Streamed answer with fallback; iterate for text deltas (see FallbackStream)."""
+        return self.openrouter.stream(model, chat_messages(system, question))
+
+    def sample_objects(self, limit=5):
+        return self.storage.query.fetch_objects(limit=limit).objects
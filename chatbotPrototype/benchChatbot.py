@@ -0,0 +1,429 @@
+"""
+Retrieval-quality and latency benchmark for the chatbot pipeline.
+
+    docker compose up -d                     # local Weaviate (docker-compose.yml)
+    python benchChatbot.py --rebuild-fixture # first run: embed the fixture
+    python benchChatbot.py                   # later runs reuse it
+
+Every question of bench_questions.json goes through the same stages as a
+chat_service request, against a local collection built from
+crawl_results.json and YouTube_Data.json. The LLM is replayed from
+bench_llm_replay.json, so runs are free and repeatable and time only this
+app's code. Use --record once to capture real answers, and --replay-latency
+to also replay their timing. Results are written to bench_chatbot.json:
+p50/p95 latency per stage, recall@k and MRR of the expected sources, and
+context token counts. Expected sources are page URLs or YouTube video ids,
+matched exactly; questions that list none are timed but not scored.
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import statistics
+import sys
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import weaviate
+from weaviate.classes.config import Configure
+
+from assistant import API_URL, DEEPSEEK_MODEL, ENHANCE_PROMPT, LeapAssistant, headers, system_prompt
+from context_builder import CONTEXT_TOKENS, count_tokens
+from openrouter import OpenRouterClient
+from query_expansion import ENHANCEMENT_MODES, expand_acronyms
+from retrieval import object_source
+
+# The fixture is chunked exactly as addObjects.py chunks the real collection
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "crawlerLEAP"))
+from chunker import iter_chunks  # noqa: E402
+
+# ------------------------------------------------------------------------
+# Settings
+# ------------------------------------------------------------------------
+QUESTIONS_FILE = "bench_questions.json"
+REPLAY_FILE = "bench_llm_replay.json"
+OUTPUT_FILE = "bench_chatbot.json"
+REPEATS = 3
+RECALL_AT = (1, 3, 5, 10)
+QUALITY_METRICS = tuple(f"recall@{k}" for k in RECALL_AT) + ("mrr", "context_recall")
+
+# Local Weaviate fixture (docker-compose.yml enables text2vec-ollama)
+FIXTURE_COLLECTION = "LeapBench"
+FIXTURE_SOURCES = ("crawl_results.json", "YouTube_Data.json")
+FIXTURE_FIELDS = ("title", "class", "videoId", "url", "transcript",
+                  "parentId", "chunkIndex", "chunkCount", "heading", "startSeconds", "endSeconds")
+WEAVIATE_HOST = "localhost"
+WEAVIATE_PORT = 8080
+WEAVIATE_GRPC_PORT = 50051
+OLLAMA_ENDPOINT = "http://host.docker.internal:11434"   # as seen from the Weaviate container
+OLLAMA_EMBED_MODEL = "nomic-embed-text"
+
+STAGES = ("enhance", "search", "retrieve", "context", "answer_first_token", "answer", "end_to_end")
+
+
+# ------------------------------------------------------------------------
+# Fixture
+# ------------------------------------------------------------------------
+def build_fixture(client, name=FIXTURE_COLLECTION, sources=FIXTURE_SOURCES, rebuild=False):
+    """
+    The benchmark collection, created and filled from 'sources' if missing
+    (or if 'rebuild'). Documents are chunked like the production import.
+    """
+    if client.collections.exists(name):
+        if not rebuild:
+            return client.collections.get(name)
+        client.collections.delete(name)
+    collection = client.collections.create(
+        name=name,
+        vectorizer_config=Configure.Vectorizer.text2vec_ollama(
+            api_endpoint=OLLAMA_ENDPOINT, model=OLLAMA_EMBED_MODEL
+        ),
+    )
+    docs = []
+    for path in sources:
+        with open(path, "r", encoding="utf-8") as f:
+            docs.extend(json.load(f))
+    started = time.perf_counter()
+    with collection.batch.fixed_size(batch_size=100) as batch:
+        for chunk in iter_chunks(docs):
+            batch.add_object({key: chunk[key] for key in FIXTURE_FIELDS if chunk.get(key) is not None})
+    failed = len(collection.batch.failed_objects)
+    print(f"Fixture {name}: {len(docs)} documents embedded in {time.perf_counter() - started:.0f}s"
+          f"{f', {failed} chunks failed' if failed else ''}")
+    return collection
+
+
+# ------------------------------------------------------------------------
+# Replayed LLM
+# ------------------------------------------------------------------------
+class ReplayStream:
+    """Iterates a recorded answer word by word, like FallbackStream does for real ones."""
+
+    def __init__(self, model, text, first_token_seconds=0.0, total_seconds=0.0):
+        self.model = model
+        self.words = text.split(" ")
+        self.first_token_seconds = first_token_seconds
+        self.total_seconds = total_seconds
+        self.parts = []
+
+    def __iter__(self):
+        time.sleep(self.first_token_seconds)
+        delay = max(0.0, self.total_seconds - self.first_token_seconds) / max(1, len(self.words))
+        for i, word in enumerate(self.words):
+            if i:
+                time.sleep(delay)
+            piece = word if i == 0 else f" {word}"
+            self.parts.append(piece)
+            yield piece
+
+    @property
+    def text(self):
+        return "".join(self.parts)
+
+    def close(self):
+        pass
+
+    def as_response(self):
+        return {"model": self.model, "choices": [{"message": {"role": "assistant", "content": self.text}}]}
+
+
+class ReplayLLM:
+    """
+    Stands in for OpenRouterClient. Completions are replayed from a
+    recording keyed by (model, messages); unrecorded prompts get a canned
+    reply (the acronym-expanded query for enhancement, a fixed answer
+    otherwise). With 'record', an OpenRouterClient, misses are asked for
+    real and saved with their latency; replay_latency sleeps for it.
+    """
+
+    def __init__(self, path=REPLAY_FILE, record=None, replay_latency=False):
+        self.path = path
+        self.record = record
+        self.replay_latency = replay_latency
+        self.recordings = {}
+        self.misses = 0
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.recordings = json.load(f)
+
+    @staticmethod
+    def key(model, messages):
+        return hashlib.sha256(json.dumps([model, messages], sort_keys=True).encode()).hexdigest()[:24]
+
+    @staticmethod
+    def canned(messages):
+        if messages[0]["content"] == ENHANCE_PROMPT:
+            return expand_acronyms(messages[-1]["content"])
+        return f"Stub answer to: {messages[-1]['content']}"
+
+    def _lookup(self, model, messages, streamed):
+        key = self.key(model, messages)
+        with self._lock:
+            recording = self.recordings.get(key)
+        if recording is not None:
+            return recording
+        if self.record is None:
+            with self._lock:
+                self.misses += 1
+            return {"text": self.canned(messages), "first_token_seconds": 0.0, "total_seconds": 0.0}
+        started = time.perf_counter()
+        if streamed:
+            stream = self.record.stream(model, messages)
+            first = None
+            for _ in stream:
+                first = first if first is not None else time.perf_counter() - started
+            text = stream.text
+        else:
+            text = self.record.complete(model, messages)["choices"][0]["message"]["content"]
+        total = time.perf_counter() - started
+        recording = {"text": text, "first_token_seconds": first if streamed else total, "total_seconds": total}
+        with self._lock:
+            self.recordings[key] = recording
+        return recording
+
+    def complete(self, model, messages, max_tokens=1500, temperature=0.3):
+        recording = self._lookup(model, messages, streamed=False)
+        if self.replay_latency:
+            time.sleep(recording["total_seconds"])
+        return {"model": model, "choices": [{"message": {"role": "assistant", "content": recording["text"]}}]}
+
+    def stream(self, model, messages, **kwargs):
+        recording = self._lookup(model, messages, streamed=True)
+        if not self.replay_latency:
+            return ReplayStream(model, recording["text"])
+        return ReplayStream(model, recording["text"], recording["first_token_seconds"],
+                            recording["total_seconds"])
+
+    def close(self):
+        if self.record is not None:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self.recordings, f, indent=2, ensure_ascii=False)
+            self.record.close()
+
+
+# ------------------------------------------------------------------------
+# Metrics
+# ------------------------------------------------------------------------
+def percentile(values, q):
+    """Nearest-rank percentile of 'values' (q in 0..100)."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = max(1, min(len(ordered), math.ceil(q / 100 * len(ordered))))
+    return ordered[rank - 1]
+
+
+def distinct_sources(result):
+    """Sources of a search result in rank order, each once."""
+    sources = []
+    for obj in (result.objects if result else []):
+        source = object_source(obj)
+        if source not in sources:
+            sources.append(source)
+    return sources
+
+
+def source_key(source):
+    """
+    What a source is compared by: the video id of a YouTube watch URL, or
+    host and path of a page (no scheme, query, fragment or trailing slash).
+    Expected sources may be given as page URLs or bare video ids.
+    """
+    if "://" not in source:
+        return source
+    parts = urlsplit(source)
+    if parts.netloc.endswith("youtube.com") and parts.path == "/watch":
+        return parse_qs(parts.query).get("v", [source])[0]
+    return f"{parts.netloc.lower()}{parts.path.rstrip('/')}"
+
+
+def _matches(source, expected):
+    return source_key(source) in {source_key(page) for page in expected}
+
+
+def recall_at(sources, expected, k):
+    """Share of the expected pages or videos found among the first k sources."""
+    found = {source_key(source) for source in sources[:k]}
+    return sum(1 for page in expected if source_key(page) in found) / len(expected)
+
+
+def reciprocal_rank(sources, expected):
+    for rank, source in enumerate(sources, start=1):
+        if _matches(source, expected):
+            return 1.0 / rank
+    return 0.0
+
+
+def unknown_expected_sources(questions, sources=FIXTURE_SOURCES):
+    """Expected sources of 'questions' that no document of the fixture has."""
+    known = set()
+    for path in sources:
+        with open(path, "r", encoding="utf-8") as f:
+            for doc in json.load(f):
+                if doc.get("url"):
+                    known.add(source_key(doc["url"]))
+                if doc.get("videoId"):
+                    known.add(doc["videoId"])
+    return sorted({page for item in questions for page in item["expected_sources"]
+                   if source_key(page) not in known})
+
+
+# ------------------------------------------------------------------------
+# Benchmark
+# ------------------------------------------------------------------------
+def run_question(assistant, item, model, mode, search_limit, top_results, context_tokens):
+    """One pass of a question through every stage: (timings in ms, quality metrics)."""
+    question = item["question"]
+    timings = {}
+
+    started = time.perf_counter()
+    assistant.enhance(question, model)
+    timings["enhance"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    assistant.search(question, search_limit)
+    timings["search"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    result, enhanced_query = assistant.retrieve(question, model, search_limit, mode)
+    timings["retrieve"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    context = assistant.context(result, f"{question} {enhanced_query}", model,
+                                top_results=top_results, budget=context_tokens)
+    timings["context"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    stream = assistant.stream_answer(model, system_prompt(context), question)
+    for _ in stream:
+        timings.setdefault("answer_first_token", time.perf_counter() - started)
+    timings["answer"] = time.perf_counter() - started
+    timings.setdefault("answer_first_token", timings["answer"])
+    timings["end_to_end"] = timings["retrieve"] + timings["context"] + timings["answer"]
+
+    sources = distinct_sources(result)
+    expected = item["expected_sources"]
+    in_context = [source for source in sources if context and f"--- SOURCE: {source} " in context]
+    # Questions not labelled with their pages yet are timed but not scored
+    metrics = {name: None for name in QUALITY_METRICS}
+    if expected:
+        metrics.update({f"recall@{k}": recall_at(sources, expected, k) for k in RECALL_AT})
+        metrics["mrr"] = reciprocal_rank(sources, expected)
+        metrics["context_recall"] = recall_at(in_context, expected, len(in_context))
+    metrics["context_tokens"] = count_tokens(context, model) if context else 0
+    metrics["sources"] = sources
+    return {stage: seconds * 1000 for stage, seconds in timings.items()}, metrics
+
+
+def summarize(runs, rows):
+    """Per-stage latency percentiles and mean retrieval metrics over all runs."""
+    stages = {}
+    for stage in STAGES:
+        values = [timings[stage] for timings in runs]
+        stages[stage] = {
+            "p50_ms": round(percentile(values, 50), 2),
+            "p95_ms": round(percentile(values, 95), 2),
+            "mean_ms": round(statistics.fmean(values), 2),
+            "n": len(values),
+        }
+    scored = [row for row in rows if row["mrr"] is not None]
+    quality = {
+        name: round(statistics.fmean(row[name] for row in scored), 4) if scored else None
+        for name in QUALITY_METRICS
+    }
+    quality["scored_questions"] = len(scored)
+    tokens = [row["context_tokens"] for row in rows]
+    context = {
+        "mean": round(statistics.fmean(tokens), 1),
+        "p50": percentile(tokens, 50),
+        "p95": percentile(tokens, 95),
+        "max": max(tokens),
+    }
+    return stages, quality, context
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--questions", default=QUESTIONS_FILE)
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--model", default=DEEPSEEK_MODEL)
+    parser.add_argument("--mode", default="llm", choices=ENHANCEMENT_MODES, help="query enhancement mode")
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--search-limit", type=int, default=10)
+    parser.add_argument("--top-results", type=int, default=5)
+    parser.add_argument("--context-tokens", type=int, default=CONTEXT_TOKENS)
+    parser.add_argument("--collection", default=FIXTURE_COLLECTION)
+    parser.add_argument("--rebuild-fixture", action="store_true")
+    parser.add_argument("--record", action="store_true", help="call OpenRouter for unrecorded prompts")
+    parser.add_argument("--replay-latency", action="store_true", help="sleep for the recorded LLM latency")
+    args = parser.parse_args()
+
+    with open(args.questions, "r", encoding="utf-8") as f:
+        questions = json.load(f)
+    unknown = unknown_expected_sources(questions)
+    if unknown:
+        print(f"Warning: expected sources missing from {', '.join(FIXTURE_SOURCES)} "
+              f"(they can never be retrieved): {', '.join(unknown)}")
+
+    client = weaviate.connect_to_local(host=WEAVIATE_HOST, port=WEAVIATE_PORT, grpc_port=WEAVIATE_GRPC_PORT)
+    build_fixture(client, args.collection, rebuild=args.rebuild_fixture)
+    llm = ReplayLLM(
+        record=OpenRouterClient(headers, api_url=API_URL) if args.record else None,
+        replay_latency=args.replay_latency,
+    )
+    assistant = LeapAssistant(weaviate_client=client, openrouter=llm, collection=args.collection)
+    # Every pass enhances from scratch; the cache would hide the stage after the first
+    assistant.enhancement_cache = None
+
+    runs = []
+    rows = []
+    try:
+        for repeat in range(args.repeats):
+            for item in questions:
+                timings, metrics = run_question(assistant, item, args.model, args.mode, args.search_limit,
+                                                args.top_results, args.context_tokens)
+                runs.append(timings)
+                if repeat == 0:
+                    rows.append({"id": item["id"], "question": item["question"], **metrics})
+    finally:
+        assistant.close()
+
+    stages, quality, context = summarize(runs, rows)
+    print(f"{len(questions)} questions x {args.repeats} runs, mode={args.mode}, "
+          f"reranker={type(assistant.reranker).__name__}, LLM replay misses={llm.misses}")
+    print(f"{'stage':>20} {'p50 ms':>9} {'p95 ms':>9}")
+    for stage, row in stages.items():
+        print(f"{stage:>20} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f}")
+    print("  ".join(f"{name} {quality[name]:.3f}" for name in QUALITY_METRICS if quality[name] is not None)
+          + f"  ({quality['scored_questions']} labelled questions)")
+    print(f"context tokens: mean {context['mean']}, p95 {context['p95']}, max {context['max']}")
+
+    report = {
+        "config": {
+            "collection": args.collection,
+            "model": args.model,
+            "mode": args.mode,
+            "repeats": args.repeats,
+            "search_limit": args.search_limit,
+            "top_results": args.top_results,
+            "context_tokens": args.context_tokens,
+            "reranker": type(assistant.reranker).__name__,
+            "replay_latency": args.replay_latency,
+            "llm_replay_misses": llm.misses,
+        },
+        "stages": stages,
+        "retrieval": quality,
+        "unknown_expected_sources": unknown,
+        "context_tokens": context,
+        "questions": rows,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Benchmark results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
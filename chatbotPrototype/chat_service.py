@@ -0,0 +1,291 @@
+"""
+Headless HTTP API for the LEAP assistant; deepseek_ai.py is its Streamlit
+client. Run with
+
+    uvicorn chat_service:app --host 0.0.0.0 --port 8000 --workers 4
+
+with OPENROUTER_API_KEY, WEAVIATE_URL, WEAVIATE_API_KEY and COHERE_API_KEY
+set in the environment (see assistant.py).
+Every worker process holds one LeapAssistant (Weaviate client, pooled
+OpenRouter client, reranker, caches) shared by all of its requests.
+Conversation memory lives in the worker too, so with several workers or
+replicas the load balancer must keep a conversation on one of them
+(sticky sessions). The
+blocking pipeline calls run on a thread pool, so concurrent users are
+served in parallel; add workers or replicas behind a load balancer to
+scale further.
+"""
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import anyio
+import requests
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from assistant import DEEPSEEK_MODEL, MODELS, LeapAssistant, result_summary, system_prompt
+from context_builder import CONTEXT_TOKENS, count_tokens
+from openrouter import StreamError
+import retrieval
+from tracing import Trace
+
+# ------------------------------------------------------------------------
+# Settings
+# ------------------------------------------------------------------------
+HOST = os.environ.get("LEAP_CHAT_HOST", "0.0.0.0")
+PORT = int(os.environ.get("LEAP_CHAT_PORT", "8000"))
+WORKER_THREADS = 64    # blocking pipeline calls in flight per worker process
+
+
+# ------------------------------------------------------------------------
+# Request bodies
+# ------------------------------------------------------------------------
+class EnhanceRequest(BaseModel):
+    query: str
+    model: str = DEEPSEEK_MODEL
+
+
+class SearchRequest(BaseModel):
+    query: str
+    limit: int = 10
+    max_distance: float = retrieval.MAX_VECTOR_DISTANCE
+
+
+class AnswerRequest(BaseModel):
+    question: str
+    model: str = DEEPSEEK_MODEL
+    enhancement_mode: str = "llm"
+    search_limit: int = 10
+    top_results: int = 5
+    max_distance: float = retrieval.MAX_VECTOR_DISTANCE
+    context_tokens: int = CONTEXT_TOKENS
+    use_cache: bool = True
+    # Follow-up questions reuse the memory of earlier turns with the same id
+    conversation_id: Optional[str] = None
+
+
+def answer_cache_key(body):
+    """Cached answers are only reused for the same model and retrieval settings."""
+    return (body.model, body.enhancement_mode, body.search_limit, body.top_results,
+            body.max_distance, body.context_tokens)
+
+
+def sse(event):
+    """One server-sent event carrying 'event' as JSON."""
+    return f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+def _check_model(model):
+    if model not in MODELS:
+        raise HTTPException(status_code=422, detail=f"Unknown model {model!r}; choose from {list(MODELS)}")
+
+# ------------------------------------------------------------------------
+# Answer stream
+# ------------------------------------------------------------------------
+def answer_events(assistant, body):
+    """
+    The SSE events of one answer, produced on a worker thread:
+    - {"type": "meta", "conversation_id", "enhanced_query", "context",
+      "results", "cached", "reused_context"}
+    - {"type": "delta", "text"} for every piece of the answer
+    - {"type": "done", "response", "trace"} or {"type": "error", "error"}
+    followed by "[DONE]". Closing the generator (the client went away)
+    closes the LLM stream, so the model stops generating.
+    Within a conversation, a follow-up that the chunks retrieved for
+    earlier turns already cover is answered from them without a search,
+    and the prompt carries the conversation's bounded history.
+    Every request is traced (see tracing.py); "trace" is its per-stage
+    latency breakdown.
+    """
+    conversation = assistant.conversations.get(body.conversation_id)
+    trace = Trace("answer", model=body.model, conversation_id=conversation.id,
+                  question_tokens=count_tokens(body.question, body.model))
+    try:
+        yield from _answer_events(assistant, body, conversation, trace)
+    except Exception as e:
+        # Headers are long sent: the failure can only be reported in the stream
+        trace.finish(e)
+        yield sse({"type": "error", "error": f"{type(e).__name__}: {e}"})
+        yield "data: [DONE]\n\n"
+    finally:
+        trace.finish()
+
+
+def _answer_events(assistant, body, conversation, trace):
+    # Spans opened with 'with' never stay open across a yield: each step of
+    # this generator may run in a different context on the thread pool
+    history = conversation.history()
+    # Cached answers only stand in for questions that open a conversation
+    use_cache = body.use_cache and history is None
+    query_embedding = None
+    if use_cache:
+        # A near-identical question answered before is served from the cache
+        with trace.root.child("answer_cache.lookup") as cache_span:
+            query_embedding = assistant.answer_cache.embed(body.question)
+            cached = assistant.answer_cache.get(query_embedding, answer_cache_key(body))
+            cache_span.set(hit=cached is not None,
+                           similarity=cached["similarity"] if cached else None)
+        if cached:
+            payload = cached["payload"]
+            yield sse({
+                "type": "meta",
+                "conversation_id": conversation.id,
+                "enhanced_query": payload["enhanced_query"],
+                "context": payload["context"],
+                "results": payload["results"],
+                "cached": {"question": cached["question"], "similarity": cached["similarity"]},
+                "reused_context": False,
+            })
+            response = payload["response"]
+            answer = response["choices"][0]["message"]["content"]
+            conversation.add_turn(body.question, answer)
+            yield sse({"type": "delta", "text": answer})
+            trace.finish()
+            yield sse({"type": "done", "response": response, "trace": trace.breakdown()})
+            yield "data: [DONE]\n\n"
+            return
+
+    search_query = conversation.search_query(body.question)
+    reused_context = conversation.can_reuse_context(body.question)
+    error = None
+    with trace.root.child("retrieve", reused_context=reused_context) as retrieve_span:
+        if reused_context:
+            result, enhanced_query = conversation.cached_result(), search_query
+        else:
+            try:
+                result, enhanced_query = assistant.retrieve(
+                    search_query, body.model, body.search_limit, body.enhancement_mode, body.max_distance
+                )
+            except Exception as e:
+                error, result = e, None
+                retrieve_span.end(e)
+        retrieve_span.set(results=len(result.objects) if result else 0)
+    if error is not None:
+        yield sse({"type": "error", "error": f"Error querying Weaviate: {error}"})
+        yield "data: [DONE]\n\n"
+        return
+    if not reused_context:
+        conversation.remember(result)
+    # Passages are picked by the terms of both the question and its rewrite
+    with trace.root.child("context") as context_span:
+        context = assistant.context(result, f"{search_query} {enhanced_query}", body.model,
+                                    top_results=body.top_results, budget=body.context_tokens)
+        context_span.set(context_tokens=count_tokens(context, body.model) if context else 0,
+                         budget=body.context_tokens,
+                         sources=context.count("--- SOURCE: ") if context else 0)
+    results = [result_summary(obj) for obj in (result.objects if result else [])]
+    yield sse({"type": "meta", "conversation_id": conversation.id, "enhanced_query": enhanced_query,
+               "context": context, "results": results, "cached": None, "reused_context": reused_context})
+
+    prompt = system_prompt(context, history)
+    llm_span = trace.root.child("llm.stream", model=body.model,
+                                prompt_tokens_estimate=count_tokens(prompt + body.question, body.model),
+                                history_tokens=count_tokens(history, body.model) if history else 0)
+    stream = assistant.stream_answer(body.model, prompt, body.question)
+    try:
+        for delta in stream:
+            if "time_to_first_token_ms" not in llm_span.attributes:
+                llm_span.set(time_to_first_token_ms=llm_span.elapsed_ms())
+            yield sse({"type": "delta", "text": delta})
+    except (StreamError, requests.exceptions.RequestException, ValueError) as e:
+        llm_span.end(e)
+        yield sse({"type": "error", "error": str(e), "partial": bool(stream.text)})
+        yield "data: [DONE]\n\n"
+        return
+    finally:
+        stream.close()
+        llm_span.end()
+
+    response = stream.as_response()
+    usage = response.get("usage") or {}
+    llm_span.set(answered_by=response.get("model"), fallback_from=response.get("fallback_from"),
+                 finish_reason=response["choices"][0].get("finish_reason"),
+                 prompt_tokens=usage.get("prompt_tokens"), completion_tokens=usage.get("completion_tokens"),
+                 answer_tokens_estimate=count_tokens(stream.text, body.model))
+    if stream.text:
+        conversation.add_turn(body.question, stream.text)
+    # Only complete answers grounded in retrieved content are reused
+    if use_cache and context and stream.text and not response.get("cancelled"):
+        assistant.answer_cache.put(query_embedding, answer_cache_key(body), body.question, {
+            "response": response,
+            "enhanced_query": enhanced_query,
+            "context": context,
+            "results": results,
+        })
+    trace.finish()
+    yield sse({"type": "done", "response": response, "trace": trace.breakdown()})
+    yield "data: [DONE]\n\n"
+
+# ------------------------------------------------------------------------
+# App
+# ------------------------------------------------------------------------
+def create_app(assistant_factory=LeapAssistant):
+    """The API app; 'assistant_factory' builds the shared LeapAssistant at startup."""
+
+    @asynccontextmanager
+    async def lifespan(app):
+        anyio.to_thread.current_default_thread_limiter().total_tokens = WORKER_THREADS
+        app.state.assistant = await run_in_threadpool(assistant_factory)
+        try:
+            yield
+        finally:
+            await run_in_threadpool(app.state.assistant.close)
+
+    app = FastAPI(title="LEAP Research Assistant API", lifespan=lifespan)
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", "models": list(MODELS)}
+
+    @app.post("/enhance")
+    async def enhance(body: EnhanceRequest, request: Request):
+        _check_model(body.model)
+        enhanced = await run_in_threadpool(request.app.state.assistant.enhance, body.query, body.model)
+        return {"query": body.query, "enhanced_query": enhanced}
+
+    @app.post("/search")
+    async def search(body: SearchRequest, request: Request):
+        try:
+            result = await run_in_threadpool(
+                request.app.state.assistant.search, body.query, body.limit, body.max_distance
+            )
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"Error querying Weaviate: {e}")
+        return {"results": [result_summary(obj) for obj in result.objects]}
+
+    @app.get("/samples")
+    async def samples(request: Request, limit: int = 5):
+        try:
+            objects = await run_in_threadpool(request.app.state.assistant.sample_objects, limit)
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"Error inspecting database: {e}")
+        return {"results": [result_summary(obj) for obj in objects]}
+
+    @app.post("/answer")
+    async def answer(body: AnswerRequest, request: Request):
+        """Retrieves context and streams the answer as server-sent events."""
+        _check_model(body.model)
+        # A sync generator: Starlette iterates it on the thread pool
+        return StreamingResponse(
+            answer_events(request.app.state.assistant, body),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @app.delete("/conversations/{conversation_id}")
+    async def forget_conversation(conversation_id: str, request: Request):
+        """Drops a conversation's memory (the client's "new conversation")."""
+        return {"dropped": request.app.state.assistant.conversations.drop(conversation_id)}
+
+    return app
+
+
+app = create_app()
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run("chat_service:app", host=HOST, port=PORT)
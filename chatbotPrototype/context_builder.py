@@ -0,0 +1,235 @@
+import math
+import re
+from collections import Counter
+
+from retrieval import object_content, object_relevance, object_source
+
+# Exact cl100k counts if tiktoken is installed; otherwise a close estimate
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except ImportError:
+    _ENCODING = None
+
+# ------------------------------------------------------------------------
+# Settings
+# ------------------------------------------------------------------------
+CONTEXT_TOKENS = 3000     # budget for all sources together, headers included
+PASSAGE_TOKENS = 120      # passages are built from whole lines up to about this size
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Tokens of the model's own tokenizer per cl100k token, by model prefix.
+# Mistral's 32k-vocabulary SentencePiece tokenizer needs about a quarter more.
+MODEL_TOKEN_RATIO = {
+    "mistralai/": 1.25,
+    "deepseek/": 1.0,
+}
+# YouTube transcript lines, as written by yt.py: "12.34s: text"
+TIMESTAMP_LINE = re.compile(r"^\d+(?:\.\d+)?s:\s")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_WORD = re.compile(r"\w+")
+# Very common words carry no signal about which passage answers the question
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it of on or "
+    "that the there this to was what when where which who why with you".split()
+)
+
+
+def count_tokens(text, model=None):
+    """Tokens 'text' takes up in the prompt of 'model' (estimated from cl100k)."""
+    if _ENCODING is not None:
+        tokens = len(_ENCODING.encode(text, disallowed_special=()))
+    else:
+        # Word pieces and punctuation, a little above real BPE counts for English
+        tokens = len(_TOKEN_PATTERN.findall(text))
+    for prefix, ratio in MODEL_TOKEN_RATIO.items():
+        if model and model.startswith(prefix):
+            return math.ceil(tokens * ratio)
+    return tokens
+
+
+def _terms(text):
+    return [word for word in _WORD.findall(text.lower()) if word not in STOPWORDS]
+
+# ------------------------------------------------------------------------
+# Passages
+# ------------------------------------------------------------------------
+class Passage:
+    """A few whole lines of one source, in document order (position)."""
+
+    def __init__(self, source_rank, position, text, tokens):
+        self.source_rank = source_rank
+        self.position = position
+        self.text = text
+        self.tokens = tokens
+        self.score = 0.0
+
+
+def _lines(content):
+    """
+    Lines that can't be cut: a transcript cue keeps its "12.34s:" timestamp
+    with its text; prose paragraphs are split into sentences.
+    """
+    for line in content.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if TIMESTAMP_LINE.match(line):
+            yield line
+        else:
+            yield from (sentence for sentence in SENTENCE_END.split(line) if sentence)
+
+
+def split_passages(chunks, source_rank, model=None, passage_tokens=PASSAGE_TOKENS):
+    """
+    Splits the (chunkIndex, content) chunks of one source, in document
+    order, into passages of roughly passage_tokens. Lines seen before in
+    the source, such as the overlap between neighbouring chunks, are
+    skipped. Passages never span chunks that aren't next to each other,
+    and positions skip one there, so the gap shows when printing.
+    """
+    passages = []
+    seen = set()
+    lines, size = [], 0
+    position = 0
+    previous_index = None
+
+    def flush():
+        nonlocal lines, size, position
+        if lines:
+            passages.append(Passage(source_rank, position, "\n".join(lines), size))
+            position += 1
+        lines, size = [], 0
+
+    for chunk_index, content in chunks:
+        if previous_index is not None and chunk_index != previous_index + 1:
+            flush()
+            position += 1
+        previous_index = chunk_index
+        for line in _lines(content):
+            if line in seen:
+                continue
+            seen.add(line)
+            tokens = count_tokens(line, model)
+            if lines and size + tokens > passage_tokens:
+                flush()
+            lines.append(line)
+            size += tokens
+    flush()
+    return passages
+
+
+def score_passages(query, passages):
+    """BM25 score of the query's terms in each passage, with all passages as corpus."""
+    query_terms = set(_terms(query))
+    docs = [Counter(_terms(passage.text)) for passage in passages]
+    if not docs or not query_terms:
+        return
+    avg_len = sum(sum(doc.values()) for doc in docs) / len(docs) or 1.0
+    doc_freq = {term: sum(1 for doc in docs if term in doc) for term in query_terms}
+    for passage, doc in zip(passages, docs):
+        length = sum(doc.values())
+        for term in query_terms:
+            freq = doc.get(term, 0)
+            if not freq:
+                continue
+            idf = math.log(1 + (len(docs) - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+            passage.score += idf * freq * (BM25_K1 + 1) / (
+                freq + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_len))
+
+# ------------------------------------------------------------------------
+# Packing
+# ------------------------------------------------------------------------
+def _group_sources(query_result, top_results):
+    """[(source, best relevance, [(chunkIndex, content)] in document order)], best source first."""
+    groups = {}
+    for obj in query_result.objects:
+        content = object_content(obj)
+        if not content or content.startswith("Error scraping"):
+            continue
+        source = object_source(obj)
+        if source not in groups:
+            if len(groups) >= top_results:
+                continue
+            groups[source] = {"relevance": object_relevance(obj), "chunks": {}}
+        group = groups[source]
+        group["relevance"] = max(group["relevance"], object_relevance(obj))
+        chunk_index = obj.properties.get("chunkIndex")
+        group["chunks"].setdefault(chunk_index if chunk_index is not None else -1, content)
+    return [
+        (source, group["relevance"], sorted(group["chunks"].items()))
+        for source, group in groups.items()
+    ]
+
+
+def _header(source, relevance):
+    return f"--- SOURCE: {source} (relevance: {relevance:.2f}) ---"
+
+
+def build_context(query_result, query, model=None, top_results=5, budget=CONTEXT_TOKENS):
+    """
+    Packs the passages of the top_results sources that best match 'query'
+    into at most 'budget' tokens of 'model':
+    1. every source's best passage, in source order, while it fits;
+    2. then the remaining passages that match the query at all, best first.
+    A source is only included with at least one passage, and its header is
+    charged to the budget. Passages are printed in document order, with
+    "[...]" between ones that aren't next to each other, and transcript
+    lines always keep their timestamps. Returns the context, or None.
+    """
+    if not query_result or not query_result.objects:
+        return None
+    sources = _group_sources(query_result, top_results)
+    passages_by_source = [
+        split_passages(chunks, rank, model) for rank, (_, _, chunks) in enumerate(sources)
+    ]
+    all_passages = [passage for passages in passages_by_source for passage in passages]
+    score_passages(query, all_passages)
+
+    chosen = {}   # (source rank, position) -> None, in the order taken
+    used = 0
+
+    def take(passage):
+        nonlocal used
+        cost = passage.tokens
+        if not any(rank == passage.source_rank for rank, _ in chosen):
+            source, relevance, _ = sources[passage.source_rank]
+            cost += count_tokens(_header(source, relevance), model)
+        if used + cost > budget:
+            return False
+        chosen[(passage.source_rank, passage.position)] = None
+        used += cost
+        return True
+
+    for passages in passages_by_source:
+        if passages:
+            take(max(passages, key=lambda passage: (passage.score, -passage.position)))
+    for passage in sorted(all_passages, key=lambda passage: passage.score, reverse=True):
+        if passage.score <= 0:
+            break
+        if (passage.source_rank, passage.position) not in chosen:
+            take(passage)
+
+    context = _render(sources, passages_by_source, chosen)
+    # Markers and separators aren't charged above; drop the last passages taken until it fits
+    while context is not None and count_tokens(context, model) > budget:
+        chosen.pop(next(reversed(chosen)))
+        context = _render(sources, passages_by_source, chosen)
+    return context
+
+
+def _render(sources, passages_by_source, chosen):
+    blocks = []
+    for rank, (source, relevance, _) in enumerate(sources):
+        picked = [passage for passage in passages_by_source[rank] if (rank, passage.position) in chosen]
+        if not picked:
+            continue
+        parts = [picked[0].text if picked[0].position == 0 else f"[...]\n{picked[0].text}"]
+        for previous, passage in zip(picked, picked[1:]):
+            adjacent = passage.position == previous.position + 1
+            parts.append(passage.text if adjacent else f"[...]\n{passage.text}")
+        blocks.append(_header(source, relevance) + "\n" + "\n".join(parts))
+    if not blocks:
+        return None
+    return "\n\n".join(blocks)
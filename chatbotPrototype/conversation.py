@@ -0,0 +1,214 @@
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from context_builder import STOPWORDS, count_tokens
+from retrieval import RetrievalResult, object_content
+
+# ------------------------------------------------------------------------
+# Settings
+# ------------------------------------------------------------------------
+RECENT_TURNS = 2            # turns quoted verbatim; older ones are folded into the summary
+TURN_ANSWER_TOKENS = 250    # a recent answer is cut to this many tokens in the prompt
+SUMMARY_TOKENS = 300        # the rolling summary is kept under this size
+MAX_CACHED_CHUNKS = 40      # retrieved chunks remembered per conversation
+REUSE_COVERAGE = 0.6        # share of a follow-up's terms the cached chunks must contain
+FOLLOW_UP_MAX_TERMS = 3     # short questions (in content words) that refer back are follow-ups
+CONVERSATION_TTL = 2 * 3600 # idle conversations are dropped after this many seconds
+MAX_CONVERSATIONS = 1000
+
+# Openings that refer back to the previous turn
+FOLLOW_UP_START = re.compile(
+    r"^(and|but|also|so|what about|how about|more|tell me more|"
+    r"it|its|it's|they|them|their|this|that|these|those|there|he|she|what else)\b",
+    re.IGNORECASE,
+)
+_WORD = re.compile(r"\w+")
+# Words that point back at the conversation rather than at a topic
+REFERRING_WORDS = frozenset(
+    "about also but else he her his its it's me more she so tell their them these they "
+    "those us".split()
+)
+# Pronouns and references that tie a short question to what was said before
+REFERENCE_CUES = frozenset(
+    "above also earlier else former her his it its latter more one ones previous same "
+    "such that their them there these they this those".split()
+)
+
+
+def _terms(text):
+    return {word for word in _WORD.findall(text.lower())
+            if word not in STOPWORDS and word not in REFERRING_WORDS}
+
+
+def truncate_tokens(text, max_tokens):
+    """'text' cut at a word boundary to at most about max_tokens tokens."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    words = text.split()
+    keep = max(1, len(words) * max_tokens // max(1, count_tokens(text)))
+    return " ".join(words[:keep]) + " ..."
+
+
+def extractive_summary(summary, question, answer):
+    """Summarizer of last resort: the question and the answer's first sentence."""
+    first_sentence = re.split(r"(?<=[.!?])\s+", answer.strip(), maxsplit=1)[0]
+    line = f"- Asked: {question.strip()} Answer: {first_sentence}"
+    return f"{summary}\n{line}".strip() if summary else line
+
+# ------------------------------------------------------------------------
+# Conversation state
+# ------------------------------------------------------------------------
+_summarizer_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="conversation-summary")
+
+
+class Conversation:
+    """
+    The memory of one chat session, sized so the prompt stays fixed:
+    - the last RECENT_TURNS question/answer pairs, quoted (answers cut);
+    - a rolling summary of everything older, kept under SUMMARY_TOKENS by
+      'summarize(summary, question, answer) -> summary', run in the
+      background so it never delays an answer;
+    - the chunks retrieved so far (up to MAX_CACHED_CHUNKS, newest kept),
+      so a follow-up they already cover is answered without a new search.
+    """
+
+    def __init__(self, conversation_id, summarize=extractive_summary):
+        self.id = conversation_id
+        self.summarize = summarize
+        self.summary = ""
+        self.turns = deque()
+        self.chunks = OrderedDict()   # uuid -> Weaviate object, oldest first
+        self.last_used = time.time()
+        self._lock = threading.Lock()
+        # Turns waiting to be folded into the summary, oldest first
+        self._unsummarized = deque()
+        # Held across reading, summarizing and writing the summary
+        self._summary_lock = threading.Lock()
+
+    # Questions
+    def is_follow_up(self, question):
+        """Whether 'question' reads as a continuation of the previous turn."""
+        if not self.turns:
+            return False
+        if FOLLOW_UP_START.match(question.strip()):
+            return True
+        # "Why?" refers back by itself; other short questions need a cue like "it"
+        terms = _terms(question)
+        if not terms:
+            return True
+        words = set(_WORD.findall(question.lower()))
+        return len(terms) <= FOLLOW_UP_MAX_TERMS and bool(words & REFERENCE_CUES)
+
+    def search_query(self, question):
+        """The question, with the previous one prepended if it is a follow-up."""
+        if self.is_follow_up(question):
+            return f"{self.turns[-1][0]} {question}"
+        return question
+
+    def coverage(self, question):
+        """Share of the question's content words found in the cached chunks."""
+        terms = _terms(question)
+        if not terms or not self.chunks:
+            return 0.0
+        with self._lock:
+            cached = set()
+            for obj in self.chunks.values():
+                cached |= _terms(object_content(obj))
+        return len(terms & cached) / len(terms)
+
+    def can_reuse_context(self, question):
+        """A follow-up whose words the cached chunks already contain needs no search."""
+        return self.is_follow_up(question) and self.coverage(question) >= REUSE_COVERAGE
+
+    # Retrieved chunks
+    def remember(self, result):
+        """Adds the objects of a search result to the chunk cache."""
+        if not result:
+            return
+        with self._lock:
+            for obj in result.objects:
+                self.chunks.pop(obj.uuid, None)
+                self.chunks[obj.uuid] = obj
+            while len(self.chunks) > MAX_CACHED_CHUNKS:
+                self.chunks.popitem(last=False)
+
+    def cached_result(self):
+        """The cached chunks, most recently retrieved first, as a search result."""
+        with self._lock:
+            objects = list(reversed(self.chunks.values()))
+        return RetrievalResult(objects, [None] * len(objects))
+
+    # Turns
+    def add_turn(self, question, answer):
+        """Records a finished turn; turns leaving the recent window are summarized."""
+        with self._lock:
+            self.turns.append((question, answer))
+            folded = False
+            while len(self.turns) > RECENT_TURNS:
+                self._unsummarized.append(self.turns.popleft())
+                folded = True
+        if folded:
+            _summarizer_pool.submit(self._fold)
+
+    def _fold(self):
+        """Folds the waiting turns into the summary, one fold at a time and in order."""
+        with self._summary_lock:
+            while True:
+                with self._lock:
+                    if not self._unsummarized:
+                        return
+                    question, answer = self._unsummarized.popleft()
+                try:
+                    summary = self.summarize(self.summary, question, answer)
+                except Exception:
+                    summary = extractive_summary(self.summary, question, answer)
+                self.summary = truncate_tokens(summary.strip(), SUMMARY_TOKENS)
+
+    def history(self):
+        """The conversation so far as prompt text of bounded size, or None."""
+        with self._lock:
+            turns = list(self.turns)
+        if not turns and not self.summary:
+            return None
+        parts = []
+        if self.summary:
+            parts.append(f"Summary of the earlier conversation:\n{self.summary}")
+        for question, answer in turns:
+            parts.append(f"User: {question}\nAssistant: {truncate_tokens(answer, TURN_ANSWER_TOKENS)}")
+        return "\n\n".join(parts)
+
+
+class ConversationStore:
+    """Conversations by id, dropped when idle for ttl seconds or least recently used past max_size."""
+
+    def __init__(self, summarize=extractive_summary, ttl=CONVERSATION_TTL, max_size=MAX_CONVERSATIONS):
+        self.summarize = summarize
+        self.ttl = ttl
+        self.max_size = max_size
+        self._conversations = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, conversation_id=None):
+        """The conversation with this id, or a new one (under a new id if None)."""
+        now = time.time()
+        with self._lock:
+            for key in [key for key, conv in self._conversations.items() if now - conv.last_used > self.ttl]:
+                del self._conversations[key]
+            conversation_id = conversation_id or uuid.uuid4().hex
+            conversation = self._conversations.get(conversation_id)
+            if conversation is None:
+                conversation = Conversation(conversation_id, self.summarize)
+                self._conversations[conversation_id] = conversation
+            conversation.last_used = now
+            self._conversations.move_to_end(conversation_id)
+            while len(self._conversations) > self.max_size:
+                self._conversations.popitem(last=False)
+            return conversation
+
+    def drop(self, conversation_id):
+        with self._lock:
+            return self._conversations.pop(conversation_id, None) is not None
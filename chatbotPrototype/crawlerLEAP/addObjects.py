@@ -1,8 +1,17 @@
 import weaviate
 from weaviate.classes.init import Auth
-from weaviate.classes.config import Integrations
+from weaviate.classes.config import Integrations, Tokenization
+from weaviate.classes.query import Filter
+import glob
 import json
+import os
 import time
+import uuid
+from itertools import islice
+
+from sink import SinkReader
+from chunker import iter_chunks
+from dedup import NearDuplicateIndex, dedup_records, write_duplicates_report, DEDUP_INDEX_PATH
 
 # Connect to your Weaviate Cloud instance
 client = weaviate.connect_to_weaviate_cloud(
@@ -24,19 +33,116 @@ storage = client.collections.get("leapData")
 with open("Youtube_Data.json", "r", encoding="utf-8") as f:
     youtube_data_list = json.load(f)
 
-with open("crawl_results.json", "r", encoding="utf-8") as f:
-    website_data_list = json.load(f)
+# The crawler streams new/changed pages to crawled_data/crawl_results-*.jsonl.
+# Those files are consumed as they appear; with FOLLOW_CRAWL the import keeps
+# waiting for more until the crawl finishes, so both can run side by side.
+CRAWL_OUTPUT_DIR = "crawled_data"
+FOLLOW_CRAWL = False
+# Manifest of new/changed pages written by the crawler; used when there is no
+# JSONL output, instead of the whole crawl_results.json
+CHANGED_DOCS_MANIFEST = os.path.join(CRAWL_OUTPUT_DIR, "changed_docs.json")
+
+def load_changed_docs(manifest_path):
+    """Yield WebPage objects for the documents listed in a changed-docs manifest."""
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    for entry in entries:
+        with open(entry["path"], "r", encoding="utf-8") as f:
+            text = f.read()
+        yield {
+            "class": "WebPage",
+            "title": "",
+            "videoId": "",
+            "url": entry["url"],
+            "transcript": text
+        }
+
+def delete_existing(urls, chunk_size=100):
+    """
+    Remove stored versions of re-crawled pages so they aren't duplicated.
+    Matches whole URLs: 'url' must be field-tokenized (see database.py),
+    otherwise any object sharing a word like "https" or "leap" would match.
+    """
+    for i in range(0, len(urls), chunk_size):
+        chunk = urls[i:i+chunk_size]
+        result = storage.data.delete_many(
+            where=Filter.any_of([Filter.by_property("url").equal(url) for url in chunk])
+        )
+        if result.successful:
+            print(f"Deleted {result.successful} outdated objects.")
+
+def mark_ingest():
+    """
+    Record a new ingest version in the collection's description. The chat
+    service's answer cache watches it and drops answers given from the
+    old contents, even when the object count comes out the same.
+    """
+    version = f"{time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())} {uuid.uuid4().hex[:8]}"
+    storage.config.update(description=f"LEAP resources, ingest {version}")
+
+def check_url_tokenization():
+    """Refuse to replace objects by URL when 'url' isn't field-tokenized."""
+    url_property = next((p for p in storage.config.get().properties if p.name == "url"), None)
+    if url_property is not None and url_property.tokenization != Tokenization.FIELD:
+        raise SystemExit(
+            "leapData.url is not field-tokenized, so deleting outdated pages by URL would also "
+            "match unrelated pages. Recreate the collection with database.py and re-import."
+        )
+
+sink_reader = None
+if glob.glob(os.path.join(CRAWL_OUTPUT_DIR, "crawl_results-*.jsonl")) or FOLLOW_CRAWL:
+    # Files are only marked consumed once their records are stored (see process_batch)
+    sink_reader = SinkReader(CRAWL_OUTPUT_DIR, follow=FOLLOW_CRAWL)
+    website_data = sink_reader
+    replace_website_objects = True
+elif os.path.exists(CHANGED_DOCS_MANIFEST):
+    website_data = load_changed_docs(CHANGED_DOCS_MANIFEST)
+    replace_website_objects = True
+else:
+    with open("crawl_results.json", "r", encoding="utf-8") as f:
+        website_data = json.load(f)
+    replace_website_objects = False
+
+# Drop near-duplicate pages (tag pages, pagination, mirrors) before they are
+# embedded; fingerprints of earlier runs are kept in DEDUP_INDEX_PATH
+dedup_index = NearDuplicateIndex.load(DEDUP_INDEX_PATH)
+duplicate_pages = {}
+website_data = dedup_records(website_data, dedup_index, duplicate_pages)
 
 # Configure batch parameters
 batch_size = 50     # Number of objects per batch
 delay_seconds = 60   # Delay between batches (in seconds)
 error_threshold = 10 # Maximum allowed errors before stopping a batch
 
-def process_batch(data_list, data_type):
-    total_objects = len(data_list)
-    for i in range(0, total_objects, batch_size):
-        current_batch = data_list[i:i+batch_size]
-        print(f"Processing {data_type} objects {i+1} to {i+len(current_batch)} of {total_objects}...")
+# Chunk metadata stored next to the usual properties (see chunker.py)
+CHUNK_FIELDS = ("parentId", "chunkIndex", "chunkCount", "heading", "startSeconds", "endSeconds")
+
+def process_batch(data_list, data_type, replace_existing=False, on_stored=None):
+    """
+    Split documents from any iterable (list or streaming generator) into
+    chunks and insert them in batches of batch_size chunks, one vector per
+    chunk. With replace_existing, objects already stored under a document's
+    URL are deleted before its first chunk is inserted.
+
+    After each batch is stored without errors, on_stored(last_complete) is
+    called; last_complete says whether the batch ended with the last chunk
+    of its document. After a failed batch it isn't called again, so
+    nothing from then on is acknowledged.
+    """
+    chunk_iter = iter_chunks(data_list)
+    replaced_urls = set()
+    start = 0
+    failed = False
+    while True:
+        current_batch = list(islice(chunk_iter, batch_size))
+        if not current_batch:
+            break
+        print(f"Processing {data_type} chunks {start+1} to {start+len(current_batch)}...")
+        if replace_existing:
+            # A document's chunks can span batches: only delete its old version once
+            new_urls = {d["url"] for d in current_batch if d.get("url")} - replaced_urls
+            delete_existing(sorted(new_urls))
+            replaced_urls |= new_urls
         with storage.batch.dynamic() as batch:
             for d in current_batch:
                 # Build the object; use get() for optional keys to avoid KeyErrors
@@ -47,18 +153,48 @@ def process_batch(data_list, data_type):
                     "url": d.get("url", ""),
                     "transcript": d.get("transcript", "")
                 }
+                obj.update({field: d[field] for field in CHUNK_FIELDS if field in d})
                 batch.add_object(obj)
                 if batch.number_errors > error_threshold:
                     print("Batch import stopped due to excessive errors.")
                     break
+        mark_ingest()
+        if storage.batch.failed_objects:
+            print(f"{len(storage.batch.failed_objects)} {data_type} chunks failed to import; "
+                  f"their sink files will be read again next run.")
+            failed = True
+        if on_stored is not None and not failed:
+            last = current_batch[-1]
+            on_stored(last["chunkIndex"] == last["chunkCount"] - 1)
+        start += len(current_batch)
         # Wait to avoid exceeding the rate limit
         print(f"Batch processed. Waiting {delay_seconds} seconds before next batch...")
         time.sleep(delay_seconds)
+    if on_stored is not None and not failed:
+        on_stored(True)
 
-print("Processing Youtube data...")
-process_batch(youtube_data_list, "Youtube")
+# Every write below may delete objects by URL
+check_url_tokenization()
+
+if replace_website_objects:
+    # Incremental runs only carry changed pages; the videos are already stored
+    print("Skipping Youtube data (incremental website import).")
+else:
+    print("Processing Youtube data...")
+    # Stored copies of each video are replaced, so re-running doesn't duplicate them
+    process_batch(youtube_data_list, "Youtube", replace_existing=True)
 
 print("Processing website data...")
-process_batch(website_data_list, "Website")
+process_batch(website_data, "Website", replace_existing=replace_website_objects,
+              on_stored=sink_reader.commit if sink_reader else None)
+
+if duplicate_pages:
+    if replace_website_objects:
+        # Pages that turned into copies of another page lose their old objects
+        delete_existing(sorted(duplicate_pages))
+        mark_ingest()
+    write_duplicates_report(duplicate_pages)
+os.makedirs(os.path.dirname(DEDUP_INDEX_PATH), exist_ok=True)
+dedup_index.save(DEDUP_INDEX_PATH)
 
 client.close()  # Free up resources
@@ -0,0 +1,308 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+
+import aiohttp
+
+# Reuse the helpers of the Selenium crawler so both produce the same files
+from crawler import (
+    get_allowed_extension_from_url,
+    normalize_url,
+    parse_html,
+    scrape_pdf,
+    web_page_record,
+    write_text_file,
+)
+from crawlstate import CrawlState, CRAWL_STATE_DB, CHANGED_DOCS_MANIFEST
+from frontier import Frontier
+from pdfstage import close_pdf_stage
+from renderpool import RenderPool
+from sink import RotatingJsonlSink
+import urlconversion
+
+################################################################################
+# Settings
+################################################################################
+MAX_CONNECTIONS = 32          # total pooled connections
+PER_HOST_CONCURRENCY = 4      # simultaneous requests to one host
+PER_HOST_DELAY = 0.25         # seconds between request starts on one host
+REQUEST_TIMEOUT = 30          # seconds per request
+NUM_WORKERS = 16
+USER_AGENT = "LEAP-KG-crawler/1.0"
+
+# A static page with less visible text than this is assumed to be an
+# empty JavaScript shell and is sent to the headless browser instead.
+MIN_STATIC_TEXT_CHARS = 200
+JS_SHELL_MARKERS = (
+    'id="root"',
+    'id="app"',
+    'id="__next"',
+    "enable JavaScript",
+)
+# Hosts known to be JavaScript apps: every page goes straight to the browsers
+BROWSER_ONLY_HOSTS = set()
+TEXT_CONTENT_TYPES = ("text/html", "text/plain", "text/markdown", "text/csv", "application/xhtml")
+
+################################################################################
+# Per-host politeness
+################################################################################
+class HostThrottle:
+    """
+    Limits how hard one host is hit: at most 'concurrency' requests in
+    flight, and request starts spaced at least 'delay' seconds apart.
+    """
+
+    def __init__(self, concurrency=PER_HOST_CONCURRENCY, delay=PER_HOST_DELAY):
+        self.concurrency = concurrency
+        self.delay = delay
+        self._semaphores = {}
+        self._locks = {}
+        self._next_start = {}
+
+    @asynccontextmanager
+    async def slot(self, host):
+        semaphore = self._semaphores.setdefault(host, asyncio.Semaphore(self.concurrency))
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with semaphore:
+            async with lock:
+                loop = asyncio.get_running_loop()
+                wait = self._next_start.get(host, 0.0) - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self._next_start[host] = loop.time() + self.delay
+            yield
+
+################################################################################
+# Browser fallback
+################################################################################
+def needs_browser(html: str, cleaned_text: str) -> bool:
+    """
+    Decides whether the static HTML is missing its content, i.e. the page
+    only fills itself in with JavaScript.
+    """
+    if len(cleaned_text) >= MIN_STATIC_TEXT_CHARS:
+        return False
+    if not cleaned_text or any(marker in html for marker in JS_SHELL_MARKERS):
+        return True
+    # A short page is only suspicious if it is mostly scripts
+    return html.count("<script") >= 3
+
+
+################################################################################
+# Crawler
+################################################################################
+class AsyncCrawler:
+    """
+    HTTP-first crawler: pages are fetched concurrently over one pooled
+    aiohttp session, and only pages whose static HTML has no content are
+    handed to 'renderer' (an async callable url -> page source, e.g. a
+    RenderPool). Pages on 'browser_hosts' skip the static fetch entirely.
+    Like crawl_site_selenium, it stays on the exact domain of each seed.
+    With a CrawlState, requests are conditional: 304 and unchanged pages
+    are neither rewritten nor returned, but their links are still followed.
+    With a sink, records are streamed out instead of kept in self.visited.
+    """
+
+    def __init__(self, output_dir="crawled_data", max_depth=100, max_pages=100000,
+                 num_workers=NUM_WORKERS, renderer=None, throttle=None,
+                 browser_hosts=BROWSER_ONLY_HOSTS, state=None, sink=None):
+        self.output_dir = output_dir
+        self.state = state
+        self.sink = sink
+        self.browser_hosts = set(browser_hosts)
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.num_workers = num_workers
+        self.renderer = renderer
+        self.throttle = throttle or HostThrottle()
+        self.visited = {}
+        self.rendered_count = 0
+        self.frontier = Frontier()
+        self._queued = 0
+        self._in_flight = 0
+        self._ready = None
+        self._session = None
+
+    def _enqueue(self, url, depth, domain, anchor_text=""):
+        if (urlparse(url).netloc != domain
+                or depth > self.max_depth
+                or self._queued >= self.max_pages):
+            return
+        if self.frontier.push(url, depth, key=normalize_url(url), anchor_text=anchor_text, extra=domain):
+            self._queued += 1
+
+    async def _fetch(self, url):
+        """Returns (status, content_type, body_text) for a URL."""
+        host = urlparse(url).netloc
+        headers = self.state.conditional_headers(url) if self.state else None
+        async with self.throttle.slot(host):
+            async with self._session.get(url, headers=headers) as response:
+                if self.state and response.status == 200:
+                    self.state.note_validators(
+                        url, response.headers.get("ETag"), response.headers.get("Last-Modified")
+                    )
+                content_type = response.headers.get("Content-Type", "")
+                if response.status != 200 or not content_type.startswith(TEXT_CONTENT_TYPES):
+                    return response.status, content_type, ""
+                return response.status, content_type, await response.text(errors="replace")
+
+    async def _process(self, url, depth, domain):
+        loop = asyncio.get_running_loop()
+        ext = get_allowed_extension_from_url(url)
+
+        if ext == "pdf":
+            pdf_text = await loop.run_in_executor(None, scrape_pdf, url, self.state)
+            if pdf_text is None:
+                self.state.mark_unchanged(url)
+                return
+            self._store(url, pdf_text)
+            return
+
+        if self.renderer is not None and urlparse(url).netloc in self.browser_hosts:
+            try:
+                html = await self.renderer(url)
+            except Exception as e:
+                self._emit(url, f"Error loading {url} with browser: {e}")
+                return
+            self.rendered_count += 1
+            cleaned_text, links = await loop.run_in_executor(None, parse_html, html, url)
+            self._store(url, cleaned_text, links)
+            self._follow(links, depth, domain)
+            return
+
+        try:
+            status, content_type, body = await self._fetch(url)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self._emit(url, f"Error loading {url}: {e}")
+            return
+        if status == 304:
+            # Not modified: keep last crawl's file, but still walk its links
+            self.state.mark_unchanged(url)
+            self._follow(self.state.known_links(url), depth, domain)
+            return
+        if status != 200:
+            self._emit(url, f"Error loading {url}: HTTP {status}")
+            return
+        if not body:
+            # Not a text document (images, archives, ...)
+            return
+
+        if "html" not in content_type:
+            cleaned_text = "\n".join(line.strip() for line in body.splitlines() if line.strip())
+            self._store(url, cleaned_text)
+            return
+
+        cleaned_text, links = await loop.run_in_executor(None, parse_html, body, url)
+        if self.renderer is not None and needs_browser(body, cleaned_text):
+            try:
+                rendered = await self.renderer(url)
+                cleaned_text, links = await loop.run_in_executor(None, parse_html, rendered, url)
+                self.rendered_count += 1
+            except Exception as e:
+                print(f"Browser fallback failed for {url}: {e}")
+        self._store(url, cleaned_text, links)
+        self._follow(links, depth, domain)
+
+    def _emit(self, url, text):
+        if self.sink is None:
+            self.visited[url] = text
+        else:
+            self.sink.write(web_page_record(url, text))
+
+    def _follow(self, links, depth, domain):
+        for next_url, anchor_text in links:
+            self._enqueue(next_url, depth + 1, domain, anchor_text)
+
+    def _store(self, url, cleaned_text, links=()):
+        if not cleaned_text.strip():
+            cleaned_text = "Warning: No visible text extracted from this HTML page."
+
+        ext = get_allowed_extension_from_url(url)
+        if ext == "pdf":
+            s3_filename = os.path.join(self.output_dir, urlconversion.encode_url_to_filename(url, "pdf"))
+        elif ext:
+            s3_filename = os.path.join(self.output_dir, urlconversion.encode_url_to_filename(url, ext))
+        else:
+            s3_filename = os.path.join(self.output_dir, urlconversion.encode_url_to_filename(url))
+        if self.state and not self.state.record(url, cleaned_text, s3_filename, links):
+            return  # same text as the last crawl
+        write_text_file(s3_filename, cleaned_text)
+        self._emit(url, cleaned_text)
+        print(f"Scraped: {url} ({len(cleaned_text)} chars)")
+
+    async def _worker(self):
+        while True:
+            async with self._ready:
+                # Wait for work while other pages may still add links
+                while not self.frontier and self._in_flight:
+                    await self._ready.wait()
+                if not self.frontier:
+                    self._ready.notify_all()
+                    return
+                url, depth, domain = self.frontier.pop()
+                self._in_flight += 1
+            try:
+                await self._process(url, depth, domain)
+            except Exception as e:
+                print(f"Error processing {url}: {e}")
+                self._emit(url, f"Error processing {url}: {e}")
+            finally:
+                async with self._ready:
+                    self._in_flight -= 1
+                    self._ready.notify_all()
+
+    async def crawl(self, seed_urls):
+        """Crawl every seed concurrently and return {url: cleaned_text}."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._ready = asyncio.Condition()
+        for url in seed_urls:
+            self._enqueue(url, 0, urlparse(url).netloc)
+
+        connector = aiohttp.TCPConnector(limit=MAX_CONNECTIONS, limit_per_host=PER_HOST_CONCURRENCY)
+        timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        async with aiohttp.ClientSession(
+            connector=connector, timeout=timeout, headers={"User-Agent": USER_AGENT}
+        ) as session:
+            self._session = session
+            try:
+                await asyncio.gather(*(self._worker() for _ in range(self.num_workers)))
+            finally:
+                self._session = None
+        return self.visited
+
+################################################################################
+# Main runner
+################################################################################
+def main():
+    """
+    Same seeds and output as crawler.main(), but static pages are fetched
+    over HTTP and Selenium is only used for JavaScript-rendered pages.
+    """
+    output_dir = "crawled_data"
+    seed_urls = [
+        "https://leap-stc.github.io",
+        "https://leap.columbia.edu",
+        "https://catalog.leap.columbia.edu",
+    ]
+
+    os.makedirs(output_dir, exist_ok=True)
+    state = CrawlState(os.path.join(output_dir, CRAWL_STATE_DB))
+    sink = RotatingJsonlSink(output_dir)
+    renderer = RenderPool()
+    crawler = AsyncCrawler(output_dir=output_dir, renderer=renderer, state=state, sink=sink)
+    try:
+        asyncio.run(crawler.crawl(seed_urls))
+    finally:
+        renderer.close()
+        close_pdf_stage()
+        sink.close()
+        state.write_manifest(os.path.join(output_dir, CHANGED_DOCS_MANIFEST))
+        state.close()
+
+    print(f"\nStreamed crawl results to '{output_dir}/crawl_results-*.jsonl'.")
+    print(f"New or changed pages: {sink.records_written} ({crawler.rendered_count} rendered in a browser)")
+    print(f"Browsers started: {renderer.browsers_started}, crashes: {renderer.crashes}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import json
+import sys
+import time
+from urllib.parse import urljoin
+
+import requests
+from bs4 import BeautifulSoup
+
+from extractors import BACKENDS
+
+##############################
+#  CONFIG
+##############################
+OUTPUT_FILE = "bench_extractors.json"
+REPEATS = 5
+# Pages benchmarked when no HTML files or URLs are given on the command line
+DEFAULT_PAGES = [
+    "https://leap-stc.github.io",
+    "https://leap.columbia.edu",
+    "https://leap.columbia.edu/research/",
+    "https://catalog.leap.columbia.edu",
+]
+
+
+def legacy_parse_html(page_source, base_url):
+    """The previous crawler.parse_html: html.parser, extract pass, find_all pass."""
+    soup = BeautifulSoup(page_source, "html.parser")
+    for script_or_style in soup(["script", "style"]):
+        script_or_style.extract()
+    text = soup.get_text(separator="\n")
+    cleaned_text = "\n".join(line.strip() for line in text.splitlines() if line.strip())
+    links = [
+        (urljoin(base_url, link["href"]), link.get_text(" ", strip=True))
+        for link in soup.find_all("a", href=True)
+    ]
+    return cleaned_text, links
+
+
+def load_pages(sources):
+    """(base_url, html) for each local file or URL."""
+    pages = []
+    for source in sources:
+        if source.startswith(("http://", "https://")):
+            response = requests.get(source, timeout=30)
+            response.raise_for_status()
+            pages.append((source, response.text))
+        else:
+            with open(source, "r", encoding="utf-8", errors="replace") as f:
+                pages.append((f"file://{source}", f.read()))
+    return pages
+
+
+def main():
+    pages = load_pages(sys.argv[1:] or DEFAULT_PAGES)
+    total_kb = sum(len(html) for _, html in pages) / 1024
+    print(f"{len(pages)} pages, {total_kb:.0f} KB of HTML, best of {REPEATS} runs")
+
+    extractors = {"legacy-bs4": legacy_parse_html}
+    for name, fn in BACKENDS.items():
+        if fn is not None:
+            extractors[name] = fn
+            extractors[f"{name}-keep-boilerplate"] = (
+                lambda html, url, fn=fn: fn(html, url, strip_boilerplate=False)
+            )
+
+    baseline_links = [len(legacy_parse_html(html, url)[1]) for url, html in pages]
+    results = {}
+    for name, fn in extractors.items():
+        best = float("inf")
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            outputs = [fn(html, url) for url, html in pages]
+            best = min(best, time.perf_counter() - start)
+        results[name] = {
+            "ms_per_page": round(best / len(pages) * 1000, 3),
+            "text_chars": sum(len(text) for text, _ in outputs),
+            "links": sum(len(links) for _, links in outputs),
+            "link_count_matches_legacy": [len(links) for _, links in outputs] == baseline_links,
+        }
+
+    legacy = results["legacy-bs4"]
+    print(f"{'extractor':>30} {'ms/page':>9} {'speedup':>8} {'text chars':>11} {'links':>7}")
+    for name, row in results.items():
+        row["speedup"] = round(legacy["ms_per_page"] / row["ms_per_page"], 2) if row["ms_per_page"] else None
+        print(f"{name:>30} {row['ms_per_page']:>9.2f} {row['speedup'] or 0:>7.1f}x "
+              f"{row['text_chars']:>11} {row['links']:>7}")
+
+    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
+        json.dump({"pages": [url for url, _ in pages], "results": results}, f, indent=2)
+    print(f"Benchmark results saved to {OUTPUT_FILE}")
+
+
+if __name__ == "__main__":
+    main()
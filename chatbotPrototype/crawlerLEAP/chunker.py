@@ -0,0 +1,172 @@
+import re
+import uuid
+
+# Exact token counts if tiktoken is installed; otherwise a close estimate
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except ImportError:
+    _ENCODING = None
+
+################################################################################
+# Settings
+################################################################################
+CHUNK_TOKENS = 400        # target size of one chunk (Cohere embeds up to 512)
+CHUNK_OVERLAP = 60        # tokens repeated at the start of the next chunk
+MIN_CHUNK_TOKENS = 120    # don't cut at a heading before a chunk is this big
+MAX_HEADING_CHARS = 80
+
+# Properties copied from the parent document onto every chunk
+PARENT_FIELDS = ("class", "title", "videoId", "url", "publishedAt")
+# YouTube transcript lines, as written by yt.py: "12.34s: text"
+TIMESTAMP_LINE = re.compile(r"^(\d+(?:\.\d+)?)s:\s*(.*)$")
+MARKDOWN_HEADING = re.compile(r"^#{1,6}\s+\S")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text):
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    # Word pieces and punctuation, a little above real BPE counts for English
+    return len(_TOKEN_PATTERN.findall(text))
+
+
+def _is_heading(line, next_line):
+    """A markdown heading, or a short title-like line followed by body text."""
+    if MARKDOWN_HEADING.match(line):
+        return True
+    return (
+        len(line) <= MAX_HEADING_CHARS
+        and not line.endswith((".", ",", ";", ":", "!", "?"))
+        and next_line is not None
+        and len(next_line) > 2 * len(line)
+    )
+
+################################################################################
+# Splitting into units
+################################################################################
+def _units(text, max_tokens=CHUNK_TOKENS):
+    """
+    Splits a document into units that are never cut in the middle: lines
+    (one transcript cue, one paragraph) tagged with whether they start a
+    section and, for transcripts, their start time in seconds.
+    Yields (line, tokens, is_heading, seconds).
+    """
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    for i, line in enumerate(lines):
+        match = TIMESTAMP_LINE.match(line)
+        if match:
+            yield line, count_tokens(line), False, float(match.group(1))
+            continue
+        next_line = lines[i + 1] if i + 1 < len(lines) else None
+        heading = _is_heading(line, next_line)
+        tokens = count_tokens(line)
+        if tokens <= max_tokens:
+            yield line, tokens, heading, None
+            continue
+        # A paragraph longer than a whole chunk: fall back to sentences, then words
+        for sentence in SENTENCE_END.split(line):
+            sentence_tokens = count_tokens(sentence)
+            if sentence_tokens <= max_tokens:
+                yield sentence, sentence_tokens, False, None
+                continue
+            words = sentence.split()
+            step = max(1, len(words) * max_tokens // sentence_tokens)
+            for start in range(0, len(words), step):
+                piece = " ".join(words[start:start + step])
+                yield piece, count_tokens(piece), False, None
+
+################################################################################
+# Chunking
+################################################################################
+def chunk_text(text, max_tokens=CHUNK_TOKENS, overlap=CHUNK_OVERLAP):
+    """
+    Packs the units of 'text' into windows of at most max_tokens. A window
+    is closed early at a heading (once it has MIN_CHUNK_TOKENS), and the
+    last ~overlap tokens of a window are repeated at the start of the next
+    one unless the cut falls on a heading. Transcript cues are never split,
+    so each chunk keeps its timestamps.
+    Returns a list of dicts: text, heading, start_seconds, end_seconds.
+    """
+    chunks = []
+    window = []          # (unit, heading in effect) of the chunk being built
+    window_tokens = 0
+    heading = ""
+
+    def close(carry_overlap):
+        nonlocal window, window_tokens
+        seconds = [unit[3] for unit, _ in window if unit[3] is not None]
+        chunks.append({
+            "text": "\n".join(unit[0] for unit, _ in window),
+            "heading": window[0][1],
+            "start_seconds": seconds[0] if seconds else None,
+            "end_seconds": seconds[-1] if seconds else None,
+        })
+        kept, kept_tokens = [], 0
+        if carry_overlap:
+            for entry in reversed(window[1:]):
+                if kept_tokens + entry[0][1] > overlap:
+                    break
+                kept.insert(0, entry)
+                kept_tokens += entry[0][1]
+        window, window_tokens = kept, kept_tokens
+
+    for unit in _units(text, max_tokens):
+        line, tokens, is_heading, _ = unit
+        if window and is_heading and window_tokens >= MIN_CHUNK_TOKENS:
+            close(carry_overlap=False)
+        elif window and window_tokens + tokens > max_tokens:
+            close(carry_overlap=True)
+            # The carried-over units must leave room for the new one
+            while window and window_tokens + tokens > max_tokens:
+                window_tokens -= window.pop(0)[0][1]
+        if is_heading:
+            heading = line.lstrip("# ")
+        window.append((unit, heading))
+        window_tokens += tokens
+    if window:
+        close(carry_overlap=False)
+    return chunks
+
+
+def parent_id(doc):
+    """Stable id shared by all chunks of one document."""
+    key = doc.get("url") or doc.get("videoId") or doc.get("title", "")
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, key))
+
+
+def chunk_document(doc, max_tokens=CHUNK_TOKENS, overlap=CHUNK_OVERLAP):
+    """
+    Splits one crawled page or video into chunk objects ready for Weaviate:
+    the parent's properties, the chunk text as 'transcript', and
+    parentId / chunkIndex / chunkCount / heading (plus startSeconds and
+    endSeconds for transcripts) so results can be grouped by document.
+    """
+    text = doc.get("transcript", "")
+    parts = chunk_text(text, max_tokens, overlap) or [
+        {"text": text, "heading": "", "start_seconds": None, "end_seconds": None}
+    ]
+    base = {field: doc[field] for field in PARENT_FIELDS if field in doc}
+    pid = parent_id(doc)
+    chunks = []
+    for index, part in enumerate(parts):
+        chunk = dict(base)
+        chunk.update({
+            "transcript": part["text"],
+            "parentId": pid,
+            "chunkIndex": index,
+            "chunkCount": len(parts),
+            "heading": part["heading"],
+        })
+        if part["start_seconds"] is not None:
+            chunk["startSeconds"] = part["start_seconds"]
+            chunk["endSeconds"] = part["end_seconds"]
+        chunks.append(chunk)
+    return chunks
+
+
+def iter_chunks(docs, max_tokens=CHUNK_TOKENS, overlap=CHUNK_OVERLAP):
+    """Chunks of every document of an iterable, streamed in order."""
+    for doc in docs:
+        yield from chunk_document(doc, max_tokens, overlap)
@@ -1,19 +1,26 @@
 import os
 import time
-import json
-import io
 import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urlparse
 # Selenium imports
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
 from webdriver_manager.chrome import ChromeDriverManager
-# PyMuPDF for PDF extraction
-import fitz  
+# Single-pass HTML text/link extraction
+from extractors import extract_text_and_links
+# Streaming, parallel PDF extraction with PyMuPDF
+from pdfstage import get_pdf_stage, close_pdf_stage
 # Import custom URL conversion script
 import urlconversion
+# Priority frontier with Bloom-filter dedup
+from frontier import Frontier
+# ETag/Last-Modified/content-hash state for incremental re-crawls
+from crawlstate import CrawlState, CRAWL_STATE_DB, CHANGED_DOCS_MANIFEST
+# Streaming JSONL output
+from sink import RotatingJsonlSink
 
 ################################################################################
 # Utility: Decide if a URL has one of the allowed extensions
@@ -74,104 +81,171 @@ def write_text_file(filename: str, text: str) -> str:
 ################################################################################
 # PDF scraping with PyMuPDF
 ################################################################################
-def scrape_pdf(url: str) -> str:
+REQUEST_TIMEOUT = 60  # seconds
+
+def scrape_pdf(url: str, state=None):
     """
     Downloads and extracts text from a PDF file at 'url' using PyMuPDF (fitz).
     Returns the extracted text as a string.
     - If no text is found, returns a warning that it may be image-based.
     - If there's an error, returns an error string.
+    - With a CrawlState, the request is conditional and None is returned
+      when the server says the PDF hasn't changed (HTTP 304).
+    The work is done by the shared PdfStage (see pdfstage.py): the file is
+    streamed to disk, pages are extracted on a process pool, size and time
+    are capped, and text is cached by the PDF's content hash.
+    """
+    return get_pdf_stage().fetch(url, state)
+
+################################################################################
+# Weaviate-style record for one crawled page
+################################################################################
+def web_page_record(url: str, text: str) -> dict:
+    return {
+        "class": "WebPage",
+        "title": "",
+        "videoId": "",
+        "url": url,
+        "transcript": text
+    }
+
+################################################################################
+# Conditional request: has the page changed since the last crawl?
+################################################################################
+def not_modified(url: str, state) -> bool:
+    """
+    Sends a conditional GET with the validators stored in 'state'.
+    Returns True on 304 Not Modified; otherwise remembers the new
+    validators for state.record() and returns False. Pages without stored
+    validators are never probed.
     """
+    headers = state.conditional_headers(url)
+    if not headers:
+        return False
     try:
-        response = requests.get(url)
-        if response.status_code != 200:
-            return f"Error fetching PDF: {response.status_code}"
-        pdf_bytes = io.BytesIO(response.content)
-        # Open the PDF with fitz (PyMuPDF)
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-        all_text = ""
-        # Extract text from each page
-        for page in doc:
-            page_text = page.get_text("text")  # or "blocks"/"words" if needed
-            all_text += page_text + "\n"
-        doc.close()
-        if not all_text.strip():
-            return "Warning: PDF may be image-based or PyMuPDF couldn't extract text."
-        print(f"Scraped PDF: {url} ({len(all_text)} chars)")
-        return all_text
-    except Exception as e:
-        return f"Error processing PDF {url}: {e}"
+        response = requests.get(url, headers=headers, timeout=REQUEST_TIMEOUT, stream=True)
+        response.close()
+    except requests.exceptions.RequestException:
+        return False
+    if response.status_code == 304:
+        return True
+    state.note_validators(url, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+    return False
+
+################################################################################
+# HTML parsing: visible text plus outgoing links
+################################################################################
+def parse_html(page_source: str, base_url: str):
+    """
+    Parses an HTML document and returns (cleaned_text, links):
+    - cleaned_text: visible text, one non-empty line per line, without
+      navigation/header/footer boilerplate
+    - links: (absolute URL, link text) for every <a href> on the page
+    Uses the fastest installed backend of extractors.py (selectolax, lxml
+    or BeautifulSoup); see benchExtractors.py.
+    """
+    return extract_text_and_links(page_source, base_url)
 
 ################################################################################
 # Main crawl function using Selenium (recursive), EXACT DOMAIN only
 ################################################################################
-def crawl_site_selenium(driver, start_url, max_depth, max_pages, output_dir="crawled_pages"):
+def crawl_site_selenium(driver, start_url, max_depth, max_pages, output_dir="crawled_pages", frontier=None,
+                        state=None, sink=None):
     """
     Recursively crawls from start_url up to max_depth link-hops,
     limiting to max_pages in total, using Selenium to render pages.
     Returns a dict {url: cleaned_text}.
     This function also handles PDF and other file types.
     Stays on the EXACT same domain as start_url (no subdomains).
+    Pages are visited best-first from a frontier.Frontier (shallow and
+    research-related links first); pass one in to share its seen-URL filter.
+    With a CrawlState, pages the server reports as unchanged (304) are not
+    rendered again, unchanged text is not rewritten, and only new or
+    changed pages are returned.
+    With a sink (e.g. RotatingJsonlSink), each page is written out as a
+    record as soon as it is scraped and the returned dict stays empty, so
+    memory doesn't grow with the size of the site.
     """
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
     
     # Dictionary to track visited URLs and their content
     visited = {}
-    # Queue of (url, depth) pairs to visit
-    to_visit = [(start_url, 0)]
-    # Set to track normalized URLs to avoid duplicates
-    normalized_urls = set()
-    
-    # Add the normalized start URL to our tracking set
-    normalized_urls.add(normalize_url(start_url))
+    # Priority queue of (url, depth) pairs to visit; its Bloom filter
+    # tracks normalized URLs to avoid duplicates in bounded memory
+    to_visit = frontier if frontier is not None else Frontier()
+    to_visit.push(start_url, 0, key=normalize_url(start_url))
     
     # Extract the domain to enforce same-domain crawling
     start_domain = urlparse(start_url).netloc
+    pages_done = 0
     
-    while to_visit and len(visited) < max_pages:
-        current_url, current_depth = to_visit.pop(0)
+    def emit(url, text):
+        if sink is None:
+            visited[url] = text
+        else:
+            sink.write(web_page_record(url, text))
+    
+    def follow(links, current_depth):
+        for next_url, anchor_text in links:
+            # Check if we should visit this URL:
+            # 1. It's on the same domain and within max depth
+            # 2. We haven't reached max pages
+            # 3. We haven't queued it before (checked by the frontier)
+            if (urlparse(next_url).netloc == start_domain and 
+                current_depth + 1 <= max_depth and
+                pages_done < max_pages):
+                
+                # Normalize the URL to prevent duplicates
+                to_visit.push(next_url, current_depth + 1, key=normalize_url(next_url),
+                              anchor_text=anchor_text)
+    
+    while to_visit and pages_done < max_pages:
+        current_url, current_depth = to_visit.pop()
         
         # Skip if we've reached max depth
         if current_depth > max_depth:
             continue
         
         print(f"Processing URL: {current_url} (Depth: {current_depth})")
+        pages_done += 1
         
         # Figure out if the URL has an allowed extension
         ext = get_allowed_extension_from_url(current_url)
         
         # If it's a PDF link, handle separately
         if ext == "pdf":
-            pdf_text = scrape_pdf(current_url)
+            pdf_text = scrape_pdf(current_url, state=state)
+            if pdf_text is None:
+                print(f"Unchanged since last crawl: {current_url}")
+                state.mark_unchanged(current_url)
+                continue
             # Derive S3-friendly filename
             s3_filename = os.path.join(output_dir, urlconversion.encode_url_to_filename(current_url, "pdf"))
-            written_path = write_text_file(s3_filename, pdf_text)
-            print(f"PDF saved to: {written_path}")
-            visited[current_url] = pdf_text
+            if state is None or state.record(current_url, pdf_text, s3_filename):
+                written_path = write_text_file(s3_filename, pdf_text)
+                print(f"PDF saved to: {written_path}")
+                emit(current_url, pdf_text)
+            continue
+        
+        # Ask the server first whether the page changed; skip rendering if not
+        if state is not None and not_modified(current_url, state):
+            print(f"Unchanged since last crawl: {current_url}")
+            state.mark_unchanged(current_url)
+            follow(state.known_links(current_url), current_depth)
             continue
         
         # Attempt to load HTML (or other text-based pages) with Selenium
         try:
             driver.get(current_url)
-            time.sleep(1)  # wait for JavaScript to load
+            wait_for_page_ready(driver)  # wait for JavaScript to fill in the page
         except Exception as e:
             error_msg = f"Error loading {current_url} with Selenium: {e}"
             print(error_msg)
-            visited[current_url] = error_msg
+            emit(current_url, error_msg)
             continue
         
-        page_source = driver.page_source
-        soup = BeautifulSoup(page_source, "html.parser")
-        
-        # Remove script and style elements
-        for script_or_style in soup(["script", "style"]):
-            script_or_style.extract()
-        
-        # Extract visible text
-        text = soup.get_text(separator="\n")
-        lines = [line.strip() for line in text.splitlines() if line.strip()]
-        cleaned_text = "\n".join(lines)
-        
+        cleaned_text, links = parse_html(driver.page_source, current_url)
         if not cleaned_text.strip():
             cleaned_text = "Warning: No visible text extracted from this HTML page."
         
@@ -183,39 +257,24 @@ def crawl_site_selenium(driver, start_url, max_depth, max_pages, output_dir="cra
         else:
             s3_filename = os.path.join(output_dir, urlconversion.encode_url_to_filename(current_url))
         
-        # Write content to file
-        written_path = write_text_file(s3_filename, cleaned_text)
-        print(f"Content saved to: {written_path}")
-        
-        # Record that we've visited this URL
-        visited[current_url] = cleaned_text
-        
-        # Find all links on the page
-        links = soup.find_all("a", href=True)
-        for link in links:
-            href = link["href"]
-            next_url = urljoin(current_url, href)
-            
-            # Normalize the URL to prevent duplicates
-            normalized_next_url = normalize_url(next_url)
+        # Write content to file, unless the text is the same as last crawl
+        if state is None or state.record(current_url, cleaned_text, s3_filename, links):
+            written_path = write_text_file(s3_filename, cleaned_text)
+            print(f"Content saved to: {written_path}")
             
-            # Check if we should visit this URL:
-            # 1. It's on the same domain
-            # 2. We haven't visited it before
-            # 3. We haven't reached max pages
-            if (urlparse(next_url).netloc == start_domain and 
-                normalized_next_url not in normalized_urls and 
-                len(visited) < max_pages):
-                
-                # Add to our queue and tracking set
-                to_visit.append((next_url, current_depth + 1))
-                normalized_urls.add(normalized_next_url)
+            # Record that we've visited this URL
+            emit(current_url, cleaned_text)
+        
+        # Follow the links found on the page
+        follow(links, current_depth)
     
     return visited
 
 ################################################################################
 # Selenium driver setup
 ################################################################################
+PAGE_LOAD_TIMEOUT = 30  # seconds
+
 def setup_driver(headless=True):
     """
     Configures and returns a Selenium WebDriver (Chrome) instance
@@ -231,22 +290,64 @@ def setup_driver(headless=True):
     chrome_options.add_argument("--window-size=1920,1080")  # Set window size for better rendering
     service = Service(ChromeDriverManager().install())
     driver = webdriver.Chrome(service=service, options=chrome_options)
+    driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT)  # a hung page raises instead of blocking forever
     return driver
 
+################################################################################
+# Wait until a rendered page is actually ready
+################################################################################
+PAGE_READY_TIMEOUT = 10  # seconds
+
+def wait_for_page_ready(driver, timeout=PAGE_READY_TIMEOUT, poll=0.25):
+    """
+    Waits until the document has finished loading and its visible text has
+    stopped changing between two polls (i.e. scripts are done filling it in).
+    Returns True once the page settles, False if 'timeout' seconds pass first;
+    either way the caller can read whatever is in driver.page_source.
+    """
+    deadline = time.monotonic() + timeout
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=poll).until(
+            lambda d: d.execute_script("return document.readyState") == "complete"
+        )
+        last_length = None
+        while time.monotonic() < deadline:
+            length = driver.execute_script(
+                "return document.body ? document.body.innerText.length : 0"
+            )
+            if length == last_length:
+                return True
+            last_length = length
+            time.sleep(poll)
+    except TimeoutException:
+        pass
+    return False
+
 ################################################################################
 # Main runner
 ################################################################################
 def main():
     """
-    Crawls given seed URLs and saves the results in a JSON file,
-    staying strictly on the same domain for each seed URL.
+    Crawls given seed URLs and streams the results to rotating JSONL files
+    (crawled_data/crawl_results-NNNNN.jsonl), staying strictly on the same
+    domain for each seed URL. addObjects.py can ingest those files while
+    the crawl is still running.
+    Re-runs are incremental: the JSONL output and the changed-docs manifest
+    only hold pages that are new or changed since the previous crawl.
     Uses urlconversion.encode_url_to_filename() to store files locally
     in a manner consistent with what S3 (Bedrock) expects.
+    This is the serial crawler: one Chrome renders every page in turn.
+    asynccrawler.main() replaces it for real crawls; it fetches static pages
+    concurrently and renders the rest on a RenderPool of browsers.
     """
     driver = setup_driver(headless=True)
     
     # Set the output directory
     output_dir = "crawled_data"
+    os.makedirs(output_dir, exist_ok=True)
+    # Remember validators/hashes between runs so re-crawls are incremental
+    state = CrawlState(os.path.join(output_dir, CRAWL_STATE_DB))
+    sink = RotatingJsonlSink(output_dir)
     
     seed_urls = [
         "https://leap-stc.github.io",
@@ -256,38 +357,25 @@ def main():
     
     max_depth = 100000000000000
     max_pages = 100000000000000
-    all_scraped = {}
     
     try:
         for url in seed_urls:
             print(f"\n{'='*80}\nCrawling seed URL: {url}\n{'='*80}")
-            crawled_data = crawl_site_selenium(
-                driver, start_url=url, max_depth=max_depth, max_pages=max_pages, output_dir=output_dir
+            crawl_site_selenium(
+                driver, start_url=url, max_depth=max_depth, max_pages=max_pages, output_dir=output_dir,
+                state=state, sink=sink
             )
-            all_scraped.update(crawled_data)
     finally:
         # Ensure driver is closed even if there's an exception
         driver.quit()
+        close_pdf_stage()
+        sink.close()
+        # List what's new or changed so addObjects.py only re-ingests that
+        state.write_manifest(os.path.join(output_dir, CHANGED_DOCS_MANIFEST))
+        state.close()
     
-    # Convert the scraped data dict to a list of objects for Weaviate
-    weaviate_objects = []
-    for url, text in all_scraped.items():
-        obj = {
-            "class": "WebPage",
-            "title": "",
-            "videoId": "",
-            "url": url,
-            "transcript": text
-        }
-        weaviate_objects.append(obj)
-    
-    # Save the crawl results as JSON
-    output_filename = os.path.join(output_dir, "crawl_results.json")
-    with open(output_filename, "w", encoding="utf-8") as f:
-        json.dump(weaviate_objects, f, ensure_ascii=False, indent=2)
-    
-    print(f"\nSaved crawl results to '{output_filename}'.")
-    print(f"Total pages crawled: {len(all_scraped)}")
+    print(f"\nStreamed crawl results to '{output_dir}/crawl_results-*.jsonl'.")
+    print(f"New or changed pages: {sink.records_written}")
     print("Done.")
 
 if __name__ == "__main__":
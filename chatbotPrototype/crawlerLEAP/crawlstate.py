@@ -0,0 +1,125 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+################################################################################
+# Settings
+################################################################################
+CRAWL_STATE_DB = "crawl_state.sqlite"
+CHANGED_DOCS_MANIFEST = "changed_docs.json"
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+################################################################################
+# Crawl state database
+################################################################################
+class CrawlState:
+    """
+    Remembers, per URL, what the previous crawls saw: the ETag and
+    Last-Modified validators, a SHA-256 of the extracted text, the file it
+    was saved to and its outgoing links.
+
+    A re-crawl uses it to
+    - send If-None-Match / If-Modified-Since, so the server can answer 304
+    - skip rewriting pages whose extracted text did not change
+    - keep following the links of unchanged pages without re-parsing them
+    - list new and changed documents in a manifest for addObjects.py
+    Safe to share between crawler threads.
+    """
+
+    def __init__(self, path=CRAWL_STATE_DB):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS pages (
+                   url TEXT PRIMARY KEY,
+                   etag TEXT,
+                   last_modified TEXT,
+                   content_hash TEXT,
+                   path TEXT,
+                   links TEXT,
+                   crawled_at REAL
+               )"""
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._validators = {}
+        self.changed = []
+        self.unchanged = 0
+
+    def _row(self, url):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT etag, last_modified, content_hash, path, links FROM pages WHERE url = ?",
+                (url,),
+            ).fetchone()
+
+    def conditional_headers(self, url):
+        """Request headers that let the server answer 304 Not Modified."""
+        row = self._row(url)
+        headers = {}
+        if row and row[0]:
+            headers["If-None-Match"] = row[0]
+        if row and row[1]:
+            headers["If-Modified-Since"] = row[1]
+        return headers
+
+    def note_validators(self, url, etag=None, last_modified=None):
+        """Keep a response's ETag/Last-Modified until record() stores the page."""
+        with self._lock:
+            self._validators[url] = (etag, last_modified)
+
+    def known_links(self, url):
+        """Links stored for 'url' by a previous crawl, as (url, anchor_text) pairs."""
+        row = self._row(url)
+        return [tuple(link) for link in json.loads(row[4])] if row and row[4] else []
+
+    def mark_unchanged(self, url):
+        """The server said 304 (or the text hashed the same): nothing to store."""
+        with self._lock:
+            self.unchanged += 1
+            self._validators.pop(url, None)
+            self._conn.execute("UPDATE pages SET crawled_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+    def record(self, url, text, path, links=()):
+        """
+        Store the state of a freshly fetched page. Returns True if it is new
+        or its text changed (and adds it to the manifest), False otherwise.
+        """
+        digest = content_hash(text)
+        row = self._row(url)
+        status = "new" if row is None else ("changed" if row[2] != digest else None)
+
+        with self._lock:
+            etag, last_modified = self._validators.pop(url, (None, None))
+            self._conn.execute(
+                """INSERT INTO pages (url, etag, last_modified, content_hash, path, links, crawled_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(url) DO UPDATE SET
+                       etag = excluded.etag,
+                       last_modified = excluded.last_modified,
+                       content_hash = excluded.content_hash,
+                       path = excluded.path,
+                       links = excluded.links,
+                       crawled_at = excluded.crawled_at""",
+                (url, etag, last_modified, digest, path, json.dumps(list(links)), time.time()),
+            )
+            self._conn.commit()
+            if status:
+                self.changed.append({"url": url, "path": path, "content_hash": digest, "status": status})
+            else:
+                self.unchanged += 1
+        return status is not None
+
+    def write_manifest(self, path=CHANGED_DOCS_MANIFEST):
+        """Write the new/changed documents of this run for addObjects.py."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.changed, f, ensure_ascii=False, indent=2)
+        print(f"Changed-docs manifest: {len(self.changed)} new/changed, "
+              f"{self.unchanged} unchanged -> {path}")
+
+    def close(self):
+        self._conn.close()
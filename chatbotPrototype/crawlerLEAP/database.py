@@ -1,7 +1,7 @@
 import weaviate
 from weaviate.classes.init import Auth
 import os
-from weaviate.classes.config import Configure
+from weaviate.classes.config import Configure, DataType, Property, Tokenization
 
 
 
@@ -16,7 +16,16 @@ print(client.is_ready())  # Should print: `True`
 storage = client.collections.create(
     name="leapData",
     vectorizer_config=Configure.Vectorizer.text2vec_cohere(),   # Configure the Cohere embedding integration
-    generative_config=Configure.Generative.cohere()             # Configure the Cohere generative AI integration
+    generative_config=Configure.Generative.cohere(),            # Configure the Cohere generative AI integration
+    properties=[
+        Property(name="title", data_type=DataType.TEXT, vectorize_property_name=False),
+        Property(name="class", data_type=DataType.TEXT, vectorize_property_name=False),
+        Property(name="videoId", data_type=DataType.TEXT, vectorize_property_name=False),
+        # Whole-URL tokens, so addObjects.py can delete a page's objects by exact URL
+        Property(name="url", data_type=DataType.TEXT, tokenization=Tokenization.FIELD,
+                 vectorize_property_name=False),
+        Property(name="transcript", data_type=DataType.TEXT, vectorize_property_name=False),
+    ],
 )
 
 
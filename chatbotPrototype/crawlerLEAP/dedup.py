@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+
+################################################################################
+# Settings
+################################################################################
+SHINGLE_WORDS = 5          # words per shingle
+NUM_PERM = 128             # MinHash signature length
+LSH_BANDS = 16             # 16 bands x 8 rows: pairs above ~0.7 Jaccard collide
+DUPLICATE_THRESHOLD = 0.8  # estimated Jaccard similarity that counts as a copy
+MIN_WORDS = 50             # shorter texts are too small to fingerprint reliably
+SIGNATURE_BLOCK = 4096     # shingles hashed per numpy step
+DEDUP_INDEX_PATH = os.path.join("crawled_data", "dedup_index.npz")
+DUPLICATES_REPORT = os.path.join("crawled_data", "duplicates.json")
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+_WORD = re.compile(r"\w+")
+
+################################################################################
+# MinHash fingerprints
+################################################################################
+def shingle_hashes(text, k=SHINGLE_WORDS):
+    """32-bit hashes of the set of k-word shingles of 'text' (lowercased)."""
+    words = _WORD.findall(text.lower())
+    if len(words) < k:
+        words = words + [""] * (k - len(words))
+    shingles = {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little")
+         for s in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+
+
+class MinHasher:
+    """
+    NUM_PERM random hash functions h(x) = (a*x + b) mod p, applied to all
+    shingle hashes at once; the signature is the column-wise minimum. The
+    seed is fixed so signatures saved by one run stay comparable.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text):
+        hashes = shingle_hashes(text)
+        signature = np.full(len(self.a), _MAX_HASH, dtype=np.uint64)
+        # In blocks, so a book-sized PDF doesn't need a shingles x NUM_PERM matrix
+        for start in range(0, len(hashes), SIGNATURE_BLOCK):
+            block = hashes[start:start + SIGNATURE_BLOCK]
+            # 32-bit a, b and x keep a*x + b inside uint64
+            values = (np.outer(block, self.a) + self.b) % _MERSENNE_PRIME & _MAX_HASH
+            np.minimum(signature, values.min(axis=0), out=signature)
+        return signature
+
+################################################################################
+# LSH index
+################################################################################
+class NearDuplicateIndex:
+    """
+    Locality-sensitive hashing over MinHash signatures: each signature is
+    cut into LSH_BANDS bands and documents sharing any band are candidates,
+    which are then confirmed against DUPLICATE_THRESHOLD. Finding the
+    copies of a page costs a few dict lookups instead of comparing it with
+    every page seen so far.
+    """
+
+    def __init__(self, threshold=DUPLICATE_THRESHOLD, num_perm=NUM_PERM, bands=LSH_BANDS):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+        self.signatures = {}   # key -> signature
+        self._buckets = {}     # (band, band bytes) -> set of keys
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def similarity(self, sig_a, sig_b):
+        """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+        return float(np.mean(sig_a == sig_b))
+
+    def query(self, signature, exclude=None):
+        """Best stored match for 'signature' as (key, similarity), or None."""
+        candidates = set()
+        for band_key in self._band_keys(signature):
+            candidates |= self._buckets.get(band_key, set())
+        candidates.discard(exclude)
+        best = None
+        for key in candidates:
+            score = self.similarity(signature, self.signatures[key])
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (key, score)
+        return best
+
+    def insert(self, key, signature):
+        self.remove(key)
+        self.signatures[key] = signature
+        for band_key in self._band_keys(signature):
+            self._buckets.setdefault(band_key, set()).add(key)
+
+    def remove(self, key):
+        signature = self.signatures.pop(key, None)
+        if signature is None:
+            return
+        for band_key in self._band_keys(signature):
+            bucket = self._buckets.get(band_key)
+            if bucket:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def check(self, key, text):
+        """
+        Fingerprints 'text' and returns (canonical_key, similarity) if it
+        near-duplicates a page already in the index, else stores it under
+        'key' and returns None. A key seen before with other text (a
+        re-crawled page) replaces its old fingerprint.
+        """
+        signature = self.hasher.signature(text)
+        match = self.query(signature, exclude=key)
+        if match:
+            self.remove(key)
+            return match
+        self.insert(key, signature)
+        return None
+
+    def save(self, path=DEDUP_INDEX_PATH):
+        keys = list(self.signatures)
+        matrix = np.array([self.signatures[k] for k in keys], dtype=np.uint64).reshape(len(keys), -1)
+        np.savez_compressed(path, keys=np.array(keys, dtype=str), signatures=matrix)
+
+    @classmethod
+    def load(cls, path=DEDUP_INDEX_PATH, **kwargs):
+        """Index saved by a previous run, or an empty one."""
+        index = cls(**kwargs)
+        if os.path.exists(path):
+            data = np.load(path)
+            for key, signature in zip(data["keys"].tolist(), data["signatures"]):
+                index.insert(key, signature)
+        return index
+
+################################################################################
+# Dedup stage between crawl and ingest
+################################################################################
+def dedup_records(records, index, duplicates=None):
+    """
+    Yields the records whose text is not a near-duplicate of one already
+    seen (in this run or, with a loaded index, in earlier ones). Dropped
+    records are noted in 'duplicates' as {url: {"duplicate_of", "similarity"}}.
+    The crawl is best-first, so the page kept is usually the canonical one
+    and tag, pagination and mirror copies are the ones dropped.
+    """
+    for record in records:
+        text = record.get("transcript", "")
+        url = record.get("url", "")
+        if not url or len(_WORD.findall(text)) < MIN_WORDS:
+            yield record
+            continue
+        match = index.check(url, text)
+        if match is None:
+            yield record
+        elif duplicates is not None:
+            duplicates[url] = {"duplicate_of": match[0], "similarity": round(match[1], 3)}
+
+
+def write_duplicates_report(duplicates, path=DUPLICATES_REPORT):
+    """Clusters of dropped pages, keyed by the page that was kept."""
+    clusters = {}
+    for url, info in duplicates.items():
+        clusters.setdefault(info["duplicate_of"], []).append(url)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(clusters, f, ensure_ascii=False, indent=2)
+    print(f"Dropped {len(duplicates)} near-duplicate pages in {len(clusters)} clusters -> {path}")
@@ -0,0 +1,197 @@
+from urllib.parse import urljoin
+
+# C-accelerated parsers are optional; BeautifulSoup is always available
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+from bs4 import BeautifulSoup
+
+################################################################################
+# Settings
+################################################################################
+# "auto" picks the fastest installed backend: selectolax, then lxml, then bs4
+EXTRACTOR_BACKEND = "auto"
+STRIP_BOILERPLATE = True
+
+# Never visible text
+NON_TEXT_TAGS = ("script", "style", "noscript", "template", "svg", "iframe")
+# Site chrome repeated on every page; its links are still followed
+BOILERPLATE_TAGS = ("nav", "footer", "aside", "form")
+BOILERPLATE_ROLES = {"navigation", "banner", "contentinfo", "search", "complementary"}
+# class/id values of menus, sidebars, cookie banners and the like
+BOILERPLATE_NAMES = (
+    "nav", "navbar", "navigation", "menu", "main-menu", "site-header", "site-footer",
+    "footer", "sidebar", "breadcrumb", "breadcrumbs", "cookie-banner", "cookie-notice",
+    "cookie-consent", "skip-link", "social", "share-buttons",
+)
+# A <header> is page chrome unless it belongs to the content (e.g. an article title)
+CONTENT_TAGS = {"main", "article"}
+
+
+def _looks_like_boilerplate(tag, attrs, inside_content):
+    if tag in BOILERPLATE_TAGS:
+        return True
+    if tag == "header" and not inside_content:
+        return True
+    if (attrs.get("role") or "").lower() in BOILERPLATE_ROLES:
+        return True
+    names = f"{attrs.get('class') or ''} {attrs.get('id') or ''}".split()
+    return any(name in BOILERPLATE_NAMES for name in names)
+
+
+def _clean_lines(text):
+    return "\n".join(line.strip() for line in text.splitlines() if line.strip())
+
+################################################################################
+# Backends: each returns (cleaned_text, [(absolute URL, link text), ...])
+################################################################################
+# The same rules as _looks_like_boilerplate, as one CSS selector run in C
+_BOILERPLATE_SELECTOR = ", ".join(
+    list(BOILERPLATE_TAGS)
+    + ["header"]
+    + [f'[role="{role}"]' for role in sorted(BOILERPLATE_ROLES)]
+    + [f'[class~="{name}"], [id="{name}"]' for name in BOILERPLATE_NAMES]
+)
+
+
+def _has_ancestor(node, predicate):
+    parent = node.parent
+    while parent is not None:
+        if predicate(parent):
+            return True
+        parent = parent.parent
+    return False
+
+
+def extract_selectolax(html, base_url, strip_boilerplate=STRIP_BOILERPLATE):
+    tree = LexborHTMLParser(html)
+    links = [
+        (urljoin(base_url, node.attributes["href"]), node.text(deep=True, separator=" ", strip=True))
+        for node in tree.css("a[href]")
+    ]
+    tree.strip_tags(list(NON_TEXT_TAGS))
+    root = tree.root
+    if root is None:
+        return "", links
+
+    full_text = None
+    if strip_boilerplate:
+        full_text = root.text(separator="\n")
+        chrome = [
+            node for node in root.css(_BOILERPLATE_SELECTOR)
+            if node.tag != "header" or not _has_ancestor(node, lambda p: p.tag in CONTENT_TAGS)
+        ]
+        # Only remove the outermost matches: their descendants go with them
+        chrome_ids = {node.mem_id for node in chrome}
+        for node in chrome:
+            if not _has_ancestor(node, lambda p: p.mem_id in chrome_ids):
+                node.decompose()
+    text = _clean_lines(root.text(separator="\n"))
+    if strip_boilerplate and not text:
+        text = _clean_lines(full_text)
+    return text, links
+
+
+def extract_lxml(html, base_url, strip_boilerplate=STRIP_BOILERPLATE):
+    try:
+        root = lxml.html.document_fromstring(html)
+    except (etree.ParserError, ValueError):
+        return "", []
+
+    links = []
+    drop = []
+    content_depth = []  # stack of open <main>/<article> elements
+    # One walk over the tree collects links and marks what to drop
+    for event, el in etree.iterwalk(root, events=("start", "end")):
+        tag = el.tag if isinstance(el.tag, str) else None
+        if tag is None:
+            continue
+        if event == "end":
+            if content_depth and content_depth[-1] is el:
+                content_depth.pop()
+            continue
+        if tag in CONTENT_TAGS:
+            content_depth.append(el)
+        if tag == "a" and el.get("href"):
+            links.append((urljoin(base_url, el.get("href")), " ".join(el.text_content().split())))
+        if tag in NON_TEXT_TAGS:
+            drop.append((el, True))
+        elif strip_boilerplate and _looks_like_boilerplate(tag, el.attrib, bool(content_depth)):
+            drop.append((el, False))
+
+    full_text = None
+    chrome = [el for el, non_text in drop if not non_text]
+    for el, non_text in drop:
+        if non_text:
+            el.drop_tree()
+    if chrome:
+        full_text = "\n".join(root.itertext())
+        for el in chrome:
+            if el.getparent() is not None:
+                el.drop_tree()
+    text = _clean_lines("\n".join(root.itertext()))
+    if not text and full_text:
+        text = _clean_lines(full_text)
+    return text, links
+
+
+def extract_bs4(html, base_url, strip_boilerplate=STRIP_BOILERPLATE):
+    soup = BeautifulSoup(html, "html.parser")
+    links = [
+        (urljoin(base_url, link["href"]), link.get_text(" ", strip=True))
+        for link in soup.find_all("a", href=True)
+    ]
+    for node in soup(list(NON_TEXT_TAGS)):
+        node.extract()
+
+    full_text = None
+    if strip_boilerplate:
+        full_text = soup.get_text(separator="\n")
+        chrome = [
+            node for node in soup.find_all(True)
+            if _looks_like_boilerplate(
+                node.name,
+                {k: " ".join(v) if isinstance(v, list) else v for k, v in node.attrs.items()},
+                node.name == "header" and node.find_parent(list(CONTENT_TAGS)) is not None,
+            )
+        ]
+        for node in chrome:
+            node.extract()
+    text = _clean_lines(soup.get_text(separator="\n"))
+    if strip_boilerplate and not text:
+        text = _clean_lines(full_text)
+    return text, links
+
+
+BACKENDS = {
+    "selectolax": extract_selectolax if LexborHTMLParser is not None else None,
+    "lxml": extract_lxml if lxml is not None else None,
+    "bs4": extract_bs4,
+}
+
+
+def get_extractor(backend=EXTRACTOR_BACKEND):
+    """Extractor function for 'backend' ("auto" = fastest installed)."""
+    if backend == "auto":
+        return next(fn for fn in BACKENDS.values() if fn is not None)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown extractor backend: {backend!r}")
+    if BACKENDS[backend] is None:
+        raise ImportError(f"Extractor backend {backend!r} is not installed")
+    return BACKENDS[backend]
+
+
+def extract_text_and_links(html, base_url, backend=EXTRACTOR_BACKEND, strip_boilerplate=STRIP_BOILERPLATE):
+    """
+    Visible text (one non-empty line per line) and outgoing links of an
+    HTML page. With strip_boilerplate, navigation, headers, footers,
+    sidebars and cookie banners are left out of the text, but their links
+    are still returned so the crawl reaches every page.
+    """
+    return get_extractor(backend)(html, base_url, strip_boilerplate)
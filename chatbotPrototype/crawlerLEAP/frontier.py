@@ -0,0 +1,149 @@
+import hashlib
+import heapq
+import itertools
+import math
+import mmap
+import os
+import re
+from urllib.parse import urlparse
+
+################################################################################
+# Settings
+################################################################################
+SEEN_CAPACITY = 10_000_000   # URLs the Bloom filter is sized for
+SEEN_ERROR_RATE = 0.001      # false "already seen" rate at that capacity
+MAX_FRONTIER_SIZE = 200_000  # queued URLs kept; the lowest-priority rest are dropped
+
+DEPTH_WEIGHT = 1.0
+RELEVANCE_WEIGHT = 0.5
+# Words in a URL path or link text that point at LEAP research content
+RELEVANCE_KEYWORDS = (
+    "climate", "data", "dataset", "catalog", "research", "publication", "paper",
+    "model", "cmip", "ocean", "atmosphere", "machine-learning", "tutorial",
+    "docs", "guide", "education", "project", "report",
+)
+# Paths that mostly repeat content found elsewhere (listings, feeds, paging)
+LOW_VALUE_PATTERN = re.compile(
+    r"/(tag|tags|category|author|feed|wp-json|page/\d+|calendar|login|share)(/|$)|[?&](page|replytocom|share)=",
+    re.IGNORECASE,
+)
+LOW_VALUE_PENALTY = 3.0
+
+################################################################################
+# Bloom filter for seen URLs
+################################################################################
+class BloomFilter:
+    """
+    Bit-array set membership with a fixed memory footprint: about 1.8 MB
+    per million URLs at a 0.1% false-positive rate. A false positive only
+    means one URL is skipped; there are no false negatives.
+    With 'path', the bits live in a memory-mapped file, so a crawl can be
+    resumed without re-queuing everything it already saw.
+    """
+
+    def __init__(self, capacity=SEEN_CAPACITY, error_rate=SEEN_ERROR_RATE, path=None):
+        self.num_bits = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        num_bytes = (self.num_bits + 7) // 8
+        self.count = 0
+
+        self._file = None
+        if path:
+            exists = os.path.exists(path) and os.path.getsize(path) == num_bytes
+            self._file = open(path, "r+b" if exists else "w+b")
+            if not exists:
+                self._file.truncate(num_bytes)
+            self._bits = mmap.mmap(self._file.fileno(), num_bytes)
+        else:
+            self._bits = bytearray(num_bytes)
+
+    def _positions(self, item):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, item):
+        return all(self._bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+    def add(self, item):
+        """Adds 'item'; returns True if it was not (probably) present before."""
+        added = False
+        for p in self._positions(item):
+            byte, mask = p >> 3, 1 << (p & 7)
+            if not self._bits[byte] & mask:
+                self._bits[byte] |= mask
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        if self._file is not None:
+            self._bits.flush()
+            self._bits.close()
+            self._file.close()
+            self._file = None
+
+################################################################################
+# Priority frontier
+################################################################################
+def link_score(url, depth, anchor_text=""):
+    """
+    Priority of a discovered link; lower pops first. Shallow pages and links
+    whose URL or text mention LEAP research topics come first, while tag,
+    pagination and feed pages are pushed back.
+    """
+    haystack = f"{urlparse(url).path} {anchor_text}".lower()
+    relevance = sum(1 for word in RELEVANCE_KEYWORDS if word in haystack)
+    score = depth * DEPTH_WEIGHT - relevance * RELEVANCE_WEIGHT
+    if LOW_VALUE_PATTERN.search(url):
+        score += LOW_VALUE_PENALTY
+    return score
+
+
+class Frontier:
+    """
+    URLs waiting to be crawled, popped best-first via a heap (O(log n)
+    instead of list.pop(0)'s O(n)), with a Bloom filter of every URL ever
+    queued. At most max_size URLs are kept: when the heap overflows, the
+    lowest-priority ones are dropped.
+    """
+
+    def __init__(self, seen=None, max_size=MAX_FRONTIER_SIZE):
+        self.seen = seen if seen is not None else BloomFilter()
+        self.max_size = max_size
+        self.dropped = 0
+        self._heap = []
+        self._counter = itertools.count()  # FIFO among equal scores
+
+    def push(self, url, depth, key, anchor_text="", extra=None):
+        """
+        Queues 'url' unless 'key' (its normalized form) was queued before.
+        Returns True if it was queued.
+        """
+        if not self.seen.add(key):
+            return False
+        item = (url, depth) if extra is None else (url, depth, extra)
+        heapq.heappush(self._heap, (link_score(url, depth, anchor_text), next(self._counter), item))
+        if self.max_size and len(self._heap) > self.max_size * 5 // 4:
+            # Trim in batches so the O(n log n) rebuild is rare
+            kept = heapq.nsmallest(self.max_size, self._heap)
+            self.dropped += len(self._heap) - len(kept)
+            self._heap = kept
+            heapq.heapify(self._heap)
+        return True
+
+    def pop(self):
+        """Returns the best queued item: (url, depth) or (url, depth, extra)."""
+        return heapq.heappop(self._heap)[2]
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __bool__(self):
+        return bool(self._heap)
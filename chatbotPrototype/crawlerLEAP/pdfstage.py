@@ -0,0 +1,231 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_EXCEPTION
+from concurrent.futures.process import BrokenProcessPool
+
+import fitz
+import requests
+
+################################################################################
+# Settings
+################################################################################
+PDF_WORKERS = max(1, (os.cpu_count() or 2) - 1)  # extraction processes
+PAGES_PER_TASK = 16                 # pages one worker extracts per task
+MAX_PDF_BYTES = 100 * 1024 * 1024   # larger PDFs are not downloaded
+PDF_TIME_LIMIT = 180                # seconds per document, download + extraction
+CONNECT_TIMEOUT = 10                # seconds
+READ_TIMEOUT = 60                   # seconds without receiving any data
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+PDF_CACHE_DIR = os.path.join("crawled_data", "pdf_cache")
+
+class PdfLimitExceeded(Exception):
+    """A PDF went over MAX_PDF_BYTES or PDF_TIME_LIMIT."""
+
+################################################################################
+# Worker-process side
+################################################################################
+def _page_count(path):
+    with fitz.open(path) as doc:
+        return doc.page_count
+
+def _extract_pages(path, start, stop):
+    """Text of pages [start, stop) of the PDF at 'path', run in a worker process."""
+    with fitz.open(path) as doc:
+        return "\n".join(doc[i].get_text("text") for i in range(start, stop)) + "\n"
+
+def _kill_workers(pool):
+    """Shut 'pool' down without waiting, killing workers stuck on a task."""
+    processes = list((getattr(pool, "_processes", None) or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        if process.is_alive():
+            process.kill()
+
+################################################################################
+# Download
+################################################################################
+def download_pdf(url, dest, headers=None, max_bytes=MAX_PDF_BYTES, deadline=None):
+    """
+    Streams the PDF at 'url' into the open binary file 'dest' in chunks,
+    never holding the whole document in memory. Returns (response, sha256)
+    where sha256 is None unless the body was downloaded (HTTP 200).
+    Raises PdfLimitExceeded if the file is too large or takes too long.
+    """
+    with requests.get(url, headers=headers, stream=True,
+                      timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)) as response:
+        if response.status_code != 200:
+            return response, None
+        declared = int(response.headers.get("Content-Length") or 0)
+        if declared > max_bytes:
+            raise PdfLimitExceeded(f"PDF is {declared} bytes, over the {max_bytes} byte limit")
+
+        digest = hashlib.sha256()
+        size = 0
+        for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_bytes:
+                raise PdfLimitExceeded(f"PDF is over the {max_bytes} byte limit")
+            if deadline is not None and time.monotonic() > deadline:
+                raise PdfLimitExceeded("PDF download took too long")
+            digest.update(chunk)
+            dest.write(chunk)
+        dest.flush()
+        return response, digest.hexdigest()
+
+################################################################################
+# PDF stage
+################################################################################
+class PdfStage:
+    """
+    Downloads PDFs to temporary files and extracts their pages in parallel
+    on a process pool, so big reports neither block the crawl threads nor
+    sit fully in memory.
+    - Each document gets at most 'max_bytes' and 'time_limit' seconds;
+      over either, an error string is returned as for any failed PDF.
+      Worker processes can't be interrupted, so when an extraction runs
+      out of time the pool is replaced and its workers are killed; other
+      documents caught in that pool are retried once on the new one.
+    - Extracted text is cached on disk under the SHA-256 of the PDF, so
+      the same file found under another URL, or re-downloaded after its
+      validators changed without its content changing, is not re-parsed.
+    Safe to call from several crawler threads at once.
+    """
+
+    def __init__(self, workers=PDF_WORKERS, max_bytes=MAX_PDF_BYTES,
+                 time_limit=PDF_TIME_LIMIT, cache_dir=PDF_CACHE_DIR,
+                 pages_per_task=PAGES_PER_TASK):
+        self.max_bytes = max_bytes
+        self.time_limit = time_limit
+        self.cache_dir = cache_dir
+        self.pages_per_task = pages_per_task
+        self.cache_hits = 0
+        self.pools_recycled = 0
+        self._workers = workers
+        self._pool = ProcessPoolExecutor(max_workers=workers)
+        self._pool_lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _cache_path(self, digest):
+        return os.path.join(self.cache_dir, f"{digest}.txt") if self.cache_dir else None
+
+    def _read_cache(self, digest):
+        path = self._cache_path(digest)
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                return f.read()
+        return None
+
+    def _write_cache(self, digest, text):
+        path = self._cache_path(digest)
+        if not path:
+            return
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    def _recycle_pool(self, pool):
+        """Replace 'pool' with a fresh one (unless already done) and kill its workers."""
+        with self._pool_lock:
+            if self._pool is not pool:
+                return
+            self._pool = ProcessPoolExecutor(max_workers=self._workers)
+            self.pools_recycled += 1
+        _kill_workers(pool)
+
+    def _extract_on(self, pool, path, deadline):
+        remaining = lambda: None if deadline is None else max(0.0, deadline - time.monotonic())
+        try:
+            num_pages = pool.submit(_page_count, path).result(timeout=remaining())
+        except TimeoutError:
+            self._recycle_pool(pool)
+            raise PdfLimitExceeded("PDF took too long to open") from None
+        futures = [
+            pool.submit(_extract_pages, path, start, min(start + self.pages_per_task, num_pages))
+            for start in range(0, num_pages, self.pages_per_task)
+        ]
+        done, pending = wait(futures, timeout=remaining(), return_when=FIRST_EXCEPTION)
+        if pending:
+            # Tasks already running can't be cancelled; give them until the deadline
+            running = [future for future in pending if not future.cancel()]
+            if any(f.exception() for f in done):
+                _, running = wait(running, timeout=remaining())
+            if running:
+                self._recycle_pool(pool)
+            if not any(f.exception() for f in done):
+                raise PdfLimitExceeded("PDF text extraction took too long")
+        return "".join(future.result() for future in futures)
+
+    def extract(self, path, deadline=None):
+        """Text of every page of the PDF at 'path', extracted on the process pool."""
+        pool = self._pool
+        try:
+            return self._extract_on(pool, path, deadline)
+        except BrokenProcessPool:
+            if pool is self._pool:
+                # A worker died on this PDF (e.g. a crash in PyMuPDF): restart the pool
+                self._recycle_pool(pool)
+                raise
+        # Another document's timeout killed the pool under this one: retry once
+        return self._extract_on(self._pool, path, deadline)
+
+    def fetch(self, url, state=None):
+        """
+        Downloads and extracts the PDF at 'url'. Returns the text, a
+        warning/error string, or None when a CrawlState-conditional request
+        got HTTP 304 Not Modified.
+        """
+        deadline = time.monotonic() + self.time_limit
+        headers = state.conditional_headers(url) if state else {}
+        fd, tmp_path = tempfile.mkstemp(suffix=".pdf")
+        try:
+            with os.fdopen(fd, "wb") as dest:
+                response, digest = download_pdf(url, dest, headers, self.max_bytes, deadline)
+            if response.status_code == 304:
+                return None
+            if state:
+                state.note_validators(url, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+            if response.status_code != 200:
+                return f"Error fetching PDF: {response.status_code}"
+
+            text = self._read_cache(digest)
+            if text is not None:
+                self.cache_hits += 1
+                return text
+            text = self.extract(tmp_path, deadline)
+            if not text.strip():
+                text = "Warning: PDF may be image-based or PyMuPDF couldn't extract text."
+            self._write_cache(digest, text)
+            print(f"Scraped PDF: {url} ({len(text)} chars)")
+            return text
+        except Exception as e:
+            return f"Error processing PDF {url}: {e}"
+        finally:
+            os.remove(tmp_path)
+
+    def close(self):
+        with self._pool_lock:
+            _kill_workers(self._pool)
+
+_default_stage = None
+_default_stage_lock = threading.Lock()
+
+def get_pdf_stage():
+    """The shared PdfStage, started on first use."""
+    global _default_stage
+    with _default_stage_lock:
+        if _default_stage is None:
+            _default_stage = PdfStage()
+        return _default_stage
+
+def close_pdf_stage():
+    """Shut down the shared PdfStage's worker processes, if it was started."""
+    global _default_stage
+    with _default_stage_lock:
+        if _default_stage is not None:
+            _default_stage.close()
+            _default_stage = None
@@ -0,0 +1,122 @@
+import asyncio
+import queue
+import threading
+from concurrent.futures import Future
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from crawler import setup_driver, wait_for_page_ready
+
+################################################################################
+# Settings
+################################################################################
+POOL_SIZE = 4               # browser instances running at once
+PAGES_PER_BROWSER = 50      # recycle a browser after this many pages
+MAX_CRASH_RETRIES = 1       # re-render a page this often after a browser crash
+
+################################################################################
+# Pool of headless browsers
+################################################################################
+class RenderPool:
+    """
+    Runs POOL_SIZE headless browsers, each on its own thread, all pulling
+    URLs from one shared frontier queue.
+    - A browser is quit and replaced after PAGES_PER_BROWSER pages, which
+      caps how much memory a long-lived Chrome can accumulate.
+    - If a browser crashes (any WebDriverException other than a page-load
+      timeout) it is thrown away, a fresh one is started and the page is
+      retried.
+    submit() returns a concurrent Future; awaiting the pool itself, as
+    AsyncCrawler does with its renderer, returns the page source.
+    """
+
+    def __init__(self, size=POOL_SIZE, pages_per_browser=PAGES_PER_BROWSER, driver_factory=None):
+        self.size = size
+        self.pages_per_browser = pages_per_browser
+        self._driver_factory = driver_factory or (lambda: setup_driver(headless=True))
+        self._frontier = queue.Queue()
+        self.browsers_started = 0
+        self.crashes = 0
+        self._stats_lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"render-worker-{i}", daemon=True)
+            for i in range(size)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, url):
+        future = Future()
+        self._frontier.put((url, future))
+        return future
+
+    async def __call__(self, url):
+        return await asyncio.wrap_future(self.submit(url))
+
+    def _start_browser(self):
+        driver = self._driver_factory()
+        with self._stats_lock:
+            self.browsers_started += 1
+        return driver
+
+    @staticmethod
+    def _quit(driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass  # already dead
+
+    def _render(self, driver, url):
+        driver.get(url)
+        wait_for_page_ready(driver)
+        return driver.page_source
+
+    def _run(self):
+        driver = None
+        pages_rendered = 0
+        while True:
+            item = self._frontier.get()
+            if item is None:
+                break
+            url, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            for attempt in range(MAX_CRASH_RETRIES + 1):
+                try:
+                    if driver is None:
+                        driver = self._start_browser()
+                        pages_rendered = 0
+                    future.set_result(self._render(driver, url))
+                    break
+                except TimeoutException as e:
+                    # The page is slow, not the browser: don't restart for it
+                    future.set_exception(e)
+                    break
+                except WebDriverException as e:
+                    with self._stats_lock:
+                        self.crashes += 1
+                    print(f"Browser crashed on {url}: {e.msg}; restarting it")
+                    if driver is not None:
+                        self._quit(driver)
+                    driver = None
+                    if attempt == MAX_CRASH_RETRIES:
+                        future.set_exception(e)
+                except Exception as e:
+                    future.set_exception(e)
+                    break
+
+            pages_rendered += 1
+            if driver is not None and pages_rendered >= self.pages_per_browser:
+                self._quit(driver)
+                driver = None
+
+        if driver is not None:
+            self._quit(driver)
+
+    def close(self):
+        """Stop the workers once the frontier drains, and quit every browser."""
+        for _ in self._threads:
+            self._frontier.put(None)
+        for thread in self._threads:
+            thread.join()
@@ -0,0 +1,195 @@
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+
+################################################################################
+# Settings
+################################################################################
+SINK_PREFIX = "crawl_results"
+MAX_RECORDS_PER_FILE = 500
+MAX_BYTES_PER_FILE = 50 * 1024 * 1024
+POLL_SECONDS = 2.0
+
+def _done_marker(directory, prefix):
+    return os.path.join(directory, f"{prefix}.done")
+
+def _run_marker(directory, prefix):
+    return os.path.join(directory, f"{prefix}.run")
+
+def _write_marker(path, run_id):
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(run_id)
+    os.replace(path + ".tmp", path)
+
+def _read_marker(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+def _consumed_log(directory, prefix):
+    return os.path.join(directory, f"{prefix}.consumed")
+
+################################################################################
+# Producer side
+################################################################################
+class RotatingJsonlSink:
+    """
+    Writes crawl records one JSON object per line as they are produced,
+    into crawl_results-00000.jsonl, crawl_results-00001.jsonl, ...
+
+    The file being filled is named '<name>.jsonl.part' and only renamed to
+    '.jsonl' once it is full (or on close), so a consumer never sees a half
+    written file. Each run has a run_id, written to a '.run' marker on
+    start and to a '.done' marker on close, which tells a consumer
+    following that run that no more files will come. Numbering continues
+    after the files of earlier runs, so nothing already on disk is
+    overwritten.
+    """
+
+    def __init__(self, directory, prefix=SINK_PREFIX,
+                 max_records=MAX_RECORDS_PER_FILE, max_bytes=MAX_BYTES_PER_FILE):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.records_written = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._path = None
+        self._records_in_file = 0
+        self.run_id = uuid.uuid4().hex
+
+        os.makedirs(directory, exist_ok=True)
+        _write_marker(_run_marker(directory, prefix), self.run_id)
+        existing = glob.glob(os.path.join(directory, f"{prefix}-*.jsonl*"))
+        self._next_index = 1 + max(
+            (int(os.path.basename(p)[len(prefix) + 1:].split(".")[0]) for p in existing),
+            default=-1,
+        )
+
+    def _open_next(self):
+        name = f"{self.prefix}-{self._next_index:05d}.jsonl"
+        self._next_index += 1
+        self._path = os.path.join(self.directory, name)
+        self._file = open(self._path + ".part", "w", encoding="utf-8")
+        self._records_in_file = 0
+
+    def _finish_current(self):
+        if self._file is None:
+            return
+        self._file.close()
+        os.replace(self._path + ".part", self._path)
+        self._file = None
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._open_next()
+            self._file.write(line)
+            self._file.flush()
+            self._records_in_file += 1
+            self.records_written += 1
+            if self._records_in_file >= self.max_records or self._file.tell() >= self.max_bytes:
+                self._finish_current()
+
+    def close(self):
+        with self._lock:
+            self._finish_current()
+            _write_marker(_done_marker(self.directory, self.prefix), self.run_id)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+################################################################################
+# Consumer side
+################################################################################
+class SinkReader:
+    """
+    Iterates the records of the completed sink files in order, one at a time.
+
+    Files are only logged as consumed when commit() is called, which the
+    caller does once the records read so far have been stored. So a run
+    that crashes before committing reads those files again next time.
+
+    With follow=True, iteration keeps waiting for new files until a
+    producer run is done, so ingestion can run alongside the crawl. That
+    is the run 'run_id' if given, otherwise the run in progress when the
+    reader starts or, if none is, the next one to start. A '.done'
+    marker left by an earlier run doesn't end it.
+    """
+
+    def __init__(self, directory, prefix=SINK_PREFIX, follow=False,
+                 poll_seconds=POLL_SECONDS, run_id=None):
+        self.directory = directory
+        self.prefix = prefix
+        self.follow = follow
+        self.poll_seconds = poll_seconds
+        self.run_id = run_id
+        self.records_read = 0
+        self._consumed_path = _consumed_log(directory, prefix)
+        self._consumed = set()
+        if os.path.exists(self._consumed_path):
+            with open(self._consumed_path, "r", encoding="utf-8") as f:
+                self._consumed = {line.strip() for line in f if line.strip()}
+        self._finished = []      # fully read files, not committed yet
+        self._current = None     # file of the last record yielded
+
+        running = _read_marker(_run_marker(directory, prefix))
+        if self.run_id is None and running and running != _read_marker(_done_marker(directory, prefix)):
+            self.run_id = running
+        # Without a run in progress, wait for one that started after this one
+        self._stale_run = running if self.run_id is None else None
+
+    def _producer_done(self):
+        if self.run_id is None:
+            running = _read_marker(_run_marker(self.directory, self.prefix))
+            if not running or running == self._stale_run:
+                return False
+            self.run_id = running
+        return _read_marker(_done_marker(self.directory, self.prefix)) == self.run_id
+
+    def __iter__(self):
+        while True:
+            # Check the marker before listing, so files finished just before it are still seen
+            producer_done = self._producer_done()
+            pending = sorted(
+                p for p in glob.glob(os.path.join(self.directory, f"{self.prefix}-*.jsonl"))
+                if os.path.basename(p) not in self._consumed
+            )
+            for path in pending:
+                name = os.path.basename(path)
+                with open(path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            self._current = name
+                            self.records_read += 1
+                            yield json.loads(line)
+                self._consumed.add(name)
+                self._finished.append(name)
+
+            if not self.follow or (producer_done and not pending):
+                return
+            if not pending:
+                time.sleep(self.poll_seconds)
+
+    def commit(self, include_last=True):
+        """
+        Log the fully read files as consumed. With include_last=False the
+        file of the last record yielded is held back, for when that record
+        is still being processed.
+        """
+        names = [n for n in self._finished if include_last or n != self._current]
+        if not names:
+            return
+        with open(self._consumed_path, "a", encoding="utf-8") as log:
+            log.write("".join(name + "\n" for name in names))
+        self._finished = [n for n in self._finished if n not in names]
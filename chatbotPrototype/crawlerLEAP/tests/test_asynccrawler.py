@@ -0,0 +1,144 @@
+import asyncio
+from collections import Counter
+from contextlib import asynccontextmanager
+
+from aiohttp import web
+
+from asynccrawler import AsyncCrawler, HostThrottle
+from crawlstate import CrawlState
+
+ETAG = '"v1"'
+LAST_MODIFIED = "Wed, 01 Jan 2025 00:00:00 GMT"
+RESPONSE_DELAY = 0.05
+
+
+def page(title, *links):
+    anchors = "".join(f'<p><a href="{href}">{href}</a></p>' for href in links)
+    return f"<html><body><h1>{title}</h1><p>Text of {title}.</p>{anchors}</body></html>"
+
+
+class FixtureSite:
+    """
+    A small site on 127.0.0.1: '/' links to the others (several times, with
+    fragments and trailing slashes); '/etag' and '/modified' carry
+    validators and answer 304 to a matching conditional request.
+    """
+
+    PAGES = {
+        "/": page("Home", "/a", "/a#intro", "/a/", "/b", "/etag", "/modified", "https://elsewhere.test/x"),
+        "/a": page("A", "/", "/b", "/c"),
+        "/b": page("B", "/a", "/c"),
+        "/c": page("C", "/"),
+        "/etag": page("ETag page", "/c", "/behind-etag"),
+        "/behind-etag": page("Only linked from the ETag page"),
+        "/modified": page("Modified page", "/b"),
+    }
+
+    def __init__(self):
+        self.hits = Counter()
+        self.not_modified = Counter()
+        self.starts = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def handle(self, request):
+        path = request.path
+        self.hits[path] += 1
+        self.starts.append(asyncio.get_running_loop().time())
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(RESPONSE_DELAY)
+            if path not in self.PAGES:
+                return web.Response(status=404)
+            headers = {}
+            if path == "/etag":
+                headers["ETag"] = ETAG
+                if request.headers.get("If-None-Match") == ETAG:
+                    self.not_modified[path] += 1
+                    return web.Response(status=304, headers=headers)
+            if path == "/modified":
+                headers["Last-Modified"] = LAST_MODIFIED
+                if request.headers.get("If-Modified-Since") == LAST_MODIFIED:
+                    self.not_modified[path] += 1
+                    return web.Response(status=304, headers=headers)
+            return web.Response(text=self.PAGES[path], content_type="text/html", headers=headers)
+        finally:
+            self.in_flight -= 1
+
+
+@asynccontextmanager
+async def serve(site):
+    """Serve 'site' on a free local port; yields the base URL."""
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", site.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    server = web.TCPSite(runner, "127.0.0.1", 0)
+    await server.start()
+    try:
+        yield f"http://127.0.0.1:{runner.addresses[0][1]}"
+    finally:
+        await runner.cleanup()
+
+
+async def crawl_fixture(site, crawler):
+    async with serve(site) as base:
+        return base, await crawler.crawl([base + "/"])
+
+
+def test_each_page_is_fetched_once(tmp_path):
+    site = FixtureSite()
+    crawler = AsyncCrawler(output_dir=str(tmp_path), throttle=HostThrottle(concurrency=4, delay=0))
+    base, visited = asyncio.run(crawl_fixture(site, crawler))
+
+    assert set(site.hits) == set(FixtureSite.PAGES)
+    assert all(count == 1 for count in site.hits.values()), site.hits
+    assert sorted(visited) == sorted(base + path for path in FixtureSite.PAGES)
+    assert "Text of C." in visited[base + "/c"]
+
+
+def test_host_throttle_limits_concurrency_and_spacing(tmp_path):
+    site = FixtureSite()
+    delay = 0.03
+    crawler = AsyncCrawler(output_dir=str(tmp_path), num_workers=8,
+                           throttle=HostThrottle(concurrency=2, delay=delay))
+    asyncio.run(crawl_fixture(site, crawler))
+
+    assert site.max_in_flight <= 2
+    gaps = [b - a for a, b in zip(site.starts, site.starts[1:])]
+    # Allow for timer granularity
+    assert min(gaps) >= delay * 0.8, gaps
+
+
+def test_recrawl_sends_conditional_requests(tmp_path):
+    site = FixtureSite()
+    state = CrawlState(str(tmp_path / "state.sqlite"))
+
+    async def crawl_twice():
+        # Same server for both crawls, so the URLs (and their state) match
+        async with serve(site) as base:
+            first = AsyncCrawler(output_dir=str(tmp_path), state=state,
+                                 throttle=HostThrottle(concurrency=4, delay=0))
+            await first.crawl([base + "/"])
+            assert not site.not_modified
+            assert len(state.changed) == len(FixtureSite.PAGES)
+
+            state.changed.clear()
+            site.hits.clear()
+            second = AsyncCrawler(output_dir=str(tmp_path), state=state,
+                                  throttle=HostThrottle(concurrency=4, delay=0))
+            return await second.crawl([base + "/"])
+
+    try:
+        visited = asyncio.run(crawl_twice())
+    finally:
+        state.close()
+
+    assert site.not_modified == Counter({"/etag": 1, "/modified": 1})
+    # Pages with the same text and 304 pages are neither returned nor listed as changed ...
+    assert visited == {}
+    assert state.changed == []
+    # ... but the links of the 304 pages were still followed
+    assert site.hits["/behind-etag"] == 1
+    assert set(site.hits) == set(FixtureSite.PAGES)
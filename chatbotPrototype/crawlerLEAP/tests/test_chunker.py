@@ -0,0 +1,86 @@
+from chunker import MIN_CHUNK_TOKENS, TIMESTAMP_LINE, chunk_document, chunk_text, count_tokens, parent_id
+
+
+def paragraphs(n, words=12):
+    return [f"Paragraph {i} " + " ".join(f"word{i}x{j}" for j in range(words)) + "." for i in range(n)]
+
+
+def line_tokens(lines):
+    return sum(count_tokens(line) for line in lines)
+
+
+def shared_lines(previous, current):
+    """Longest run of lines ending 'previous' that also starts 'current'."""
+    for size in range(min(len(previous), len(current)), 0, -1):
+        if previous[-size:] == current[:size]:
+            return previous[-size:]
+    return []
+
+
+def test_chunks_respect_max_tokens_and_overlap():
+    lines = paragraphs(60)
+    chunks = chunk_text("\n".join(lines), max_tokens=120, overlap=40)
+    assert len(chunks) > 3
+    chunk_lines = [chunk["text"].splitlines() for chunk in chunks]
+    for piece in chunk_lines:
+        assert line_tokens(piece) <= 120
+
+    rebuilt = list(chunk_lines[0])
+    for previous, current in zip(chunk_lines, chunk_lines[1:]):
+        shared = shared_lines(previous, current)
+        assert shared and line_tokens(shared) <= 40
+        rebuilt.extend(current[len(shared):])
+    # Nothing lost, nothing repeated beyond the overlap
+    assert rebuilt == lines
+
+
+def test_heading_starts_a_chunk_without_overlap():
+    first, second = paragraphs(8), paragraphs(8, words=13)
+    text = "\n".join(["# Storage"] + first + ["# Compute"] + second)
+    assert line_tokens(first) >= MIN_CHUNK_TOKENS
+    chunks = chunk_text(text, max_tokens=1000, overlap=40)
+    assert [chunk["heading"] for chunk in chunks] == ["Storage", "Compute"]
+    assert chunks[1]["text"].splitlines()[0] == "# Compute"
+
+
+def test_long_paragraph_is_split_below_max_tokens():
+    text = " ".join(f"Sentence {i} has several plain words in it." for i in range(200))
+    chunks = chunk_text(text, max_tokens=100, overlap=20)
+    assert all(line_tokens(chunk["text"].splitlines()) <= 100 for chunk in chunks)
+
+
+def test_transcript_chunks_keep_whole_cues_and_their_times():
+    cues = [f"{i * 4.5:.2f}s: speaker says something about topic {i} in a few words" for i in range(80)]
+    chunks = chunk_text("\n".join(cues), max_tokens=90, overlap=20)
+    assert len(chunks) > 3
+    for chunk in chunks:
+        lines = chunk["text"].splitlines()
+        # Every line is a whole cue, so its timestamp survives
+        assert all(line in cues for line in lines)
+        assert chunk["start_seconds"] == float(TIMESTAMP_LINE.match(lines[0]).group(1))
+        assert chunk["end_seconds"] == float(TIMESTAMP_LINE.match(lines[-1]).group(1))
+
+
+def test_chunk_document_metadata_is_consistent_and_deterministic():
+    video = {
+        "class": "YouTubeVideo", "title": "Talk", "videoId": "abc123",
+        "url": "https://www.youtube.com/watch?v=abc123", "publishedAt": "2024-01-01",
+        "transcript": "\n".join(f"{i}.0s: cue number {i} with some words to fill it" for i in range(100)),
+    }
+    chunks = chunk_document(video, max_tokens=80, overlap=10)
+    count = len(chunks)
+    assert count > 1
+    assert [chunk["chunkIndex"] for chunk in chunks] == list(range(count))
+    assert {chunk["chunkCount"] for chunk in chunks} == {count}
+    assert {chunk["parentId"] for chunk in chunks} == {parent_id(video)}
+    assert all(chunk["url"] == video["url"] and chunk["title"] == "Talk" for chunk in chunks)
+    assert all("startSeconds" in chunk and chunk["startSeconds"] <= chunk["endSeconds"] for chunk in chunks)
+    assert chunk_document(video, max_tokens=80, overlap=10) == chunks
+    assert parent_id(dict(video, url="https://www.youtube.com/watch?v=other")) != parent_id(video)
+
+
+def test_empty_document_is_one_chunk():
+    chunks = chunk_document({"class": "WebPage", "url": "https://leap.columbia.edu/", "transcript": ""})
+    assert len(chunks) == 1
+    assert chunks[0]["chunkIndex"] == 0 and chunks[0]["chunkCount"] == 1
+    assert "startSeconds" not in chunks[0]
@@ -0,0 +1,74 @@
+import random
+
+from dedup import MIN_WORDS, NearDuplicateIndex, dedup_records
+
+VOCABULARY = ("ocean heat flux model ensemble precipitation aerosol cloud sea ice albedo "
+              "carbon forcing reanalysis rainfall drought monsoon jet stream vortex").split()
+
+
+def text(seed, words=300):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(VOCABULARY) + str(rng.randrange(50)) for _ in range(words))
+
+
+def near_copy(original, changed_every=100):
+    words = original.split()
+    return " ".join("edited" if i % changed_every == 0 else w for i, w in enumerate(words))
+
+
+def page(url, transcript):
+    return {"url": url, "transcript": transcript}
+
+
+def test_near_copy_is_dropped_and_recorded():
+    index = NearDuplicateIndex()
+    duplicates = {}
+    original = text(1)
+    records = [page("https://a/page", original), page("https://a/other", text(2)),
+               page("https://a/tag/page", near_copy(original))]
+    kept = list(dedup_records(records, index, duplicates))
+    assert [r["url"] for r in kept] == ["https://a/page", "https://a/other"]
+    assert list(duplicates) == ["https://a/tag/page"]
+    assert duplicates["https://a/tag/page"]["duplicate_of"] == "https://a/page"
+    assert duplicates["https://a/tag/page"]["similarity"] >= index.threshold
+
+
+def test_recrawled_page_is_not_a_duplicate_of_itself():
+    index = NearDuplicateIndex()
+    original = text(1)
+    assert list(dedup_records([page("https://a/page", original)], index)) == [page("https://a/page", original)]
+
+    # Next run: the same URL with a small edit replaces its own fingerprint
+    duplicates = {}
+    edited = near_copy(original)
+    kept = list(dedup_records([page("https://a/page", edited)], index, duplicates))
+    assert kept == [page("https://a/page", edited)]
+    assert not duplicates
+    assert list(index.signatures) == ["https://a/page"]
+
+
+def test_saved_index_still_matches(tmp_path):
+    index = NearDuplicateIndex()
+    original = text(3)
+    list(dedup_records([page("https://a/page", original), page("https://a/other", text(4))], index))
+    path = str(tmp_path / "dedup_index.npz")
+    index.save(path)
+
+    loaded = NearDuplicateIndex.load(path)
+    assert sorted(loaded.signatures) == ["https://a/other", "https://a/page"]
+    duplicates = {}
+    kept = list(dedup_records([page("https://mirror/page", near_copy(original))], loaded, duplicates))
+    assert kept == []
+    assert duplicates["https://mirror/page"]["duplicate_of"] == "https://a/page"
+
+
+def test_missing_index_loads_empty(tmp_path):
+    assert NearDuplicateIndex.load(str(tmp_path / "missing.npz")).signatures == {}
+
+
+def test_short_texts_and_records_without_url_pass_through():
+    index = NearDuplicateIndex()
+    short = " ".join(["same words"] * ((MIN_WORDS - 1) // 2))
+    records = [page("https://a/1", short), page("https://a/2", short), page("", text(5)), page("", text(5))]
+    assert list(dedup_records(records, index)) == records
+    assert index.signatures == {}
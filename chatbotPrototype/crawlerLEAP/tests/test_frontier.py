@@ -0,0 +1,93 @@
+from frontier import LOW_VALUE_PENALTY, BloomFilter, Frontier, link_score
+
+
+def small_frontier(**kwargs):
+    return Frontier(seen=BloomFilter(capacity=10_000), **kwargs)
+
+
+def test_best_links_pop_first():
+    frontier = small_frontier()
+    frontier.push("https://leap.columbia.edu/about", 2, "about")
+    frontier.push("https://leap.columbia.edu/research/climate-data", 2, "research")
+    frontier.push("https://leap.columbia.edu/", 0, "home")
+    frontier.push("https://leap.columbia.edu/people", 1, "people")
+    frontier.push("https://leap.columbia.edu/news", 1, "news", extra={"etag": "x"})
+    popped = [frontier.pop() for _ in range(len(frontier))]
+    assert popped == [
+        ("https://leap.columbia.edu/", 0),
+        ("https://leap.columbia.edu/research/climate-data", 2),
+        ("https://leap.columbia.edu/people", 1),
+        ("https://leap.columbia.edu/news", 1, {"etag": "x"}),   # same score: first in, first out
+        ("https://leap.columbia.edu/about", 2),
+    ]
+    assert not frontier
+
+
+def test_low_value_pages_are_pushed_back():
+    for url in ("https://leap.columbia.edu/tag/events", "https://leap.columbia.edu/news/page/3",
+                "https://leap.columbia.edu/feed", "https://leap.columbia.edu/news?page=2"):
+        clean = url.replace("tag/", "").replace("/page/3", "").replace("/feed", "/").split("?")[0]
+        assert link_score(url, 1) == link_score(clean, 1) + LOW_VALUE_PENALTY
+    frontier = small_frontier()
+    frontier.push("https://leap.columbia.edu/tag/ocean", 1, "tag")
+    frontier.push("https://leap.columbia.edu/team", 3, "team")
+    assert frontier.pop()[0] == "https://leap.columbia.edu/team"
+
+
+def test_anchor_text_counts_as_relevance():
+    assert link_score("https://x/a", 1, "Climate model tutorial") < link_score("https://x/a", 1, "Click here")
+
+
+def test_already_queued_keys_are_skipped():
+    frontier = small_frontier()
+    assert frontier.push("https://x/a", 1, "x/a")
+    assert not frontier.push("https://x/a#top", 1, "x/a")
+    assert len(frontier) == 1
+
+
+def test_overflow_keeps_the_best_max_size_links():
+    frontier = small_frontier(max_size=100)
+    for i in range(500):
+        frontier.push(f"https://x/{i}", i, f"key{i}")
+    assert 100 <= len(frontier) <= 125
+    assert frontier.dropped == 500 - len(frontier)
+    depths = [frontier.pop()[1] for _ in range(len(frontier))]
+    # The 100 best always survive; links pushed since the last trim wait for the next one
+    assert depths[:100] == list(range(100))
+    assert depths == sorted(depths)
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=5_000, error_rate=0.01)
+    items = [f"https://leap.columbia.edu/page/{i}" for i in range(5_000)]
+    for item in items:
+        bloom.add(item)
+    assert all(item in bloom for item in items)
+    assert not bloom.add(items[0])
+    false_positives = sum(f"https://other.org/{i}" in bloom for i in range(5_000))
+    assert false_positives < 5_000 * 0.03
+
+
+def test_mmap_bloom_filter_survives_reopen(tmp_path):
+    path = str(tmp_path / "seen.bloom")
+    bloom = BloomFilter(capacity=1_000, path=path)
+    for i in range(200):
+        bloom.add(f"https://x/{i}")
+    bloom.close()
+
+    reopened = BloomFilter(capacity=1_000, path=path)
+    assert all(f"https://x/{i}" in reopened for i in range(200))
+    frontier = Frontier(seen=reopened)
+    assert not frontier.push("https://x/5", 1, "https://x/5")
+    assert frontier.push("https://x/new", 1, "https://x/new")
+    reopened.close()
+
+
+def test_mmap_bloom_filter_of_another_size_starts_empty(tmp_path):
+    path = str(tmp_path / "seen.bloom")
+    bloom = BloomFilter(capacity=1_000, path=path)
+    bloom.add("https://x/1")
+    bloom.close()
+    resized = BloomFilter(capacity=50_000, path=path)
+    assert "https://x/1" not in resized
+    resized.close()
@@ -0,0 +1,54 @@
+import time
+
+import fitz
+import pytest
+
+import pdfstage
+from pdfstage import PdfLimitExceeded, PdfStage
+
+
+def _hang(path):
+    time.sleep(60)
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    path = tmp_path / "report.pdf"
+    doc = fitz.open()
+    for i in range(3):
+        doc.new_page().insert_text((72, 72), f"Page {i} of the report")
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+@pytest.fixture
+def stage():
+    stage = PdfStage(workers=1, cache_dir=None, pages_per_task=2)
+    yield stage
+    stage.close()
+
+
+def test_extracts_all_pages(stage, pdf_path):
+    text = stage.extract(pdf_path, deadline=time.monotonic() + 30)
+    assert [f"Page {i} of the report" in text for i in range(3)] == [True] * 3
+
+
+def test_hung_extraction_is_killed_at_the_deadline(stage, pdf_path, monkeypatch):
+    stage.extract(pdf_path)  # start the worker
+    hung_pool = stage._pool
+    workers = list(hung_pool._processes.values())
+    monkeypatch.setattr(pdfstage, "_page_count", _hang)
+    started = time.monotonic()
+    with pytest.raises(PdfLimitExceeded):
+        stage.extract(pdf_path, deadline=started + 0.5)
+    assert time.monotonic() - started < 5
+    assert stage.pools_recycled == 1 and stage._pool is not hung_pool
+    assert workers
+    for process in workers:
+        process.join(timeout=5)
+        assert not process.is_alive()
+
+    # The replacement pool still extracts normally
+    monkeypatch.undo()
+    assert "Page 2 of the report" in stage.extract(pdf_path, deadline=time.monotonic() + 30)
@@ -0,0 +1,112 @@
+import asyncio
+import threading
+
+import pytest
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+import renderpool
+from renderpool import MAX_CRASH_RETRIES, RenderPool
+
+
+class FakeDriver:
+    """Renders '<url>' as its page source; some URLs crash the browser or time out."""
+
+    def __init__(self, number, crash_urls):
+        self.number = number
+        self.crash_urls = crash_urls
+        self.pages = []
+        self.quit_calls = 0
+
+    def get(self, url):
+        if url == "slow":
+            raise TimeoutException("page load timed out")
+        if self.crash_urls.get(url, 0) > 0:
+            self.crash_urls[url] -= 1
+            raise WebDriverException("chrome not reachable")
+        self.pages.append(url)
+        self.page_source = f"<html>{url}</html>"
+
+    def quit(self):
+        self.quit_calls += 1
+
+
+class FakeBrowsers:
+    def __init__(self, crash_urls=None):
+        self.crash_urls = dict(crash_urls or {})
+        self.drivers = []
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            driver = FakeDriver(len(self.drivers), self.crash_urls)
+            self.drivers.append(driver)
+            return driver
+
+
+@pytest.fixture(autouse=True)
+def no_settle_wait(monkeypatch):
+    monkeypatch.setattr(renderpool, "wait_for_page_ready", lambda driver: True)
+
+
+def test_browser_is_recycled_after_pages_per_browser():
+    browsers = FakeBrowsers()
+    pool = RenderPool(size=1, pages_per_browser=3, driver_factory=browsers)
+    urls = [f"https://x/{i}" for i in range(7)]
+    sources = [pool.submit(url).result(timeout=5) for url in urls]
+    pool.close()
+
+    assert sources == [f"<html>{url}</html>" for url in urls]
+    assert pool.browsers_started == 3
+    assert [driver.pages for driver in browsers.drivers] == [urls[0:3], urls[3:6], urls[6:]]
+    assert all(driver.quit_calls == 1 for driver in browsers.drivers)
+
+
+def test_crashed_browser_is_replaced_and_the_page_retried():
+    browsers = FakeBrowsers(crash_urls={"https://x/crash": 1})
+    pool = RenderPool(size=1, driver_factory=browsers)
+    assert pool.submit("https://x/crash").result(timeout=5) == "<html>https://x/crash</html>"
+    assert pool.submit("https://x/next").result(timeout=5) == "<html>https://x/next</html>"
+    pool.close()
+
+    assert pool.crashes == 1
+    assert pool.browsers_started == 2
+    assert browsers.drivers[0].quit_calls == 1
+    assert browsers.drivers[1].pages == ["https://x/crash", "https://x/next"]
+
+
+def test_page_that_keeps_crashing_fails_after_the_retries():
+    browsers = FakeBrowsers(crash_urls={"https://x/crash": 99})
+    pool = RenderPool(size=1, driver_factory=browsers)
+    with pytest.raises(WebDriverException):
+        pool.submit("https://x/crash").result(timeout=5)
+    # The pool still works for other pages afterwards
+    assert pool.submit("https://x/ok").result(timeout=5) == "<html>https://x/ok</html>"
+    pool.close()
+    assert pool.crashes == MAX_CRASH_RETRIES + 1
+
+
+def test_page_load_timeout_is_not_a_crash():
+    browsers = FakeBrowsers()
+    pool = RenderPool(size=1, driver_factory=browsers)
+    with pytest.raises(TimeoutException):
+        pool.submit("slow").result(timeout=5)
+    assert pool.submit("https://x/after").result(timeout=5) == "<html>https://x/after</html>"
+    pool.close()
+
+    assert pool.crashes == 0
+    assert pool.browsers_started == 1
+    assert browsers.drivers[0].quit_calls == 1   # only at close
+
+
+def test_pool_can_be_awaited_from_asyncio():
+    browsers = FakeBrowsers()
+    pool = RenderPool(size=3, driver_factory=browsers)
+
+    async def render_all():
+        return await asyncio.gather(*(pool(f"https://x/{i}") for i in range(9)))
+
+    sources = asyncio.run(render_all())
+    pool.close()
+    assert sources == [f"<html>https://x/{i}</html>" for i in range(9)]
+    assert pool.browsers_started <= 3
+    assert all(driver.quit_calls == 1 for driver in browsers.drivers)
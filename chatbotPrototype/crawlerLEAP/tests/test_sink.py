@@ -0,0 +1,69 @@
+import threading
+import time
+
+from sink import RotatingJsonlSink, SinkReader
+
+
+def write_run(directory, count, max_records=2):
+    with RotatingJsonlSink(str(directory), max_records=max_records) as sink:
+        for i in range(count):
+            sink.write({"url": f"https://example.org/{i}"})
+    return sink.run_id
+
+
+def test_uncommitted_files_are_read_again(tmp_path):
+    write_run(tmp_path, 5)  # files of 2, 2 and 1 records
+
+    reader = SinkReader(str(tmp_path))
+    records = iter(reader)
+    assert [next(records)["url"] for _ in range(3)][-1] == "https://example.org/2"
+    # The third record is still being stored: only the first file is done
+    reader.commit(include_last=False)
+    # ... then the import crashes
+
+    rerun = [r["url"] for r in SinkReader(str(tmp_path))]
+    assert rerun == [f"https://example.org/{i}" for i in (2, 3, 4)]
+
+
+def test_commit_after_reading_everything(tmp_path):
+    write_run(tmp_path, 3)
+    reader = SinkReader(str(tmp_path))
+    assert len(list(reader)) == 3
+    reader.commit()
+    assert list(SinkReader(str(tmp_path))) == []
+
+
+def test_follower_ignores_done_marker_of_previous_run(tmp_path):
+    write_run(tmp_path, 2)
+    previous = SinkReader(str(tmp_path))
+    list(previous)
+    previous.commit()
+
+    # Started before the next crawl: the old '.done' must not end it
+    follower = SinkReader(str(tmp_path), follow=True, poll_seconds=0.01)
+    seen = []
+    thread = threading.Thread(target=lambda: seen.extend(r["url"] for r in follower))
+    thread.start()
+    time.sleep(0.1)
+    assert thread.is_alive()
+
+    run_id = write_run(tmp_path, 3)
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert follower.run_id == run_id
+    assert seen == [f"https://example.org/{i}" for i in range(3)]
+
+
+def test_follower_started_during_a_run_stops_when_it_is_done(tmp_path):
+    sink = RotatingJsonlSink(str(tmp_path), max_records=1)
+    sink.write({"url": "a"})
+    follower = SinkReader(str(tmp_path), follow=True, poll_seconds=0.01)
+    assert follower.run_id == sink.run_id
+    seen = []
+    thread = threading.Thread(target=lambda: seen.extend(r["url"] for r in follower))
+    thread.start()
+    sink.write({"url": "b"})
+    sink.close()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert seen == ["a", "b"]
@@ -0,0 +1,107 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import yt
+
+VIDEO_COUNT = 120
+
+
+class DataApiStub(BaseHTTPRequestHandler):
+    """The two YouTube Data API endpoints yt.py uses, over VIDEO_COUNT uploads."""
+
+    requests_seen = []
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        self.requests_seen.append((url.path, params))
+        if url.path.endswith("/channels"):
+            body = {"items": [{"contentDetails": {"relatedPlaylists": {"uploads": "UU_stub"}}}]}
+        elif url.path.endswith("/playlistItems") and params.get("playlistId") == "UU_stub":
+            start = int(params.get("pageToken", 0))
+            stop = min(start + int(params["maxResults"]), VIDEO_COUNT)
+            body = {"items": [
+                {"snippet": {"title": f"Talk {i}", "publishedAt": "2024-01-01T00:00:00Z",
+                             "resourceId": {"videoId": f"vid{i:03d}"}},
+                 "contentDetails": {"videoPublishedAt": "2023-12-31T00:00:00Z"}}
+                for i in range(start, stop)
+            ]}
+            if stop < VIDEO_COUNT:
+                body["nextPageToken"] = str(stop)
+        else:
+            self.send_error(404)
+            return
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def api_url():
+    DataApiStub.requests_seen = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), DataApiStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/youtube/v3"
+    server.shutdown()
+    server.server_close()
+
+
+class StubTranscripts:
+    """Transcript fetcher that records calls and concurrency; 'failing' ids have none."""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, video_id):
+        with self._lock:
+            self.calls.append(video_id)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(0.01)
+            if video_id in self.failing:
+                return yt.NO_TRANSCRIPT
+            return f"0.0s: transcript of {video_id}"
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def test_harvest_pages_through_channel(api_url, tmp_path):
+    fetcher = StubTranscripts()
+    videos = yt.harvest("UC_stub", "key", api_url, fetcher, str(tmp_path), workers=4)
+
+    assert [v["videoId"] for v in videos] == [f"vid{i:03d}" for i in range(VIDEO_COUNT)]
+    assert videos[0]["publishedAt"] == "2023-12-31T00:00:00Z"
+    pages = [params for path, params in DataApiStub.requests_seen if path.endswith("/playlistItems")]
+    assert [p.get("pageToken") for p in pages] == [None, "50", "100"]
+    assert sorted(fetcher.calls) == [v["videoId"] for v in videos]
+    assert 1 < fetcher.max_in_flight <= 4
+
+
+def test_rerun_only_fetches_uncached_videos(api_url, tmp_path):
+    yt.harvest("UC_stub", "key", api_url, StubTranscripts(failing={"vid007"}), str(tmp_path))
+    (tmp_path / "vid100.json").unlink()
+
+    rerun = StubTranscripts()
+    videos = yt.harvest("UC_stub", "key", api_url, rerun, str(tmp_path))
+
+    # The missing transcript is retried and the deleted file refetched; nothing else
+    assert sorted(rerun.calls) == ["vid007", "vid100"]
+    assert videos[7]["transcript"] == "0.0s: transcript of vid007"
+    assert len(videos) == VIDEO_COUNT
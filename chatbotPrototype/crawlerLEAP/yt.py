@@ -1,66 +1,151 @@
 import os
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from youtube_transcript_api import YouTubeTranscriptApi
 import json
 
 # Replace these values as needed
 API_KEY = ""
 CHANNEL_ID = "UChCqE3MptBJlubiJMFxVnlw"
+# Point at a local stub of the Data API for testing
+API_BASE_URL = "https://www.googleapis.com/youtube/v3"
+MAX_RESULTS = 50          # the API's maximum page size
+TRANSCRIPT_WORKERS = 8    # transcripts fetched at once
+REQUEST_TIMEOUT = 30      # seconds
+# Videos cached without a transcript are asked for one again on the next run
+RETRY_MISSING_TRANSCRIPTS = True
 
-# Optionally create a folder to hold individual JSON files
+# One JSON file per video; also serves as the cache between runs
 OUTPUT_FOLDER = "youtube_videos_json"
-os.makedirs(OUTPUT_FOLDER, exist_ok=True)
-
-# This list will collect all video objects for the final "YouTube_Data.json"
-all_videos_data = []
-
-# Get videos from the channel
-search_url = (
-    f"https://www.googleapis.com/youtube/v3/search?key={API_KEY}"
-    f"&channelId={CHANNEL_ID}&part=snippet&type=video&maxResults=100"
-)
-response = requests.get(search_url)
-videos = response.json().get("items", [])
-
-# Process each video
-for video in videos:
-    video_id = video["id"]["videoId"]
-    title = video["snippet"]["title"]
-    url = f"https://www.youtube.com/watch?v={video_id}"
-    published_at = video["snippet"]["publishedAt"]
-
-    # Attempt to fetch the transcript
+COMBINED_FILENAME = "YouTube_Data.json"
+NO_TRANSCRIPT = "No transcript available"
+
+################################################################################
+# Channel listing
+################################################################################
+def _get(session, base_url, endpoint, params):
+    response = session.get(f"{base_url}/{endpoint}", params=params, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
+def list_channel_videos(channel_id, api_key=API_KEY, base_url=API_BASE_URL, session=None):
+    """
+    Yields (video_id, title, published_at) for every upload of the channel.
+    Pages through the channel's uploads playlist with pageToken; unlike
+    search, it isn't capped at a few hundred results and costs 1 quota unit
+    per page instead of 100.
+    """
+    session = session or requests.Session()
+    channel = _get(session, base_url, "channels",
+                   {"key": api_key, "id": channel_id, "part": "contentDetails"})
+    uploads = channel["items"][0]["contentDetails"]["relatedPlaylists"]["uploads"]
+
+    page_token = None
+    while True:
+        params = {"key": api_key, "playlistId": uploads, "part": "snippet,contentDetails",
+                  "maxResults": MAX_RESULTS}
+        if page_token:
+            params["pageToken"] = page_token
+        page = _get(session, base_url, "playlistItems", params)
+        for item in page.get("items", []):
+            snippet = item["snippet"]
+            published_at = item.get("contentDetails", {}).get("videoPublishedAt") or snippet["publishedAt"]
+            yield snippet["resourceId"]["videoId"], snippet["title"], published_at
+        page_token = page.get("nextPageToken")
+        if not page_token:
+            break
+
+################################################################################
+# Transcripts
+################################################################################
+def fetch_transcript(video_id):
+    """Transcript as '<start>s: <text>' lines, or NO_TRANSCRIPT."""
     try:
         transcript_data = YouTubeTranscriptApi.get_transcript(video_id)
-        transcript = "\n".join(
+        return "\n".join(
             f"{entry['start']}s: {entry['text']}" for entry in transcript_data
         )
-    except:
-        transcript = "No transcript available"
+    except Exception:
+        return NO_TRANSCRIPT
 
-    # Construct one Weaviate-style JSON object for this video
-    video_json = {
+def video_record(video_id, title, published_at, transcript):
+    """One Weaviate-style JSON object for a video."""
+    return {
         "class": "YouTubeVideo",
         "title": title,
         "videoId": video_id,
-        "url": url,
+        "url": f"https://www.youtube.com/watch?v={video_id}",
         "publishedAt": published_at,
         "transcript": transcript
     }
 
-    # 1) Write out a single JSON file per video, named by video_id
-    filename = os.path.join(OUTPUT_FOLDER, f"{video_id}.json")
+def load_cached(video_id, output_folder=OUTPUT_FOLDER):
+    path = os.path.join(output_folder, f"{video_id}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        video_json = json.load(f)
+    if RETRY_MISSING_TRANSCRIPTS and video_json.get("transcript") == NO_TRANSCRIPT:
+        return None
+    return video_json
+
+def save_video(video_json, output_folder=OUTPUT_FOLDER):
+    filename = os.path.join(output_folder, f"{video_json['videoId']}.json")
     with open(filename, "w", encoding="utf-8") as f:
         json.dump(video_json, f, indent=4, ensure_ascii=False)
-    print(f"✅ Saved {title} ({video_id}) to {filename}")
+    return filename
+
+################################################################################
+# Harvester
+################################################################################
+def harvest(channel_id=CHANNEL_ID, api_key=API_KEY, base_url=API_BASE_URL,
+            transcript_fetcher=fetch_transcript, output_folder=OUTPUT_FOLDER,
+            workers=TRANSCRIPT_WORKERS):
+    """
+    Lists every video of the channel and returns their JSON objects in
+    channel order. Videos already cached in output_folder are reused; the
+    transcripts of new ones are fetched concurrently on a pool of 'workers'
+    threads and each is cached as soon as it arrives.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    videos = list(list_channel_videos(channel_id, api_key, base_url))
+    results = {}
+    to_fetch = []
+    for video_id, title, published_at in videos:
+        cached = load_cached(video_id, output_folder)
+        if cached is not None:
+            results[video_id] = cached
+        else:
+            to_fetch.append((video_id, title, published_at))
+    print(f"{len(videos)} videos on the channel, {len(results)} cached, {len(to_fetch)} to fetch")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(transcript_fetcher, video_id): (video_id, title, published_at)
+            for video_id, title, published_at in to_fetch
+        }
+        for future in as_completed(futures):
+            video_id, title, published_at = futures[future]
+            try:
+                transcript = future.result()
+            except Exception:
+                transcript = NO_TRANSCRIPT
+            video_json = video_record(video_id, title, published_at, transcript)
+            filename = save_video(video_json, output_folder)
+            print(f"✅ Saved {title} ({video_id}) to {filename}")
+            results[video_id] = video_json
+
+    return [results[video_id] for video_id, _, _ in videos]
+
+def main():
+    all_videos_data = harvest()
 
-    # 2) Add to the master list
-    all_videos_data.append(video_json)
+    # Write the *combined* data to "YouTube_Data.json"
+    with open(COMBINED_FILENAME, "w", encoding="utf-8") as f:
+        json.dump(all_videos_data, f, indent=4, ensure_ascii=False)
 
-# Finally, write the *combined* data to "YouTube_Data.json"
-combined_filename = "YouTube_Data.json"
-with open(combined_filename, "w", encoding="utf-8") as f:
-    json.dump(all_videos_data, f, indent=4, ensure_ascii=False)
+    print(f"\nAll videos also saved together in {COMBINED_FILENAME}")
+    print("Done saving individual JSON files for each video plus a combined JSON.")
 
-print(f"\nAll videos also saved together in {combined_filename}")
-print("Done saving individual JSON files for each video plus a combined JSON.")
+if __name__ == "__main__":
+    main()
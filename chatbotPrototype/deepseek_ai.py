@@ -1,12 +1,9 @@
 import streamlit as st
 import requests
 import json
-from urllib.parse import urljoin, urlparse
+import os
 
-import weaviate
-from weaviate.classes.init import Auth
-from weaviate.classes.config import Configure, Integrations
-from weaviate.classes.query import MetadataQuery
+from openrouter import iter_sse_data, pooled_session
 
 # ------------------------------------------------------------------------
 # Page configuration and styling
@@ -18,149 +15,42 @@ st.set_page_config(
 )
 
 # ------------------------------------------------------------------------
-# OpenRouter API configuration
+# Chat service configuration
 # ------------------------------------------------------------------------
+# Retrieval and generation run in chat_service.py; this page only renders.
+# Start it with: uvicorn chat_service:app --port 8000
+SERVICE_URL = os.environ.get("LEAP_CHAT_SERVICE_URL", "http://localhost:8000")
+CONNECT_TIMEOUT = 5    # seconds
+READ_TIMEOUT = 120     # seconds without any event from the service
+
 DEEPSEEK_MODEL = "deepseek/deepseek-r1:free"
 MISTRAL_MODEL = "mistralai/mistral-7b-instruct:free"
 
-API_KEY = "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"
-API_URL = "https://openrouter.ai/api/v1/chat/completions"
-
-headers = {
-    "Authorization": f"Bearer {API_KEY}",
-    "Content-Type": "application/json",
-}
-
-# ------------------------------------------------------------------------
-# Connect to Weaviate Cloud and configure integrations
-# ------------------------------------------------------------------------
 @st.cache_resource
-def setup_weaviate_client():
-    client = weaviate.connect_to_weaviate_cloud(
-        cluster_url="https://8fzaavbvs9cmcmmhj3r9ag.c0.us-east1.gcp.weaviate.cloud",  # Replace with your Weaviate Cloud URL
-        auth_credentials=Auth.api_key("UO94NG8zO65WQ7TYe6RzjbKNIwepH4TvAMa1"),         # Replace with your Weaviate Cloud key
-    )
-    integrations = [
-        Integrations.cohere(
-            api_key="vaJnTfyc9YMXCBGen8l0ttVqt5O0RUrOIIaiIshg",
-        ),
-    ]
-    client.integrations.configure(integrations)
-    return client
-
-# Initialize client and get collection
-client = setup_weaviate_client()
-storage = client.collections.get("leapData")
+def get_service_session():
+    """One keep-alive connection pool to the chat service for all sessions."""
+    return pooled_session()
 
-# ------------------------------------------------------------------------
-# Helper Functions
-# ------------------------------------------------------------------------
-def call_openrouter(model, system_prompt, user_prompt, max_tokens=1500):
-    """Call the OpenRouter API with the specified model, system prompt, user prompt, and parameters."""
-    messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": user_prompt}
-    ]
-    
-    payload = {
-        "model": model,
-        "messages": messages,
-        "max_tokens": max_tokens,
-        "temperature": 0.3,  # Lower temperature for more factual responses
-    }
-    
-    try:
-        with st.spinner(f"Waiting for {model} response..."):
-            response = requests.post(API_URL, headers=headers, json=payload)
-            response.raise_for_status()
-            return response.json()
-    except requests.exceptions.RequestException as e:
-        return {"error": str(e)}
-
-def enhance_query(original_query, chosen_model):
-    """Enhance the query to improve semantic search results."""
-    system_prompt = """
-    You are a search query enhancer for a climate science database called LEAP 
-    (Learning the Earth with Artificial Intelligence and Physics).
-
-    Your task is to enhance this search query for a semantic search engine that 
-    searches through climate science resources.
-    
-    1. Identify the key climate science concepts, entities, and relationships
-    2. Expand climate science abbreviations if needed (e.g., CMIP6, GCM, RCP)
-    3. Add relevant climate science synonyms or related terms that might help the search
-    4. Format as a clear, concise query that preserves the original intent
-    5. Return ONLY the enhanced query, no explanations
-    """
-    
-    response = call_openrouter(
-        chosen_model, 
-        system_prompt, 
-        original_query,
-        max_tokens=2000
+def call_service(method, path, **kwargs):
+    """JSON response of a chat service endpoint; raises requests.RequestException."""
+    response = get_service_session().request(
+        method, f"{SERVICE_URL}{path}", timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), **kwargs
     )
-    
-    if isinstance(response, dict) and "choices" in response and response["choices"]:
-        enhanced = response["choices"][0]["message"].get("content", original_query)
-        return enhanced.strip()
-    return original_query
-
-def search_weaviate(query, limit=10):
-    """Search the Weaviate database with the given query."""
-    try:
-        query_result = storage.query.near_text(
-            query=query,
-            limit=limit,
-            return_metadata=MetadataQuery(distance=True)
-        )
-        return query_result
-    except Exception as e:
-        st.error(f"Error querying Weaviate: {e}")
-        return None
+    response.raise_for_status()
+    return response.json()
 
-def reduce_text(text, max_chars=5000):
-    """
-    Reduces the text content by truncating it to a maximum number of characters.
-    """
-    if text and len(text) > max_chars:
-        return text[:max_chars] + "..."
-    return text
-
-def format_context(query_result, top_results=5, max_distance=1.0):
-    """
-    Format the search results into a context for the model.
-    Checks for a "url" property and, if missing or empty, falls back to "title" or "question".
-    Uses "transcript" if available; otherwise "answer". Content is truncated with reduce_text().
-    """
-    if not query_result or not query_result.objects:
-        return None
-        
-    combined_blocks = []
-    seen_sources = set()
-    
-    for obj in query_result.objects:
-        source = obj.properties.get("url")
-        if not source or source.strip() == "":
-            source = obj.properties.get("title") or obj.properties.get("question", "Unknown Source")
-        
-        # Avoid duplicate sources
-        if source in seen_sources:
-            continue
-        seen_sources.add(source)
-        
-        content = obj.properties.get("transcript") or obj.properties.get("answer")
-        if not content or content.startswith("Error scraping"):
-            continue
-
-        content = reduce_text(content, max_chars=5000)
-        
-        source_info = f"--- SOURCE: {source} (relevance: {1 - obj.metadata.distance:.2f}) ---"
-        combined_blocks.append(f"{source_info}\n{content}")
-    
-    if not combined_blocks:
-        return None
-        
-    return "\n\n".join(combined_blocks)
+def stream_answer_events(request_body):
+    """Yields the events of POST /answer (see chat_service.answer_events) as they arrive."""
+    with get_service_session().post(
+        f"{SERVICE_URL}/answer", json=request_body, stream=True,
+        timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+    ) as response:
+        response.raise_for_status()
+        # chunk_size=None hands over each chunk of the (chunked) SSE response as it arrives
+        for data in iter_sse_data(response.iter_lines(chunk_size=None, decode_unicode=True)):
+            if data == "[DONE]":
+                return
+            yield json.loads(data)
 
 # ------------------------------------------------------------------------
 # UI Components
@@ -168,7 +58,7 @@ def format_context(query_result, top_results=5, max_distance=1.0):
 def render_sidebar():
     with st.sidebar:
         st.title("⚙️ Settings")
-        
+
         # Provide both models in a selectbox
         model_choice = st.selectbox(
             "Select AI model:",
@@ -176,24 +66,59 @@ def render_sidebar():
             index=0,
             help="Select which AI model to use for answering your questions."
         )
-        
+
+        enhancement_mode = st.selectbox(
+            "Query enhancement:",
+            ["llm", "rules", "off"],
+            index=0,
+            format_func={
+                "llm": "LLM rewrite (runs alongside search)",
+                "rules": "Acronym expansion only (fast)",
+                "off": "Off",
+            }.get,
+            help="How the question is rewritten before searching."
+        )
+
         # Hardcoded best parameters
-        search_limit = 5
+        search_limit = 10  # chunks kept after reranking; grouped into at most top_results sources
         top_results = 5
+        context_tokens = 3000
         max_distance = 0.5
-        
+
         st.divider()
         st.markdown("""
         ### About
         This app semantically searches through LEAP resources and uses AI to provide accurate answers based on the retrieved information.
-        
+
         ### How it works:
         1. Your query is enhanced for better semantic search
         2. Relevant content is retrieved from our database
         3. An AI model uses this content to answer your question
         """)
         show_debug = st.checkbox("Enable Debug Mode", value=False)
-    return model_choice, search_limit, top_results, max_distance, show_debug
+        if st.button("🆕 New conversation"):
+            start_new_conversation()
+    return model_choice, enhancement_mode, search_limit, top_results, max_distance, context_tokens, show_debug
+
+def start_new_conversation():
+    """Forgets the current conversation here and in the chat service."""
+    conversation_id = st.session_state.get("conversation_id")
+    if conversation_id:
+        try:
+            call_service("DELETE", f"/conversations/{conversation_id}")
+        except requests.exceptions.RequestException:
+            pass  # it expires on its own
+    st.session_state.conversation_id = None
+    st.session_state.turns = []
+
+def render_history():
+    """Earlier questions and answers of this conversation."""
+    if st.session_state.turns:
+        with st.expander(f"💬 Earlier in this conversation ({len(st.session_state.turns)})", expanded=False):
+            for question, answer in st.session_state.turns:
+                st.markdown(f"**You:** {question}")
+                st.markdown(answer)
+                st.markdown("---")
 
 def render_main_panel():
     st.title("🌍 LEAP Research Assistant")
@@ -204,8 +129,37 @@ def render_main_panel():
     )
     return user_query
 
-def render_debug_info(enhanced_query, context, raw_response, query_result=None):
+def render_results(results, label="Result"):
+    """Search results as returned by the chat service (source, content, relevance)."""
+    for idx, result in enumerate(results):
+        st.markdown(f"**{label} {idx+1}:** {result['source']}")
+        if result.get("relevance"):
+            st.markdown(f"**Relevance:** {result['relevance']:.4f}")
+        content = result.get("content")
+        if content:
+            preview = content[:200] + "..." if len(content) > 200 else content
+            st.text_area(f"Content Preview {idx+1}", preview, height=100)
+        else:
+            st.warning("No content available")
+        st.markdown("---")
+
+def render_latency_breakdown(trace):
+    """The request's spans (see tracing.py) as an indented table of stage timings."""
+    rows = []
+    for span in trace:
+        details = ", ".join(f"{key}={value}" for key, value in span["attributes"].items() if value is not None)
+        rows.append({
+            "Stage": "\u2003" * span["depth"] + span["name"],
+            "ms": span["ms"],
+            "Details": details + (f" ERROR: {span['error']}" if span.get("error") else ""),
+        })
+    st.table(rows)
+
+def render_debug_info(enhanced_query, context, raw_response, results=None, trace=None):
     with st.expander("🔍 Debug Information", expanded=True):
+        if trace:
+            st.subheader("Latency Breakdown")
+            render_latency_breakdown(trace)
         st.subheader("Enhanced Query")
         st.write(enhanced_query)
         st.subheader("Context Provided to Model")
@@ -213,65 +167,83 @@ def render_debug_info(enhanced_query, context, raw_response, query_result=None):
             st.text_area("Retrieved Content", context, height=200)
         else:
             st.error("No relevant context found in database")
-        
-        if query_result and query_result.objects:
+
+        if results:
             st.subheader("All Search Results")
-            for idx, obj in enumerate(query_result.objects):
-                source = obj.properties.get("url")
-                if not source or source.strip() == "":
-                    source = obj.properties.get("title") or obj.properties.get("question", "Unknown Source")
-                st.markdown(f"**Result {idx+1}:** {source}")
-                st.markdown(f"**Distance:** {obj.metadata.distance:.4f} (Relevance: {1 - obj.metadata.distance:.4f})")
-                content = obj.properties.get("transcript") or obj.properties.get("answer", "")
-                if content:
-                    preview = content[:200] + "..." if len(content) > 200 else content
-                    st.text_area(f"Content Preview {idx+1}", preview, height=100)
-                else:
-                    st.warning("No content available")
-                st.markdown("---")
-                
+            render_results(results)
+
         st.subheader("Raw API Response")
         st.json(raw_response)
 
-def render_answer(response_data):
-    if isinstance(response_data, dict) and "choices" in response_data:
-        if response_data["choices"] and "message" in response_data["choices"][0]:
-            final_answer = response_data["choices"][0]["message"].get("content", "")
-            st.markdown("### Answer")
-            st.markdown(final_answer)
-            col1, col2 = st.columns(2)
-            with col1:
-                st.button("👍 Helpful")
-            with col2:
-                st.button("👎 Not Helpful")
-        else:
-            st.error("No answer content found in the response.")
-    elif "error" in response_data:
-        st.error(f"Error: {response_data['error']}")
-    else:
-        st.error("Unrecognized response format.")
+def render_streamed_answer(request_body):
+    """
+    Streams the service's answer into the page token by token. Returns
+    (meta, response): the retrieval details of the "meta" event and the
+    answer in the shape of a non-streamed response (or {"error": ...}).
+    """
+    events = stream_answer_events(request_body)
+    try:
+        with st.spinner("Searching LEAP database..."):
+            # The first event arrives once retrieval is done
+            meta = next(events, None)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        st.error(f"Error reaching the chat service: {e}")
+        return {}, {"error": str(e)}
+    if meta is None or meta["type"] == "error":
+        error = meta["error"] if meta else "The chat service closed the connection without an answer."
+        st.error(error)
+        return {}, {"error": error}
+
+    if meta.get("reused_context"):
+        st.caption("↩️ Follow-up answered from the sources already found in this conversation.")
+    if meta.get("cached"):
+        cached = meta["cached"]
+        st.caption(f"⚡ Answered from cache (similar to \"{cached['question']}\", "
+                   f"similarity {cached['similarity']:.2f})")
+    st.markdown("### Answer")
+    response = {}
+
+    def deltas():
+        nonlocal response
+        for event in events:
+            if event["type"] == "delta":
+                yield event["text"]
+            elif event["type"] == "done":
+                response = event["response"]
+                meta["trace"] = event.get("trace")
+            elif event["type"] == "error":
+                response = {"error": event["error"]}
+
+    try:
+        text = st.write_stream(deltas())
+    except (requests.exceptions.RequestException, ValueError) as e:
+        st.error(f"Error: {e}")
+        return meta, {"error": str(e)}
+    if "error" in response:
+        if not text:
+            st.error(f"Error: {response['error']}")
+            return meta, response
+        st.warning(f"The answer was cut off: {response['error']}")
+    elif not text:
+        st.error("No answer content found in the response.")
+    if response.get("fallback_from"):
+        st.caption(f"{response['fallback_from']} was too slow or unavailable; answered by {response['model']}.")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.button("👍 Helpful")
+    with col2:
+        st.button("👎 Not Helpful")
+    return meta, response
 
 def inspect_database():
     with st.expander("🔍 Inspect Database Content", expanded=False):
         st.subheader("Sample Entries")
         try:
-            sample = storage.query.fetch_objects(limit=5)
-            if not sample or not sample.objects:
+            samples = call_service("GET", "/samples", params={"limit": 5})["results"]
+            if not samples:
                 st.warning("No entries found in the database.")
                 return
-            for idx, obj in enumerate(sample.objects):
-                st.markdown(f"**Sample {idx+1}**")
-                source = obj.properties.get("url")
-                if not source or source.strip() == "":
-                    source = obj.properties.get("title") or obj.properties.get("question", "Unknown Source")
-                st.markdown(f"**Source:** {source}")
-                transcript = obj.properties.get("transcript") or obj.properties.get("answer", "")
-                if transcript:
-                    preview = transcript[:200] + "..." if len(transcript) > 200 else transcript
-                    st.text_area(f"Content Preview {idx+1}", preview, height=100)
-                else:
-                    st.warning("No content found.")
-                st.markdown("---")
+            render_results(samples, label="Sample")
         except Exception as e:
             st.error(f"Error inspecting database: {e}")
 
@@ -281,86 +253,55 @@ def test_search():
         test_query = st.text_input("Enter test query:")
         if test_query and st.button("Run Test Search"):
             try:
-                query_result = search_weaviate(test_query, limit=5)
-                if not query_result or not query_result.objects:
+                results = call_service("POST", "/search", json={"query": test_query, "limit": 5})["results"]
+                if not results:
                     st.warning("No results found.")
                     return
                 st.markdown("### Search Results")
-                for idx, obj in enumerate(query_result.objects):
-                    source = obj.properties.get("url")
-                    if not source or source.strip() == "":
-                        source = obj.properties.get("title") or obj.properties.get("question", "Unknown Source")
-                    st.markdown(f"**Result {idx+1}:** {source}")
-                    st.markdown(f"**Distance:** {obj.metadata.distance:.4f} (Relevance: {1 - obj.metadata.distance:.4f})")
-                    content = obj.properties.get("transcript") or obj.properties.get("answer", "")
-                    if content:
-                        preview = content[:200] + "..." if len(content) > 200 else content
-                        st.text_area(f"Content Preview {idx+1}", preview, height=100)
-                    else:
-                        st.warning("No content available for this result")
-                    st.markdown("---")
+                render_results(results)
             except Exception as e:
                 st.error(f"Error testing search: {e}")
 
 def main():
     if 'user_query' not in st.session_state:
         st.session_state.user_query = ""
-    
-    model_choice, search_limit, top_results, max_distance, show_debug = render_sidebar()
+    if 'turns' not in st.session_state:
+        st.session_state.conversation_id = None
+        st.session_state.turns = []
+
+    model_choice, enhancement_mode, search_limit, top_results, max_distance, context_tokens, show_debug = render_sidebar()
     entered_query = render_main_panel()
     if entered_query:
         st.session_state.user_query = entered_query
-    
+
     if show_debug:
         inspect_database()
         test_search()
-    
+
     if st.session_state.user_query:
         user_query = st.session_state.user_query
         if st.button("Search", type="primary"):
-            with st.spinner("Enhancing query for climate science context..."):
-                enhanced_query = enhance_query(user_query, model_choice)
-            
-            with st.spinner("Searching LEAP database..."):
-                query_result = search_weaviate(query=enhanced_query, limit=search_limit)
-            
-            context = format_context(query_result, top_results=top_results, max_distance=max_distance)
-            
-            if context:
-                system_prompt = f"""
-                You are a helpful assistant for users of the LEAP (Learning the Earth with Artificial Intelligence and Physics) Columbia, which focuses on climate science research.
-                
-                Answer the user's question using the following LEAP resource content:
-                
-                {context}
-                
-                Instructions:
-                1. Be factual, comprehensive, and specific using the provided context. 
-                2. If the user asks for information not in the context, say "I don't have specific information about that in the LEAP resources I can access."
-                3. If you reference a website, include its source information in parentheses.
-                4. If you reference a youtube video, include its link and the exact time frames to watch by appending the end of the url with: &t=XhYmZs. "X" is the number of hours, "Y" is the number of minutes, and “Z” is the number of seconds.
-                5. Format your response clearly and give detailed answers.
-                6. Do not make up information or cite sources not in the provided context.
-                7. Focus on climate science information from the provided context.
-                8. ALWAYS REFERENCE ATLEAST THREE RESOURCES WITH LINKS TO THE WEBSITE! THIS IS A MUST.
-                """
-            else:
-                system_prompt = """
-                You are a helpful assistant for users of the LEAP (Learning the Earth with Artificial Intelligence and Physics) Columbia, which focuses on climate science research.
-
-                Unfortunately, I couldn't find specific information about that topic in the LEAP resources I have access to.
-                
-                Explain to the user that:
-                1. You don't have information about their specific query in the LEAP climate science database.
-                2. They should consider rephrasing their question to focus on LEAP-related resources.
-                3. Suggest more specific climate science related topics they might ask about.
-                """
-            
-            response_data = call_openrouter(model_choice, system_prompt, user_query)
-            render_answer(response_data)
-            
+            render_history()
+            # Retrieval, caching, conversation memory and generation all happen in the chat service
+            meta, response_data = render_streamed_answer({
+                "question": user_query,
+                "model": model_choice,
+                "enhancement_mode": enhancement_mode,
+                "search_limit": search_limit,
+                "top_results": top_results,
+                "max_distance": max_distance,
+                "context_tokens": context_tokens,
+                "conversation_id": st.session_state.conversation_id,
+            })
+            if meta.get("conversation_id"):
+                st.session_state.conversation_id = meta["conversation_id"]
+            answer = response_data.get("choices", [{}])[0].get("message", {}).get("content")
+            if answer:
+                st.session_state.turns.append((user_query, answer))
+
             if show_debug:
-                render_debug_info(enhanced_query, context, response_data, query_result)
+                render_debug_info(meta.get("enhanced_query"), meta.get("context"), response_data,
+                                  meta.get("results"), meta.get("trace"))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,421 @@
+import asyncio
+import json
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# The async client is optional; the Streamlit app only needs requests
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# ------------------------------------------------------------------------
+# Settings
+# ------------------------------------------------------------------------
+API_URL = "https://openrouter.ai/api/v1/chat/completions"
+CONNECT_TIMEOUT = 10   # seconds to open the connection
+READ_TIMEOUT = 60      # seconds without any bytes (OpenRouter sends keep-alive comments)
+TOTAL_TIMEOUT = 300    # seconds for the whole answer
+POOL_SIZE = 16         # keep-alive connections kept open to the API
+MAX_RETRIES = 2        # retries on connection errors, 429 and 5xx
+RETRY_BACKOFF = 0.5    # seconds, doubled on every retry
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Seconds a model may take to start answering before its fallback is asked instead
+LATENCY_BUDGET = 30
+
+
+class StreamError(Exception):
+    """The API returned an error, before or in the middle of a stream."""
+
+
+class FirstTokenTimeout(requests.Timeout):
+    """The model sent no answer text within its latency budget."""
+
+
+# ------------------------------------------------------------------------
+# Server-sent events
+# ------------------------------------------------------------------------
+def iter_sse_data(lines):
+    """
+    Yields the payload of every 'data:' event of a server-sent-event stream
+    given as decoded lines. Comment lines (': keep-alive') and other fields
+    are skipped; multi-line data is joined with newlines.
+    """
+    data = []
+    for line in lines:
+        if line is None:
+            continue
+        if line == "":
+            if data:
+                yield "\n".join(data)
+                data = []
+            continue
+        if line.startswith(":"):
+            continue
+        field, _, value = line.partition(":")
+        if field == "data":
+            data.append(value[1:] if value.startswith(" ") else value)
+    if data:
+        yield "\n".join(data)
+
+
+# ------------------------------------------------------------------------
+# Streaming chat completion
+# ------------------------------------------------------------------------
+class ChatStream:
+    """
+    One streamed chat completion from an OpenAI-compatible endpoint.
+    Iterating yields the answer's text deltas as they arrive, so it can be
+    handed straight to st.write_stream. Afterwards 'text', 'usage',
+    'finish_reason' and 'time_to_first_token' describe the answer.
+
+    Stopping early closes the HTTP connection, so the server stops
+    generating: break out of the loop, close() the stream (Streamlit does
+    this when a rerun interrupts st.write_stream), or set 'cancel_event'.
+    Raises StreamError for API errors and requests.Timeout when the server
+    goes quiet for READ_TIMEOUT or the answer exceeds 'total_timeout'.
+    """
+
+    def __init__(self, model, messages, headers, api_url=API_URL, max_tokens=1500,
+                 temperature=0.3, session=None, cancel_event=None, total_timeout=TOTAL_TIMEOUT,
+                 first_token_timeout=None):
+        self.model = model
+        self.payload = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "stream": True,
+        }
+        self.headers = headers
+        self.api_url = api_url
+        self.session = session or requests.Session()
+        self.cancel_event = cancel_event or threading.Event()
+        self.total_timeout = total_timeout
+        self.first_token_timeout = first_token_timeout
+        self.parts = []
+        self.usage = None
+        self.finish_reason = None
+        self.time_to_first_token = None
+        self.cancelled = False
+        self._response = None
+
+    @property
+    def text(self):
+        return "".join(self.parts)
+
+    def _open(self):
+        response = self.session.post(
+            self.api_url, headers=self.headers, json=self.payload, stream=True,
+            timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+        )
+        if response.status_code != 200:
+            try:
+                message = response.json().get("error", {}).get("message") or response.text
+            except ValueError:
+                message = response.text
+            response.close()
+            raise StreamError(f"HTTP {response.status_code}: {message}")
+        return response
+
+    def _checked_lines(self, lines, started):
+        """Enforces the deadlines on every line, keep-alive comments included."""
+        deadline = started + self.total_timeout
+        for line in lines:
+            now = time.monotonic()
+            if now > deadline:
+                raise requests.Timeout(f"No complete answer after {self.total_timeout}s")
+            if (self.first_token_timeout is not None and self.time_to_first_token is None
+                    and now - started > self.first_token_timeout):
+                raise FirstTokenTimeout(f"{self.model} sent nothing within {self.first_token_timeout}s")
+            yield line
+
+    def __iter__(self):
+        started = time.monotonic()
+        self._response = self._open()
+        try:
+            # chunk_size=None hands over each chunk of the (chunked) SSE response as it arrives
+            lines = self._response.iter_lines(chunk_size=None, decode_unicode=True)
+            for data in iter_sse_data(self._checked_lines(lines, started)):
+                if self.cancel_event.is_set():
+                    self.cancelled = True
+                    return
+                if data == "[DONE]":
+                    return
+                chunk = json.loads(data)
+                if "error" in chunk:
+                    raise StreamError(chunk["error"].get("message", str(chunk["error"])))
+                self.usage = chunk.get("usage") or self.usage
+                for choice in chunk.get("choices", []):
+                    self.finish_reason = choice.get("finish_reason") or self.finish_reason
+                    delta = choice.get("delta", {}).get("content")
+                    if delta:
+                        if self.time_to_first_token is None:
+                            self.time_to_first_token = time.monotonic() - started
+                        self.parts.append(delta)
+                        yield delta
+        finally:
+            self.close()
+
+    def cancel(self):
+        """Stop the stream from another thread; the loop ends at the next event."""
+        self.cancel_event.set()
+
+    def close(self):
+        if self._response is not None:
+            self._response.close()
+            self._response = None
+
+    def as_response(self):
+        """The answer in the shape of a non-streamed API response (for debug views)."""
+        return {
+            "model": self.model,
+            "choices": [{
+                "message": {"role": "assistant", "content": self.text},
+                "finish_reason": self.finish_reason,
+            }],
+            "usage": self.usage,
+            "time_to_first_token": self.time_to_first_token,
+            "cancelled": self.cancelled,
+        }
+
+
+def chat_messages(system_prompt, user_prompt):
+    """The messages list for a system + user prompt."""
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+
+
+# ------------------------------------------------------------------------
+# Pooled client with retries and model fallback
+# ------------------------------------------------------------------------
+def pooled_session(headers=None, pool_size=POOL_SIZE, retries=MAX_RETRIES):
+    """
+    requests.Session that keeps up to pool_size connections alive, so calls
+    reuse an open TLS connection, and retries connection errors and
+    429/5xx answers with exponential backoff (honouring Retry-After).
+    """
+    session = requests.Session()
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=0,  # a read error may mean the model already ran: don't pay twice
+        status=retries,
+        backoff_factor=RETRY_BACKOFF,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "POST"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if headers:
+        session.headers.update(headers)
+    return session
+
+
+class FallbackStream:
+    """
+    A ChatStream that switches to the fallback model when the first model
+    fails or sends no text within its latency budget. Once text has been
+    shown the model can't change, so later errors are raised as usual.
+    """
+
+    def __init__(self, client, model, messages, **kwargs):
+        self.client = client
+        self.requested_model = model
+        self.messages = messages
+        self.kwargs = kwargs
+        self.stream = None
+
+    def __iter__(self):
+        models = self.client.models_to_try(self.requested_model)
+        for model in models:
+            is_last = model == models[-1]
+            kwargs = dict(self.kwargs)
+            if is_last:
+                # Nothing left to fall back to: let the last model take its time
+                kwargs.pop("first_token_timeout", None)
+            self.stream = self.client.chat_stream(model, self.messages, **kwargs)
+            try:
+                yield from self.stream
+                return
+            except (StreamError, requests.exceptions.RequestException):
+                if self.stream.parts or is_last:
+                    raise
+
+    @property
+    def text(self):
+        return self.stream.text if self.stream else ""
+
+    def close(self):
+        if self.stream:
+            self.stream.close()
+
+    def as_response(self):
+        response = self.stream.as_response()
+        if self.stream.model != self.requested_model:
+            response["fallback_from"] = self.requested_model
+        return response
+
+
+class OpenRouterClient:
+    """
+    One connection-pooled client for every OpenRouter call of the app.
+    - Timeouts on connect and read, so a hung request can't freeze a worker.
+    - Retries with backoff on connection errors, 429 and 5xx.
+    - 'fallbacks' maps a model to the one asked instead when it errors or
+      goes over its latency budget (time to the first answer token when
+      streaming, to the whole answer otherwise).
+    """
+
+    def __init__(self, headers, api_url=API_URL, fallbacks=None, latency_budget=LATENCY_BUDGET,
+                 pool_size=POOL_SIZE, retries=MAX_RETRIES):
+        self.api_url = api_url
+        self.headers = headers
+        self.fallbacks = dict(fallbacks or {})
+        self.latency_budget = latency_budget
+        self.session = pooled_session(headers, pool_size, retries)
+
+    def close(self):
+        self.session.close()
+
+    def models_to_try(self, model):
+        models = [model]
+        while self.fallbacks.get(models[-1]) and self.fallbacks[models[-1]] not in models:
+            models.append(self.fallbacks[models[-1]])
+        return models
+
+    def complete(self, model, messages, max_tokens=1500, temperature=0.3):
+        """
+        Non-streamed chat completion; returns the API's JSON response, with
+        'fallback_from' set if another model answered. Raises
+        requests.RequestException (or StreamError for API errors).
+        """
+        models = self.models_to_try(model)
+        for candidate in models:
+            is_last = candidate == models[-1]
+            payload = {
+                "model": candidate,
+                "messages": messages,
+                "max_tokens": max_tokens,
+                "temperature": temperature,
+            }
+            # The last model gets the full read timeout, the others their budget
+            read_timeout = READ_TIMEOUT if is_last else self.latency_budget
+            try:
+                response = self.session.post(self.api_url, json=payload,
+                                             timeout=(CONNECT_TIMEOUT, read_timeout))
+                response.raise_for_status()
+                result = response.json()
+                if "error" in result:
+                    raise StreamError(result["error"].get("message", str(result["error"])))
+            except (StreamError, requests.exceptions.RequestException):
+                if is_last:
+                    raise
+                continue
+            if candidate != model:
+                result["fallback_from"] = model
+            return result
+
+    def chat_stream(self, model, messages, **kwargs):
+        """A single-model ChatStream over the pooled session."""
+        return ChatStream(model, messages, self.headers, api_url=self.api_url,
+                          session=self.session, **kwargs)
+
+    def stream(self, model, messages, **kwargs):
+        """Streamed completion with fallback; see FallbackStream."""
+        if self.fallbacks.get(model):
+            kwargs.setdefault("first_token_timeout", self.latency_budget)
+        return FallbackStream(self, model, messages, **kwargs)
+
+
+# ------------------------------------------------------------------------
+# Async client
+# ------------------------------------------------------------------------
+class AsyncOpenRouterClient:
+    """
+    asyncio counterpart of OpenRouterClient on one pooled aiohttp session,
+    so several completions (e.g. query enhancement for many questions in a
+    benchmark) can run concurrently over shared keep-alive connections.
+    Use as 'async with AsyncOpenRouterClient(headers) as client: ...'.
+    """
+
+    def __init__(self, headers, api_url=API_URL, fallbacks=None, latency_budget=LATENCY_BUDGET,
+                 pool_size=POOL_SIZE, retries=MAX_RETRIES):
+        if aiohttp is None:
+            raise ImportError("AsyncOpenRouterClient needs aiohttp")
+        self.api_url = api_url
+        self.headers = headers
+        self.fallbacks = dict(fallbacks or {})
+        self.latency_budget = latency_budget
+        self.pool_size = pool_size
+        self.retries = retries
+        self._session = None
+
+    models_to_try = OpenRouterClient.models_to_try
+
+    async def __aenter__(self):
+        self._session = aiohttp.ClientSession(
+            headers=self.headers,
+            connector=aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60),
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _post(self, payload, read_timeout):
+        timeout = aiohttp.ClientTimeout(connect=CONNECT_TIMEOUT, sock_read=read_timeout)
+        for attempt in range(self.retries + 1):
+            try:
+                async with self._session.post(self.api_url, json=payload, timeout=timeout) as response:
+                    if response.status in RETRY_STATUSES and attempt < self.retries:
+                        retry_after = response.headers.get("Retry-After")
+                        delay = float(retry_after) if retry_after and retry_after.isdigit() \
+                            else RETRY_BACKOFF * 2 ** attempt
+                        await asyncio.sleep(delay)
+                        continue
+                    response.raise_for_status()
+                    return await response.json(content_type=None)
+            except aiohttp.ServerTimeoutError:
+                raise  # as in the sync client, a read timeout is not retried
+            except aiohttp.ClientConnectionError:
+                if attempt == self.retries:
+                    raise
+                await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+    async def complete(self, model, messages, max_tokens=1500, temperature=0.3):
+        """Async version of OpenRouterClient.complete."""
+        models = self.models_to_try(model)
+        for candidate in models:
+            is_last = candidate == models[-1]
+            payload = {
+                "model": candidate,
+                "messages": messages,
+                "max_tokens": max_tokens,
+                "temperature": temperature,
+            }
+            try:
+                result = await self._post(payload, READ_TIMEOUT if is_last else self.latency_budget)
+                if "error" in result:
+                    raise StreamError(result["error"].get("message", str(result["error"])))
+            except (StreamError, aiohttp.ClientError, asyncio.TimeoutError):
+                if is_last:
+                    raise
+                continue
+            if candidate != model:
+                result["fallback_from"] = model
+            return result
@@ -0,0 +1,239 @@
+import contextvars
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from tracing import current_span, span
+
+# ------------------------------------------------------------------------
+# Settings
+# ------------------------------------------------------------------------
+# "llm": raw search runs while the LLM rewrites the query, results are fused
+# "rules": local acronym expansion only, no LLM call
+# "off": the raw query as typed
+ENHANCEMENT_MODES = ("llm", "rules", "off")
+ENHANCE_TIMEOUT = 20            # seconds to wait for the LLM before going without it
+# Enhancements running at once; matches chat_service.WORKER_THREADS, one per
+# request in flight. Past this the LLM rewrite is skipped rather than queued.
+ENHANCE_WORKERS = 64
+RRF_K = 60                      # reciprocal rank fusion constant
+ENHANCEMENT_CACHE_SIZE = 512
+ENHANCEMENT_CACHE_TTL = 7 * 24 * 3600
+
+# Climate-science acronyms and their expansions for the rule-based expander
+CLIMATE_ACRONYMS = {
+    "AMOC": "Atlantic Meridional Overturning Circulation",
+    "AR6": "IPCC Sixth Assessment Report",
+    "CESM": "Community Earth System Model",
+    "CMIP": "Coupled Model Intercomparison Project",
+    "CMIP5": "Coupled Model Intercomparison Project Phase 5",
+    "CMIP6": "Coupled Model Intercomparison Project Phase 6",
+    "CO2": "carbon dioxide",
+    "ENSO": "El Nino Southern Oscillation",
+    "ERA5": "ECMWF fifth generation atmospheric reanalysis",
+    "ESM": "Earth system model",
+    "GCM": "general circulation model global climate model",
+    "GHG": "greenhouse gas",
+    "IPCC": "Intergovernmental Panel on Climate Change",
+    "LEAP": "Learning the Earth with Artificial Intelligence and Physics",
+    "ML": "machine learning",
+    "MJO": "Madden Julian Oscillation",
+    "NAO": "North Atlantic Oscillation",
+    "NCAR": "National Center for Atmospheric Research",
+    "NOAA": "National Oceanic and Atmospheric Administration",
+    "RCM": "regional climate model",
+    "RCP": "Representative Concentration Pathway emissions scenario",
+    "SSP": "Shared Socioeconomic Pathway emissions scenario",
+    "SST": "sea surface temperature",
+    "TOA": "top of atmosphere",
+}
+# Scenario names such as RCP8.5 or SSP5-8.5 expand like their family
+_SCENARIO = re.compile(r"^(RCP|SSP)\d")
+_TOKEN = re.compile(r"[A-Za-z][A-Za-z0-9.\-]*[A-Za-z0-9]|[A-Za-z]")
+
+
+def expand_acronyms(query):
+    """
+    Appends the expansion of every known climate acronym in 'query'
+    (e.g. 'CMIP6 precipitation' -> 'CMIP6 precipitation (Coupled Model
+    Intercomparison Project Phase 6)'). Runs locally in microseconds.
+    """
+    expansions = []
+    for token in _TOKEN.findall(query):
+        upper = token.upper()
+        # Short lowercase words like 'ml' are too ambiguous unless written in capitals
+        if upper not in CLIMATE_ACRONYMS and _SCENARIO.match(upper):
+            upper = upper[:3]
+        expansion = CLIMATE_ACRONYMS.get(upper)
+        if expansion and (token.isupper() or len(token) > 3) and expansion not in expansions:
+            expansions.append(expansion)
+    if not expansions:
+        return query
+    return f"{query} ({'; '.join(expansions)})"
+
+
+# ------------------------------------------------------------------------
+# Enhancement cache
+# ------------------------------------------------------------------------
+class EnhancementCache:
+    """LRU cache with a TTL for LLM-enhanced queries, keyed by (model, query)."""
+
+    def __init__(self, max_size=ENHANCEMENT_CACHE_SIZE, ttl=ENHANCEMENT_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(model, query):
+        return model, " ".join(query.lower().split())
+
+    def get(self, model, query):
+        key = self._key(model, query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry[1] > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, model, query, enhanced):
+        with self._lock:
+            self._entries[self._key(model, query)] = (enhanced, time.time())
+            self._entries.move_to_end(self._key(model, query))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+# ------------------------------------------------------------------------
+# Result fusion
+# ------------------------------------------------------------------------
+class FusedResult:
+    """Quacks like a Weaviate query result: just an 'objects' list."""
+
+    def __init__(self, objects):
+        self.objects = objects
+
+
+def reciprocal_rank_fusion(results, k=RRF_K, limit=None):
+    """
+    Merges several ranked Weaviate results into one: every object scores
+    sum(1 / (k + rank)) over the lists it appears in. Rank fusion needs no
+    comparable scores, so results of different queries (and later, of
+    different search methods) can be combined. Returns a FusedResult.
+    """
+    scores = {}
+    objects = {}
+    for result in results:
+        if not result or not result.objects:
+            continue
+        for rank, obj in enumerate(result.objects, start=1):
+            key = obj.uuid
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            kept = objects.get(key)
+            # Keep the copy with the best (smallest) distance for display
+            if kept is None or (obj.metadata.distance or 1.0) < (kept.metadata.distance or 1.0):
+                objects[key] = obj
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    if limit is not None:
+        ranked = ranked[:limit]
+    return FusedResult([objects[key] for key in ranked])
+
+
+# ------------------------------------------------------------------------
+# Pipeline
+# ------------------------------------------------------------------------
+_executor = ThreadPoolExecutor(max_workers=ENHANCE_WORKERS, thread_name_prefix="query-enhance")
+# Enhancements not finished yet, so identical questions share one LLM call
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+def start_enhancement(enhance, query, model, cache=None):
+    """
+    Future of enhance(query, model) on the worker pool, shared with an
+    identical one already running; None when ENHANCE_WORKERS are all busy.
+    The result is cached when it arrives, even if the caller stopped
+    waiting for it.
+    """
+    key = (enhance,) + EnhancementCache._key(model, query)
+    with _pending_lock:
+        future = _pending.get(key)
+        if future is not None:
+            return future
+        if len(_pending) >= ENHANCE_WORKERS:
+            return None
+        # The worker thread gets this context, so its span nests under the caller's
+        future = _executor.submit(contextvars.copy_context().run, _traced_enhance, enhance, query, model)
+        _pending[key] = future
+
+    def finished(done):
+        with _pending_lock:
+            _pending.pop(key, None)
+        if done.exception() is not None:
+            return
+        enhanced = done.result()
+        if cache and enhanced and enhanced.strip() != query.strip():
+            cache.put(model, query, enhanced)
+
+    future.add_done_callback(finished)
+    return future
+
+
+def search_with_enhancement(query, model, enhance, search, limit, mode="llm",
+                            cache=None, timeout=ENHANCE_TIMEOUT):
+    """
+    Retrieves results for 'query' and returns (result, enhanced_query).
+    - "llm": the LLM enhancement (enhance(query, model) -> str) runs on a
+      worker thread while the raw query (acronym-expanded) is searched; the
+      enhanced query is then searched too and both rankings are fused.
+      Enhancements are cached, and one slower than 'timeout' is skipped
+      (its result still lands in the cache). When every enhancement worker
+      is busy, the raw results are returned without waiting for one.
+    - "rules": one search with the acronym-expanded query.
+    - "off": one search with the raw query.
+    search(query, limit) always runs on the calling thread; 'enhance' must
+    not make Streamlit calls.
+    """
+    current_span().set(enhancement_mode=mode)
+    if mode == "off":
+        with span("search", kind="raw"):
+            return search(query, limit), query
+    expanded = expand_acronyms(query)
+    if mode == "rules":
+        with span("search", kind="expanded"):
+            return search(expanded, limit), expanded
+
+    enhanced = cache.get(model, query) if cache else None
+    current_span().set(enhancement_cache_hit=enhanced is not None)
+    future = None
+    if enhanced is None:
+        future = start_enhancement(enhance, query, model, cache)
+        if future is None:
+            current_span().set(enhancement_skipped="saturated")
+    with span("search", kind="raw"):
+        raw_result = search(expanded, limit)
+
+    if future is not None:
+        with span("enhance.wait") as wait_span:
+            try:
+                enhanced = future.result(timeout=timeout)
+            except Exception:  # too slow or failed: go on with the raw results
+                enhanced = None
+                wait_span.set(skipped=True)
+    if not enhanced or enhanced.strip() in (query.strip(), expanded.strip()):
+        return raw_result, expanded
+
+    with span("search", kind="enhanced"):
+        enhanced_result = search(enhanced, limit)
+    return reciprocal_rank_fusion([enhanced_result, raw_result], limit=limit), enhanced
+
+
+def _traced_enhance(enhance, query, model):
+    with span("enhance", model=model):
+        return enhance(query, model)
@@ -0,0 +1,163 @@
+import math
+import re
+from collections import Counter
+
+from weaviate.classes.query import MetadataQuery
+
+from tracing import span
+
+# A local cross-encoder is used for reranking when installed
+try:
+    from sentence_transformers import CrossEncoder
+except ImportError:
+    CrossEncoder = None
+
+# ------------------------------------------------------------------------
+# Settings
+# ------------------------------------------------------------------------
+CANDIDATE_POOL = 40          # hybrid results fetched before reranking
+HYBRID_ALPHA = 0.5           # 0 = BM25 only, 1 = vector only
+MAX_VECTOR_DISTANCE = 0.5    # vector matches farther than this are not candidates
+TOP_K = 8                    # passages kept after reranking
+RELATIVE_CUTOFF = 0.35       # drop passages scoring below this fraction of the best
+CROSS_ENCODER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+BM25_K1 = 1.2
+BM25_B = 0.75
+_WORD = re.compile(r"\w+")
+
+
+# ------------------------------------------------------------------------
+# Result helpers shared by the UI and the context builder
+# ------------------------------------------------------------------------
+def object_source(obj):
+    """The result's URL, or its title/question when it has none."""
+    source = obj.properties.get("url")
+    if not source or source.strip() == "":
+        source = obj.properties.get("title") or obj.properties.get("question", "Unknown Source")
+    return source
+
+
+def object_content(obj):
+    """The result's text: 'transcript' if present, otherwise 'answer'."""
+    return obj.properties.get("transcript") or obj.properties.get("answer", "")
+
+
+def object_relevance(obj):
+    """0..1 relevance: 1 - distance for vector results, the fused score for hybrid ones."""
+    if obj.metadata.distance is not None:
+        return 1 - obj.metadata.distance
+    if obj.metadata.score is not None:
+        return obj.metadata.score
+    return 0.0
+
+
+class RetrievalResult:
+    """Reranked results; quacks like a Weaviate query result ('objects')."""
+
+    def __init__(self, objects, scores):
+        self.objects = objects
+        self.scores = scores
+
+
+# ------------------------------------------------------------------------
+# Rerankers
+# ------------------------------------------------------------------------
+class LexicalReranker:
+    """
+    Lightweight scorer: BM25 of the query terms in each passage, with the
+    candidate pool as corpus, blended with the hybrid search score. Needs
+    no model and runs in about a millisecond for a pool of 40.
+    """
+
+    def __init__(self, lexical_weight=0.5):
+        self.lexical_weight = lexical_weight
+
+    def score(self, query, objects):
+        query_terms = set(_WORD.findall(query.lower()))
+        docs = [Counter(_WORD.findall(object_content(obj).lower())) for obj in objects]
+        if not docs:
+            return []
+        avg_len = sum(sum(doc.values()) for doc in docs) / len(docs) or 1.0
+        bm25 = []
+        for doc in docs:
+            length = sum(doc.values())
+            total = 0.0
+            for term in query_terms:
+                freq = doc.get(term, 0)
+                if not freq:
+                    continue
+                df = sum(1 for other in docs if term in other)
+                idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+                total += idf * freq * (BM25_K1 + 1) / (
+                    freq + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_len))
+            bm25.append(total)
+        best_bm25 = max(bm25) or 1.0
+        search = [object_relevance(obj) for obj in objects]
+        best_search = max(search) or 1.0
+        return [
+            self.lexical_weight * lexical / best_bm25 + (1 - self.lexical_weight) * vector / best_search
+            for lexical, vector in zip(bm25, search)
+        ]
+
+
+class CrossEncoderReranker:
+    """Scores (query, passage) pairs jointly with a small local cross-encoder."""
+
+    def __init__(self, model_name=CROSS_ENCODER_MODEL):
+        self.model = CrossEncoder(model_name)
+
+    def score(self, query, objects):
+        if not objects:
+            return []
+        logits = self.model.predict([(query, object_content(obj)) for obj in objects])
+        return [1 / (1 + math.exp(-float(logit))) for logit in logits]
+
+
+def default_reranker():
+    """The cross-encoder if sentence-transformers is installed, else the lexical scorer."""
+    if CrossEncoder is not None:
+        try:
+            return CrossEncoderReranker()
+        except Exception:
+            pass  # model not downloadable here
+    return LexicalReranker()
+
+
+# ------------------------------------------------------------------------
+# Retrieval
+# ------------------------------------------------------------------------
+def hybrid_candidates(collection, query, pool=CANDIDATE_POOL, alpha=HYBRID_ALPHA,
+                      max_distance=MAX_VECTOR_DISTANCE):
+    """BM25 + vector search for a wide pool of candidates within max_distance."""
+    return collection.query.hybrid(
+        query=query,
+        alpha=alpha,
+        limit=pool,
+        max_vector_distance=max_distance,
+        return_metadata=MetadataQuery(score=True, distance=True),
+    )
+
+
+def retrieve(collection, query, reranker, top_k=TOP_K, pool=CANDIDATE_POOL,
+             max_distance=MAX_VECTOR_DISTANCE, relative_cutoff=RELATIVE_CUTOFF):
+    """
+    Hybrid search for 'pool' candidates, rerank them against the query and
+    keep at most top_k whose score is at least relative_cutoff x the best,
+    so the prompt gets a few precise passages instead of everything close.
+    Empty or unusable passages are dropped before reranking.
+    """
+    with span("weaviate.hybrid", pool=pool, max_distance=max_distance) as weaviate_span:
+        result = hybrid_candidates(collection, query, pool=pool, max_distance=max_distance)
+        candidates = [
+            obj for obj in (result.objects if result else [])
+            if object_content(obj) and not object_content(obj).startswith("Error scraping")
+        ]
+        weaviate_span.set(candidates=len(candidates))
+    with span("rerank", reranker=type(reranker).__name__) as rerank_span:
+        scores = reranker.score(query, candidates)
+        ranked = sorted(zip(scores, candidates), key=lambda pair: pair[0], reverse=True)
+        if ranked:
+            floor = ranked[0][0] * relative_cutoff
+            ranked = [pair for pair in ranked[:top_k] if pair[0] >= floor]
+        rerank_span.set(kept=len(ranked))
+    return RetrievalResult([obj for _, obj in ranked], [score for score, _ in ranked])
@@ -0,0 +1,111 @@
+"""
+A local fake of an OpenAI-compatible chat completions endpoint, for tests.
+Behaviour is picked by the requested model name (see FakeChatHandler).
+"""
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeChatHandler(BaseHTTPRequestHandler):
+    """
+    Models:
+      fast           - answers "Hello there, world" at once
+      slow           - like fast, after keep-alive comments for 'slow_seconds'
+      keepalive      - only ever sends keep-alive comments
+      error-midstream- one delta, then an error event
+      broken         - HTTP 500 on every request
+      flaky          - HTTP 503 for the first 'flaky_failures' requests, then fast
+    Streams use chunked transfer encoding, like the real API.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        model = payload["model"]
+        server = self.server
+        with server.lock:
+            server.calls[model] += 1
+            call = server.calls[model]
+
+        if model == "broken" or (model == "flaky" and call <= server.flaky_failures):
+            self._send_json(503 if model == "flaky" else 500, {"error": {"message": f"{model} is down"}})
+            return
+        words = ["Hello", " there", ",", " world"]
+        if not payload.get("stream"):
+            self._send_json(200, {
+                "model": model,
+                "choices": [{"message": {"role": "assistant", "content": "".join(words)},
+                             "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 5, "completion_tokens": 4},
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            if model in ("slow", "keepalive"):
+                end = time.monotonic() + (server.slow_seconds if model == "slow" else 60)
+                while time.monotonic() < end:
+                    self._chunk(": OPENROUTER PROCESSING\n\n")
+                    time.sleep(0.05)
+            for i, word in enumerate(words):
+                self._event({"choices": [{"delta": {"content": word}, "finish_reason": None}]})
+                if model == "error-midstream":
+                    self._event({"error": {"message": "provider disconnected"}})
+                    break
+                time.sleep(0.01)
+            else:
+                self._event({"choices": [{"delta": {}, "finish_reason": "stop"}],
+                             "usage": {"prompt_tokens": 5, "completion_tokens": 4}})
+                self._chunk("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            with server.lock:
+                server.disconnects += 1
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _chunk(self, text):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _event(self, body):
+        self._chunk(f"data: {json.dumps(body)}\n\n")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeChatServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, slow_seconds=1.0, flaky_failures=2):
+        super().__init__(("127.0.0.1", 0), FakeChatHandler)
+        self.lock = threading.Lock()
+        self.calls = Counter()
+        self.disconnects = 0
+        self.slow_seconds = slow_seconds
+        self.flaky_failures = flaky_failures
+        self.url = f"http://127.0.0.1:{self.server_port}/v1/chat/completions"
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
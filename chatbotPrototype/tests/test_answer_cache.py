@@ -0,0 +1,63 @@
+import threading
+import time
+
+import numpy as np
+
+from answer_cache import AnswerCache
+
+KEY = ("deepseek/deepseek-r1:free", "llm", 10, 5, 0.5, 3000)
+
+
+def unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_similar_question_with_same_key_hits():
+    cache = AnswerCache(embed=None)
+    cache.put(unit(1, 0, 0), KEY, "How do I log in?", {"answer": 1})
+    hit = cache.get(unit(1, 0.05, 0), KEY)
+    assert hit["question"] == "How do I log in?" and hit["similarity"] > 0.95
+    assert cache.get(unit(0, 1, 0), KEY) is None
+
+
+def test_other_search_or_context_settings_miss():
+    cache = AnswerCache(embed=None)
+    cache.put(unit(1, 0, 0), KEY, "How do I log in?", {"answer": 1})
+    for changed in (
+        KEY[:2] + (20,) + KEY[3:],          # search_limit
+        KEY[:4] + (0.3,) + KEY[5:],         # max_distance
+        KEY[:5] + (1000,),                  # context_tokens
+        ("mistralai/mistral-7b-instruct:free",) + KEY[1:],
+    ):
+        assert cache.get(unit(1, 0, 0), changed) is None
+
+
+def test_changed_fingerprint_drops_entries():
+    version = ["ingest 1", 100]
+    cache = AnswerCache(embed=None, fingerprint=lambda: tuple(version), check_interval=0)
+    assert cache.get(unit(1, 0, 0), KEY) is None  # first check records the fingerprint
+    cache.put(unit(1, 0, 0), KEY, "q", {})
+    assert cache.get(unit(1, 0, 0), KEY) is not None
+    version[0] = "ingest 2"  # re-ingested, same object count
+    assert cache.get(unit(1, 0, 0), KEY) is None
+    assert len(cache) == 0
+
+
+def test_slow_fingerprint_does_not_block_lookups():
+    started = threading.Event()
+
+    def slow_fingerprint():
+        started.set()
+        time.sleep(0.5)
+        return 1
+
+    cache = AnswerCache(embed=None, fingerprint=slow_fingerprint, check_interval=0.2)
+    cache.put(unit(1, 0, 0), KEY, "q", {})
+    checker = threading.Thread(target=cache.get, args=(unit(1, 0, 0), KEY))
+    checker.start()
+    started.wait(1)
+    begun = time.monotonic()
+    assert cache.get(unit(1, 0, 0), KEY) is not None
+    assert time.monotonic() - begun < 0.2
+    checker.join()
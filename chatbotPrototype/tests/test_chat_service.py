@@ -0,0 +1,30 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("weaviate")
+
+import chat_service
+import tracing
+from conversation import ConversationStore
+
+
+class BrokenContextAssistant:
+    conversations = ConversationStore()
+
+    def retrieve(self, query, model, limit, mode, max_distance):
+        return SimpleNamespace(objects=[]), query
+
+    def context(self, *args, **kwargs):
+        raise RuntimeError("context broke")
+
+
+def test_pipeline_failure_ends_the_stream_with_an_error_event(monkeypatch):
+    monkeypatch.setattr(tracing, "_shared_exporters", [])
+    body = chat_service.AnswerRequest(question="How do I log in?", use_cache=False)
+    events = list(chat_service.answer_events(BrokenContextAssistant(), body))
+    assert events[-1] == "data: [DONE]\n\n"
+    error = json.loads(events[-2][len("data: "):])
+    assert error == {"type": "error", "error": "RuntimeError: context broke"}
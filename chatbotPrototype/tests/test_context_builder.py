@@ -0,0 +1,114 @@
+import itertools
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("weaviate")
+
+from context_builder import TIMESTAMP_LINE, build_context, count_tokens, split_passages
+
+_filler_ids = itertools.count()
+
+
+def filler_sentence():
+    # Unique, since lines repeated within a source are skipped
+    return f"The hub offers tool number {next(_filler_ids)} for collaborative research across groups."
+
+
+def chunk(url, index, text, distance=0.2):
+    return SimpleNamespace(
+        uuid=f"{url}#{index}",
+        properties={"url": url, "transcript": text, "chunkIndex": index},
+        metadata=SimpleNamespace(distance=distance, score=None),
+    )
+
+
+def prose(*sentences, filler=6):
+    return " ".join([filler_sentence() for _ in range(filler)] + list(sentences)
+                    + [filler_sentence() for _ in range(filler)])
+
+
+def result(*objects):
+    return SimpleNamespace(objects=list(objects))
+
+
+def body_lines(context):
+    return [line for line in context.splitlines()
+            if line and not line.startswith("--- SOURCE:") and line != "[...]"]
+
+
+@pytest.mark.parametrize("budget", [150, 300, 600, 3000])
+def test_context_never_exceeds_the_budget(budget):
+    objects = [chunk(f"https://x/{s}", i, prose(f"Persistent bucket storage note {s}-{i}."))
+               for s in range(4) for i in range(3)]
+    context = build_context(result(*objects), "persistent bucket storage", budget=budget, top_results=4)
+    assert context is not None
+    assert count_tokens(context) <= budget
+    assert count_tokens(context, "mistralai/mistral-7b-instruct:free") > count_tokens(context)
+    mistral = build_context(result(*objects), "persistent bucket storage",
+                            model="mistralai/mistral-7b-instruct:free", budget=budget, top_results=4)
+    assert mistral is None or count_tokens(mistral, "mistralai/mistral-7b-instruct:free") <= budget
+
+
+def test_transcript_lines_keep_their_timestamps():
+    cues = "\n".join(f"{i * 3.25:.2f}s: the speaker talks about ocean eddies and turbulence {i}" for i in range(60))
+    context = build_context(result(chunk("https://www.youtube.com/watch?v=abc", 0, cues)),
+                            "ocean turbulence", budget=300)
+    lines = body_lines(context)
+    assert lines and all(TIMESTAMP_LINE.match(line) for line in lines)
+    assert all(line in cues.splitlines() for line in lines)
+
+
+def test_gap_marker_only_between_passages_that_are_not_adjacent():
+    url = "https://x/guide"
+    objects = [chunk(url, 0, prose("GPU servers are listed on the hub.", filler=3)),
+               chunk(url, 1, prose("GPU servers are chosen at login.", filler=3)),
+               chunk(url, 3, prose("GPU quotas reset weekly.", filler=3))]
+    chunks = [(o.properties["chunkIndex"], o.properties["transcript"]) for o in objects]
+    context = build_context(result(*objects), "GPU servers quotas", budget=10_000)
+
+    picked = [p for p in split_passages(chunks, 0) if p.text in context]
+    gaps = [b.position != a.position + 1 for a, b in zip(picked, picked[1:])]
+    # The case has both neighbours and a gap (chunk 2 was not retrieved)
+    assert True in gaps and False in gaps
+    expected = ["[...]\n" + picked[0].text if picked[0].position else picked[0].text]
+    expected += ["[...]\n" + b.text if gap else b.text for b, gap in zip(picked[1:], gaps)]
+    assert context.split("\n", 1)[1] == "\n".join(expected)
+
+
+def test_gap_marker_before_a_passage_that_does_not_start_the_source():
+    text = "\n".join([filler_sentence() for _ in range(30)] + ["Scratch bucket files are deleted after seven days."]
+                     + [filler_sentence() for _ in range(30)])
+    context = build_context(result(chunk("https://x/data", 0, text)), "scratch bucket deleted", budget=200)
+    lines = context.splitlines()
+    assert lines[1] == "[...]"
+    assert "Scratch bucket files" in context
+    assert context.count("[...]") >= 1
+
+
+def test_best_passage_of_every_source_comes_first():
+    objects = [
+        chunk("https://x/a", 0, prose("Storage quotas apply to the persistent bucket.", filler=20)),
+        chunk("https://x/b", 0, prose("The persistent bucket keeps large datasets.", filler=20), distance=0.3),
+        chunk("https://x/c", 0, prose("Nothing relevant here.", filler=20), distance=0.4),
+    ]
+    # Room for about one passage from each of two sources
+    context = build_context(result(*objects), "persistent bucket quotas", budget=300, top_results=3)
+    assert "Storage quotas apply to the persistent bucket." in context
+    assert "The persistent bucket keeps large datasets." in context
+    sources = [line for line in context.splitlines() if line.startswith("--- SOURCE:")]
+    assert [s.split()[2] for s in sources][:2] == ["https://x/a", "https://x/b"]
+
+
+def test_no_results_gives_no_context():
+    assert build_context(result(), "anything") is None
+    assert build_context(None, "anything") is None
+    assert build_context(result(chunk("https://x/e", 0, "Error scraping https://x/e")), "x") is None
+
+
+def test_gap_markers_count_against_the_budget():
+    # Every retrieved chunk is cut off from the next, so each passage gets a "[...]"
+    objects = [chunk("https://x/notes", 2 * i, f"Bucket note {i} about persistent storage.") for i in range(20)]
+    for budget in range(20, 200):
+        context = build_context(result(*objects), "persistent bucket storage", budget=budget)
+        assert context is None or count_tokens(context) <= budget
@@ -0,0 +1,67 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("weaviate")
+
+from conversation import Conversation, RECENT_TURNS
+
+
+@pytest.fixture
+def conversation():
+    conversation = Conversation("c")
+    conversation.add_turn("How do I get access to the LEAP JupyterHub?", "Sign up through the form.")
+    return conversation
+
+
+@pytest.mark.parametrize("question", [
+    "Is it free?",
+    "Where are those stored?",
+    "What about storage quotas?",
+    "Why?",
+    "And for students?",
+])
+def test_questions_that_refer_back_are_follow_ups(conversation, question):
+    assert conversation.is_follow_up(question)
+
+
+@pytest.mark.parametrize("question", [
+    "What is CMIP6?",
+    "Explain ocean heat uptake",
+    "Why does the AMOC weaken under warming?",
+])
+def test_short_new_questions_are_not_follow_ups(conversation, question):
+    assert not conversation.is_follow_up(question)
+
+
+def test_nothing_is_a_follow_up_of_an_empty_conversation():
+    assert not Conversation("c").is_follow_up("Is it free?")
+
+
+def test_folds_run_one_at_a_time_and_keep_every_turn_in_order():
+    running = []
+    overlap = []
+    lock = threading.Lock()
+
+    def slow_summary(summary, question, answer):
+        with lock:
+            running.append(question)
+            if len(running) > 1:
+                overlap.append(question)
+        time.sleep(0.02)
+        with lock:
+            running.remove(question)
+        return f"{summary}\n{question}".strip()
+
+    conversation = Conversation("c", summarize=slow_summary)
+    questions = [f"question {i}" for i in range(RECENT_TURNS + 8)]
+    for question in questions:
+        conversation.add_turn(question, "answer")
+
+    deadline = time.time() + 5
+    folded = questions[:-RECENT_TURNS]
+    while conversation.summary.splitlines() != folded and time.time() < deadline:
+        time.sleep(0.01)
+    assert conversation.summary.splitlines() == folded
+    assert not overlap
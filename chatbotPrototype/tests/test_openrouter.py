@@ -0,0 +1,150 @@
+import threading
+
+import pytest
+import requests
+
+import openrouter
+from fake_openai import FakeChatServer
+from openrouter import ChatStream, OpenRouterClient, StreamError, chat_messages, iter_sse_data
+
+MESSAGES = chat_messages("You are a test.", "Say hello.")
+HEADERS = {"Authorization": "Bearer test"}
+
+
+@pytest.fixture
+def server():
+    with FakeChatServer() as server:
+        yield server
+
+
+# ------------------------------------------------------------------------
+# Server-sent events
+# ------------------------------------------------------------------------
+def test_sse_skips_comments_and_other_fields():
+    lines = [": keep-alive", "", "event: message", "id: 1", "data: one", "", ": ping", "data: two", ""]
+    assert list(iter_sse_data(lines)) == ["one", "two"]
+
+
+def test_sse_joins_multiline_data_and_flushes_last_event():
+    lines = ["data: first", "data:second", "", "data:  indented", None, "data: [DONE]"]
+    assert list(iter_sse_data(lines)) == ["first\nsecond", " indented\n[DONE]"]
+
+
+# ------------------------------------------------------------------------
+# Streaming against the fake server
+# ------------------------------------------------------------------------
+def test_stream_yields_deltas_and_records_metadata(server):
+    stream = ChatStream("fast", MESSAGES, HEADERS, api_url=server.url)
+    assert list(stream) == ["Hello", " there", ",", " world"]
+    assert stream.text == "Hello there, world"
+    assert stream.finish_reason == "stop"
+    assert stream.usage == {"prompt_tokens": 5, "completion_tokens": 4}
+    assert 0 < stream.time_to_first_token < 1
+    response = stream.as_response()
+    assert response["choices"][0]["message"]["content"] == "Hello there, world"
+
+
+def test_keepalive_comments_before_first_token(server):
+    server.slow_seconds = 0.3
+    stream = ChatStream("slow", MESSAGES, HEADERS, api_url=server.url)
+    assert "".join(stream) == "Hello there, world"
+    assert stream.time_to_first_token >= 0.3
+
+
+def test_http_error_raises_stream_error(server):
+    with pytest.raises(StreamError, match="HTTP 500: broken is down"):
+        list(ChatStream("broken", MESSAGES, HEADERS, api_url=server.url))
+
+
+def test_error_event_mid_stream_keeps_partial_text(server):
+    stream = ChatStream("error-midstream", MESSAGES, HEADERS, api_url=server.url)
+    received = []
+    with pytest.raises(StreamError, match="provider disconnected"):
+        for delta in stream:
+            received.append(delta)
+    assert received == ["Hello"] and stream.text == "Hello"
+
+
+def test_total_timeout_applies_to_keepalive_only_streams(server):
+    stream = ChatStream("keepalive", MESSAGES, HEADERS, api_url=server.url, total_timeout=0.3)
+    with pytest.raises(requests.Timeout):
+        list(stream)
+
+
+def test_cancel_event_stops_the_stream(server):
+    server.slow_seconds = 0.3
+    cancel = threading.Event()
+    stream = ChatStream("slow", MESSAGES, HEADERS, api_url=server.url, cancel_event=cancel)
+    threading.Timer(0.1, cancel.set).start()
+    assert list(stream) == []
+    assert stream.cancelled
+    assert stream.as_response()["cancelled"]
+
+
+def test_breaking_out_closes_the_connection(server):
+    stream = ChatStream("fast", MESSAGES, HEADERS, api_url=server.url)
+    for _ in stream:
+        break
+    stream.close()
+    assert stream.text == "Hello"
+    assert stream._response is None
+
+
+# ------------------------------------------------------------------------
+# Retries and model fallback
+# ------------------------------------------------------------------------
+@pytest.fixture
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(openrouter, "RETRY_BACKOFF", 0)
+
+
+def client_for(server, **kwargs):
+    return OpenRouterClient(HEADERS, api_url=server.url, **kwargs)
+
+
+def test_retries_5xx_on_the_pooled_session(server, no_backoff):
+    client = client_for(server, retries=2)
+    result = client.complete("flaky", MESSAGES)
+    assert result["choices"][0]["message"]["content"] == "Hello there, world"
+    assert server.calls["flaky"] == 3
+    assert "fallback_from" not in result
+
+
+def test_gives_up_after_the_retries(server, no_backoff):
+    client = client_for(server, retries=1)
+    with pytest.raises(requests.HTTPError):
+        client.complete("flaky", MESSAGES)
+    assert server.calls["flaky"] == 2
+
+
+def test_complete_falls_back_when_model_fails(server, no_backoff):
+    client = client_for(server, retries=0, fallbacks={"broken": "fast"})
+    result = client.complete("broken", MESSAGES)
+    assert result["fallback_from"] == "broken"
+    assert server.calls == {"broken": 1, "fast": 1}
+
+
+def test_stream_falls_back_over_latency_budget(server):
+    server.slow_seconds = 2
+    client = client_for(server, fallbacks={"slow": "fast"}, latency_budget=0.3)
+    stream = client.stream("slow", MESSAGES)
+    assert "".join(stream) == "Hello there, world"
+    response = stream.as_response()
+    assert response["model"] == "fast" and response["fallback_from"] == "slow"
+
+
+def test_last_model_in_chain_gets_no_latency_budget(server):
+    server.slow_seconds = 0.5
+    client = client_for(server, fallbacks={"broken": "slow"}, latency_budget=0.1, retries=0)
+    stream = client.stream("broken", MESSAGES)
+    assert "".join(stream) == "Hello there, world"
+    assert stream.as_response()["model"] == "slow"
+
+
+def test_no_fallback_once_text_was_shown(server):
+    client = client_for(server, fallbacks={"error-midstream": "fast"})
+    stream = client.stream("error-midstream", MESSAGES)
+    with pytest.raises(StreamError):
+        list(stream)
+    assert stream.text == "Hello"
+    assert server.calls["fast"] == 0
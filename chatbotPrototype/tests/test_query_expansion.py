@@ -0,0 +1,76 @@
+import threading
+import time
+
+import pytest
+
+import query_expansion
+from query_expansion import EnhancementCache, search_with_enhancement
+
+
+class FakeResult:
+    def __init__(self, query):
+        self.objects = []
+        self.query = query
+
+
+def search(query, limit):
+    return FakeResult(query)
+
+
+class SlowEnhancer:
+    def __init__(self, delay):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, query, model):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return f"{query} enhanced"
+
+
+def test_late_enhancement_is_cached_after_timeout():
+    enhance = SlowEnhancer(0.3)
+    cache = EnhancementCache()
+    result, used = search_with_enhancement("ocean heat", "m", enhance, search, 5, cache=cache, timeout=0.05)
+    assert used == "ocean heat" and result.query == "ocean heat"
+
+    time.sleep(0.5)
+    assert cache.get("m", "ocean heat") == "ocean heat enhanced"
+    _, used = search_with_enhancement("ocean heat", "m", enhance, search, 5, cache=cache, timeout=0.05)
+    assert used == "ocean heat enhanced"
+    assert enhance.calls == 1
+
+
+def test_identical_questions_share_one_enhancement():
+    enhance = SlowEnhancer(0.2)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(
+            search_with_enhancement("sea ice", "m", enhance, search, 5, cache=EnhancementCache())[1]))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["sea ice enhanced"] * 5
+    assert enhance.calls == 1
+
+
+def test_saturated_pool_skips_enhancement(monkeypatch):
+    monkeypatch.setattr(query_expansion, "ENHANCE_WORKERS", 1)
+    busy = SlowEnhancer(0.3)
+    blocker = threading.Thread(target=search_with_enhancement,
+                               args=("first question", "m", busy, search, 5), kwargs={"timeout": 1})
+    blocker.start()
+    time.sleep(0.05)
+
+    enhance = SlowEnhancer(0.0)
+    started = time.monotonic()
+    _, used = search_with_enhancement("second question", "m", enhance, search, 5)
+    assert used == "second question"
+    assert enhance.calls == 0
+    assert time.monotonic() - started < 0.2
+    blocker.join()
@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("weaviate")
+
+from retrieval import LexicalReranker, retrieve
+
+
+def obj(uid, text, distance=None, score=None):
+    return SimpleNamespace(uuid=uid, properties={"transcript": text, "url": f"https://x/{uid}"},
+                           metadata=SimpleNamespace(distance=distance, score=score))
+
+
+class StubCollection:
+    """Hybrid search over fixed objects, honouring max_vector_distance like Weaviate."""
+
+    def __init__(self, objects):
+        self.objects = objects
+        self.calls = []
+        self.query = self
+
+    def hybrid(self, **kwargs):
+        self.calls.append(kwargs)
+        limit, max_distance = kwargs["limit"], kwargs["max_vector_distance"]
+        kept = [o for o in self.objects if o.metadata.distance is None or o.metadata.distance <= max_distance]
+        return SimpleNamespace(objects=kept[:limit])
+
+
+class FixedScores:
+    """Reranker scoring each passage by the number it starts with."""
+
+    def score(self, query, objects):
+        return [float(o.properties["transcript"].split()[0]) for o in objects]
+
+
+def test_lexical_reranker_prefers_passages_with_the_query_terms():
+    objects = [
+        obj("a", "the hub has notebooks and dashboards", distance=0.2),
+        obj("b", "store large datasets in the persistent bucket, not the home directory", distance=0.3),
+        obj("c", "bucket storage quotas for datasets on the persistent bucket", distance=0.3),
+    ]
+    scores = LexicalReranker().score("persistent bucket datasets", objects)
+    ranked = [o.uuid for _, o in sorted(zip(scores, objects), key=lambda p: p[0], reverse=True)]
+    assert ranked[-1] == "a"
+    assert scores[2] > scores[1]
+
+
+def test_lexical_reranker_without_lexical_weight_follows_search_relevance():
+    objects = [obj("far", "persistent bucket", distance=0.45), obj("near", "unrelated words", distance=0.1)]
+    scores = LexicalReranker(lexical_weight=0.0).score("persistent bucket", objects)
+    assert scores[1] > scores[0]
+    # Hybrid results without a distance fall back to their fused score
+    hybrid = [obj("low", "x", score=0.2), obj("high", "x", score=0.8)]
+    assert LexicalReranker(lexical_weight=0.0).score("x", hybrid) == [0.25, 1.0]
+
+
+def test_retrieve_passes_the_distance_cutoff_to_the_search():
+    collection = StubCollection([obj("near", "0.9 close", distance=0.2), obj("far", "1.0 far", distance=0.7)])
+    result = retrieve(collection, "q", FixedScores(), max_distance=0.5, pool=12)
+    assert collection.calls[0]["max_vector_distance"] == 0.5
+    assert collection.calls[0]["limit"] == 12
+    assert [o.uuid for o in result.objects] == ["near"]
+
+
+def test_retrieve_orders_cuts_and_caps_the_passages():
+    collection = StubCollection([
+        obj("mid", "0.5 some text", distance=0.3),
+        obj("best", "1.0 more text", distance=0.3),
+        obj("weak", "0.3 below the cutoff", distance=0.3),
+        obj("good", "0.8 text", distance=0.3),
+        obj("empty", "", distance=0.1),
+        obj("broken", "Error scraping https://x/broken", distance=0.1),
+    ])
+    result = retrieve(collection, "q", FixedScores(), relative_cutoff=0.35)
+    assert [o.uuid for o in result.objects] == ["best", "good", "mid"]
+    assert result.scores == [1.0, 0.8, 0.5]
+
+    capped = retrieve(collection, "q", FixedScores(), top_k=2)
+    assert [o.uuid for o in capped.objects] == ["best", "good"]
+
+
+def test_retrieve_with_no_candidates_is_empty():
+    result = retrieve(StubCollection([]), "q", LexicalReranker())
+    assert result.objects == [] and result.scores == []
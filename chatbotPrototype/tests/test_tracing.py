@@ -0,0 +1,88 @@
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from query_expansion import search_with_enhancement
+from tracing import NO_SPAN, JsonlExporter, Trace, current_span, span
+
+
+def test_spans_nest_across_the_enhancement_thread(tmp_path):
+    path = tmp_path / "traces" / "chat_traces.jsonl"
+    trace = Trace("answer", exporters=[JsonlExporter(str(path))], model="m")
+    threads = {}
+
+    def enhance(query, model):
+        threads["enhance"] = threading.current_thread().name
+        with span("enhance.inner", tokens=3):
+            return f"{query} enhanced"
+
+    def search(query, limit):
+        return SimpleNamespace(objects=[])
+
+    with trace.root:
+        with span("retrieve"):
+            search_with_enhancement("ocean heat", "m", enhance, search, 5)
+    trace.finish()
+    trace.finish()  # a second call exports nothing more
+
+    assert threads["enhance"].startswith("query-enhance")
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 1
+    exported = json.loads(lines[0])
+    assert exported["trace_id"] == trace.id
+    spans = {s["name"]: s for s in exported["spans"]}
+    by_id = {s["span_id"]: s for s in exported["spans"]}
+    root = spans["answer"]
+    assert root["parent_id"] is None and root["attributes"] == {"model": "m"}
+    assert spans["retrieve"]["parent_id"] == root["span_id"]
+    # The span opened on the worker thread still hangs off the request's tree
+    assert spans["enhance"]["parent_id"] == spans["retrieve"]["span_id"]
+    assert spans["enhance.inner"]["parent_id"] == spans["enhance"]["span_id"]
+    assert spans["enhance.wait"]["parent_id"] == spans["retrieve"]["span_id"]
+    assert all(s["trace_id"] == trace.id and s["duration_ms"] is not None for s in exported["spans"])
+    assert all(s["parent_id"] is None or s["parent_id"] in by_id for s in exported["spans"])
+
+
+def test_finish_is_idempotent_and_keeps_the_first_error():
+    exported = []
+    trace = Trace("answer", exporters=[SimpleNamespace(export=exported.append)])
+    trace.finish(RuntimeError("first"))
+    duration = trace.root.duration
+    trace.finish(ValueError("second"))
+    trace.finish()
+    assert exported == [trace]
+    assert trace.root.error == "RuntimeError: first"
+    assert trace.root.duration == duration
+
+
+def test_failing_exporter_does_not_break_the_request():
+    def broken(trace):
+        raise OSError("disk full")
+
+    exported = []
+    trace = Trace("answer", exporters=[SimpleNamespace(export=broken), SimpleNamespace(export=exported.append)])
+    trace.finish()
+    assert exported == [trace]
+
+
+def test_span_errors_and_breakdown():
+    trace = Trace("answer", exporters=[])
+    with trace.root:
+        with pytest.raises(KeyError):
+            with span("context"):
+                raise KeyError("missing")
+        current_span().set(answered=True)
+    trace.finish()
+    breakdown = trace.breakdown()
+    assert [(row["name"], row["depth"]) for row in breakdown] == [("answer", 0), ("context", 1)]
+    assert breakdown[1]["error"] == "KeyError: 'missing'"
+    assert breakdown[0]["attributes"] == {"answered": True}
+
+
+def test_untraced_code_gets_a_no_op_span():
+    assert span("anything") is NO_SPAN
+    assert current_span() is NO_SPAN
+    with span("anything") as s:
+        s.set(ignored=True)
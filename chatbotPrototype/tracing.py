@@ -0,0 +1,245 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+
+# Spans are also sent to OpenTelemetry when it is installed and selected;
+# the SDK and its exporter are configured by the deployment as usual
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+# ------------------------------------------------------------------------
+# Settings
+# ------------------------------------------------------------------------
+# Comma-separated: "jsonl", "otel", or "off"
+TRACE_EXPORT = os.environ.get("LEAP_TRACE_EXPORT", "jsonl")
+TRACE_FILE = os.environ.get("LEAP_TRACE_FILE", os.path.join("traces", "chat_traces.jsonl"))
+
+# The span that new spans are children of, in this thread / context
+_current_span = contextvars.ContextVar("leap_current_span", default=None)
+
+
+# ------------------------------------------------------------------------
+# Spans
+# ------------------------------------------------------------------------
+class Span:
+    """
+    One timed stage of a request with its attributes (token counts, cache
+    hits, ...). As a context manager it becomes the current span, so spans
+    opened by the code it calls nest under it, and it ends on exit.
+    Spans that stay open across yields (a streamed answer) are ended with
+    end() instead, since a context variable can't be reset from another
+    step of a generator.
+    """
+
+    def __init__(self, trace, name, parent=None, attributes=None):
+        self.trace = trace
+        self.name = name
+        self.id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.id if parent else None
+        self.depth = parent.depth + 1 if parent else 0
+        self.attributes = dict(attributes or {})
+        self.start = time.time()
+        self.duration = None
+        self.error = None
+        self._started = time.perf_counter()
+        self._token = None
+        trace.add(self)
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def child(self, name, **attributes):
+        return Span(self.trace, name, self, attributes)
+
+    def elapsed_ms(self):
+        return round((time.perf_counter() - self._started) * 1000, 1)
+
+    def end(self, error=None):
+        if self.duration is None:
+            self.duration = time.perf_counter() - self._started
+        if error is not None and self.error is None:
+            self.error = f"{type(error).__name__}: {error}"
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self._token)
+        self.end(exc)
+        return False
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace.id,
+            "span_id": self.id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoSpan:
+    """Stands in for a span when no trace is active, so instrumented code needn't check."""
+
+    def set(self, **attributes):
+        pass
+
+    def child(self, name, **attributes):
+        return self
+
+    def end(self, error=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NO_SPAN = _NoSpan()
+
+
+def span(name, **attributes):
+    """A new child of the current span, or a no-op span when nothing is being traced."""
+    parent = _current_span.get()
+    if parent is None:
+        return NO_SPAN
+    return parent.child(name, **attributes)
+
+
+def current_span():
+    return _current_span.get() or NO_SPAN
+
+
+# ------------------------------------------------------------------------
+# Traces
+# ------------------------------------------------------------------------
+class Trace:
+    """
+    The spans of one request under a root span. finish() ends the root and
+    hands the trace to the exporters, once.
+    """
+
+    def __init__(self, name, exporters=None, **attributes):
+        self.id = uuid.uuid4().hex
+        self.spans = []
+        self.exporters = shared_exporters() if exporters is None else exporters
+        self._lock = threading.Lock()
+        self._finished = False
+        self.root = Span(self, name, attributes=attributes)
+
+    def add(self, new_span):
+        with self._lock:
+            self.spans.append(new_span)
+
+    def finish(self, error=None):
+        with self._lock:
+            if self._finished:
+                return
+            self._finished = True
+        self.root.end(error)
+        for exporter in self.exporters:
+            try:
+                exporter.export(self)
+            except Exception:
+                pass  # tracing must never break a request
+
+    def breakdown(self):
+        """[{"name", "ms", "depth", "attributes"}] in start order, for debug views."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s._started)
+        return [
+            {
+                "name": s.name,
+                "ms": round(s.duration * 1000, 1) if s.duration is not None else None,
+                "depth": s.depth,
+                "attributes": s.attributes,
+                **({"error": s.error} if s.error else {}),
+            }
+            for s in spans
+        ]
+
+    def to_dict(self):
+        with self._lock:
+            return {"trace_id": self.id, "spans": [s.to_dict() for s in self.spans]}
+
+
+# ------------------------------------------------------------------------
+# Exporters
+# ------------------------------------------------------------------------
+class JsonlExporter:
+    """Appends every finished trace as one JSON line to 'path'."""
+
+    def __init__(self, path=TRACE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, trace):
+        line = json.dumps(trace.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+class OtelExporter:
+    """Replays finished traces as OpenTelemetry spans with their original timestamps."""
+
+    def __init__(self, tracer_name="leap-chat"):
+        if otel_trace is None:
+            raise ImportError("OtelExporter needs opentelemetry-api")
+        self.tracer = otel_trace.get_tracer(tracer_name)
+
+    @staticmethod
+    def _attribute(value):
+        if isinstance(value, (str, bool, int, float)):
+            return value
+        return json.dumps(value, default=str)
+
+    def export(self, trace):
+        exported = {}
+        for s in sorted(trace.spans, key=lambda s: s._started):
+            parent = exported.get(s.parent_id)
+            context = otel_trace.set_span_in_context(parent) if parent is not None else None
+            attributes = {key: self._attribute(value) for key, value in s.attributes.items() if value is not None}
+            attributes["leap.trace_id"] = trace.id
+            otel_span = self.tracer.start_span(s.name, context=context, start_time=int(s.start * 1e9),
+                                               attributes=attributes)
+            if s.error:
+                otel_span.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR, s.error))
+            otel_span.end(end_time=int((s.start + (s.duration or 0.0)) * 1e9))
+            exported[s.id] = otel_span
+
+
+def default_exporters(setting=TRACE_EXPORT):
+    """Exporters named in LEAP_TRACE_EXPORT; "otel" is skipped without opentelemetry."""
+    exporters = []
+    for name in (part.strip() for part in setting.split(",")):
+        if name == "jsonl":
+            exporters.append(JsonlExporter())
+        elif name == "otel" and otel_trace is not None:
+            exporters.append(OtelExporter())
+    return exporters
+
+
+_shared_exporters = None
+_shared_lock = threading.Lock()
+
+
+def shared_exporters():
+    """The default exporters, created once so every trace appends through the same lock."""
+    global _shared_exporters
+    with _shared_lock:
+        if _shared_exporters is None:
+            _shared_exporters = default_exporters()
+        return _shared_exporters